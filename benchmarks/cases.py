@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+""" Benchmark cases, the demo schemas on synthetic files and a micro
+benchmark for each kind of field
+
+A case is parsed from a stream over the generated data (see run.py),
+generators take a seeded random.Random and a scale (about the size in MB)
+and return (data, records).
+"""
+
+import collections
+import struct
+
+import demo_itunesdb
+import demo_png
+import route_result_dump_parser
+import synthetic
+
+from binaryparser import *
+
+Case = collections.namedtuple('Case', 'name field generate')
+
+#===============================================================================
+# Generators
+#===============================================================================
+
+def _static_records(format, values):
+    """ Generator of records of a struct format, values(random) returns
+    values of a record """
+    formatter = struct.Struct(format)
+    def generate(random, scale):
+        count = max(1, int(scale * (1 << 20)) // formatter.size)
+        return b''.join(formatter.pack(*values(random))
+                        for n in range(count)), count
+    return generate
+
+def _records(record):
+    """ Generator of records of variable size, record(random) returns
+    bytes of a record """
+    def generate(random, scale):
+        limit = int(scale * (1 << 20))
+        chunks = list()
+        size = 0
+        while size < limit or not chunks:
+            chunk = record(random)
+            chunks.append(chunk)
+            size += len(chunk)
+        return b''.join(chunks), len(chunks)
+    return generate
+
+def _counted(generate):
+    """ Prefix generated records with their count """
+    def generate_counted(random, scale):
+        data, count = generate(random, scale)
+        return struct.pack('<I', count) + data, count
+    return generate_counted
+
+def _terminated(generate, terminator):
+    """ Append a terminator record """
+    def generate_terminated(random, scale):
+        data, count = generate(random, scale)
+        return data + terminator, count + 1
+    return generate_terminated
+
+def _text(random, length):
+    return bytes(random.randrange(0x61, 0x7b) for n in range(length))
+
+def _point(random):
+    return (random.getrandbits(32), random.getrandbits(16),
+            random.getrandbits(16), random.random())
+
+def _name(random):
+    text = _text(random, random.randrange(1, 64))
+    return bytes((len(text),)) + text
+
+def _chunk(random):
+    data = _text(random, random.randrange(0, 32))
+    return struct.pack('>H', len(data)) + data + b'crc!'
+
+def _item(random):
+    kind = random.randrange(3)
+    if kind == 0:
+        return b'\0' + struct.pack('>H', random.getrandbits(16))
+    elif kind == 1:
+        return b'\1' + struct.pack('>I', random.getrandbits(32))
+    return b'\2' + _text(random, 4)
+
+#===============================================================================
+# Fields
+#===============================================================================
+
+def _repeat(name, field):
+    # parse until end of data
+    return RepeatUntil(name, lambda c: False, field)
+
+def _counted_array(name, field, columnar=False):
+    return Structure('File',
+                     ULInt32('Count'),
+                     Array(name, field, lambda c: c.Count, columnar=columnar))
+
+_POINT = FormatStructure('Point', '<IHHd', ['Id', 'X', 'Y', 'Value'])
+
+_TEXT_SIZE = 16
+
+def _micro_cases():
+    return [
+        Case('FormatField/bulk',
+             _counted_array('Points', _POINT),
+             _counted(_static_records('<IHHd', _point))),
+        Case('FormatField/loop',
+             _repeat('Points', _POINT),
+             _static_records('<IHHd', _point)),
+        Case('FormatField/integer',
+             _repeat('Values', ULInt32(None)),
+             _static_records('<I', lambda r: (r.getrandbits(32),))),
+        Case('String/static',
+             _counted_array('Names', String(None, _TEXT_SIZE)),
+             _counted(_records(lambda r: _text(r, r.randrange(1, _TEXT_SIZE))\
+                               .ljust(_TEXT_SIZE, b'\0')))),
+        Case('String/dynamic',
+             _repeat('Names', Structure('Name',
+                                        UInt8('Length'),
+                                        String('Text', lambda c: c.Length))),
+             _records(_name)),
+        Case('String/cstring',
+             _repeat('Names', String(None, 0)),
+             _records(lambda r: _text(r, r.randrange(1, 64)) + b'\0')),
+        Case('String/cstring_utf16',
+             _repeat('Names', String(None, 0, encoding='utf_16_le')),
+             _records(lambda r: _text(r, r.randrange(1, 32)).decode('ascii')\
+                      .encode('utf_16_le') + b'\0\0')),
+        Case('Array/structures',
+             _counted_array('Chunks', Structure('Chunk',
+                                                UBInt16('Length'),
+                                                Bytes('Data', lambda c: c.Length),
+                                                Bytes('Crc', 4))),
+             _counted(_records(_chunk))),
+        Case('Array/columnar',
+             _counted_array('Points',
+                            Structure('Point', ULInt32('Id'), LInt16('X'), LInt16('Y')),
+                            columnar=True),
+             _counted(_static_records('<Ihh', lambda r: (r.getrandbits(32),
+                                                         r.randrange(-32768, 32768),
+                                                         r.randrange(-32768, 32768))))),
+        Case('RepeatUntil',
+             RepeatUntil('Items',
+                         lambda c: c and c[-1].Kind == 0,
+                         Structure('Item', UInt8('Kind'), UBInt16('Value'))),
+             _terminated(_static_records('>BH', lambda r: (r.randrange(1, 256),
+                                                           r.getrandbits(16))),
+                         b'\0\0\0')),
+        Case('Switch',
+             _repeat('Items', Structure('Item',
+                                        UInt8('Kind'),
+                                        Switch(lambda c: c.Kind, {
+                                            0: UBInt16('Value'),
+                                            1: UBInt32('Value'),
+                                            2: Bytes('Value', 4),
+                                            }))),
+             _records(_item)),
+        Case('Union',
+             _counted_array('Words',
+                            Union('Word',
+                                  UBInt32('Value'),
+                                  Structure('Halves', UBInt16('High'), UBInt16('Low')))),
+             _counted(_static_records('>I', lambda r: (r.getrandbits(32),)))),
+        Case('BitwiseStructure',
+             _counted_array('Flags',
+                            BitwiseStructure('Flags',
+                                             [('A', 1), ('B', 3), ('C', 4), ('D', 8)],
+                                             'big')),
+             _counted(_static_records('>H', lambda r: (r.getrandbits(16),)))),
+        ]
+
+#===============================================================================
+# Schemas
+#===============================================================================
+
+def _schema_cases():
+    return [
+        Case('PNG', demo_png.PNGFile, synthetic.png_file),
+        Case('iTunesDB', demo_itunesdb.ITunesDB, synthetic.itunesdb_file),
+        Case('RouteDump', route_result_dump_parser.PDM_ResultFileFormat,
+             synthetic.route_file),
+        ]
+
+def get_cases():
+    """ All cases in report order """
+    return _schema_cases() + _micro_cases()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+""" Run the benchmark suite
+
+    python run.py                   # compare with baseline.json
+    python run.py --save            # save results as the baseline
+    python run.py -k String --scale 4 --compile
+    python run.py --stream file     # parse from an open file
+
+Each case generates its input once from a fixed seed, and reports the best
+throughput (MB/s and records/s) of several parsings and the peak memory
+allocated by one parsing (measured separately by tracemalloc, which slows
+down parsing).  Input is parsed from a BufferStream by default, --stream
+selects an io.BytesIO or a file opened for each parsing instead.  Results
+are compared with a baseline saved on the same machine with the same
+scale, compile and stream options, exit status is 1 if a case is slower,
+or allocates more, than the baseline by more than the threshold.
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(_DIRECTORY, '..', 'src'),
+                os.path.join(_DIRECTORY, '..', 'test')]
+
+from binaryparser import BufferStream
+import cases
+
+#===============================================================================
+# Measurement
+#===============================================================================
+
+STREAMS = ('buffer', 'bytesio', 'file')
+
+def _opener(stream, data, directory):
+    """ Returns a function which opens a new stream of kind stream over
+    data, files are written into directory """
+    if stream == 'buffer':
+        return lambda: BufferStream(data)
+    elif stream == 'bytesio':
+        return lambda: io.BytesIO(data)
+    filename = os.path.join(directory, 'data')
+    with open(filename, 'wb') as fp:
+        fp.write(data)
+    return lambda: open(filename, 'rb')
+
+def _parse(field, open_stream):
+    stream = open_stream()
+    try:
+        return field.parse(stream, None)
+    finally:
+        stream.close()
+
+def measure(case, scale, repeat, seed, compile=False, stream='buffer'):
+    """ Returns the result of a case as a dict """
+    data, records = case.generate(random.Random(seed), scale)
+    field = case.field.compile() if compile else case.field
+    with tempfile.TemporaryDirectory() as directory:
+        open_stream = _opener(stream, data, directory)
+        # warm up caches of the field
+        _parse(field, open_stream)
+        timings = list()
+        for n in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            result = _parse(field, open_stream)
+            timings.append(time.perf_counter() - start)
+            del result
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = _parse(field, open_stream)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        del result
+    best = min(timings)
+    return {
+        'size': len(data),
+        'records': records,
+        'mb_per_second': len(data) / best / 1e6,
+        'records_per_second': records / best,
+        'peak_memory': peak,
+        }
+
+#===============================================================================
+# Baseline
+#===============================================================================
+
+def load_baseline(filename):
+    try:
+        with open(filename) as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return None
+
+def _settings(baseline):
+    # options which results depend on, baselines saved before the stream
+    # option was added parsed BufferStreams
+    return baseline['scale'], baseline['compile'], baseline.get('stream', 'buffer')
+
+def save_baseline(filename, options, results):
+    # results of cases which are not run are kept
+    baseline = load_baseline(filename)
+    if baseline is not None and _settings(baseline) == \
+        (options.scale, options.compile, options.stream):
+        results = dict(baseline['results'], **results)
+    baseline = {
+        'scale': options.scale,
+        'compile': options.compile,
+        'stream': options.stream,
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'results': results,
+        }
+    with open(filename, 'w') as fp:
+        json.dump(baseline, fp, indent=2, sort_keys=True)
+
+def compare(result, expected, threshold):
+    """ Returns (change of throughput, change of peak memory, regressed) """
+    speed = result['mb_per_second'] / expected['mb_per_second'] - 1
+    memory = result['peak_memory'] / max(expected['peak_memory'], 1) - 1
+    return speed, memory, speed < -threshold or memory > threshold
+
+#===============================================================================
+# Command Line
+#===============================================================================
+
+def _parse_arguments(argv):
+    parser = argparse.ArgumentParser(description='Run parsing benchmarks')
+    parser.add_argument('-k', dest='pattern', default='',
+                        help='only run cases whose name contains PATTERN')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='approximate input size of each case in MB')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of timed parsings of each case')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compile', action='store_true',
+                        help='benchmark compiled fields (see Field.compile)')
+    parser.add_argument('--stream', choices=STREAMS, default='buffer',
+                        help='kind of stream parsed, default is buffer')
+    parser.add_argument('--baseline', default=os.path.join(_DIRECTORY, 'baseline.json'))
+    parser.add_argument('--save', action='store_true',
+                        help='save results as the baseline instead of comparing')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed relative regression, default is 0.1')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = _parse_arguments(argv)
+    baseline = None if options.save else load_baseline(options.baseline)
+    if baseline is not None and _settings(baseline) != \
+        (options.scale, options.compile, options.stream):
+        scale, compile, stream = _settings(baseline)
+        print('Baseline was saved with --scale {} --stream {}{}, not comparing'\
+              .format(scale, stream, ' --compile' if compile else ''))
+        baseline = None
+
+    print('{:<24} {:>9} {:>10} {:>13} {:>10} {:>8} {:>8}'\
+          .format('case', 'size MB', 'MB/s', 'records/s', 'peak MB',
+                  'speed', 'memory'))
+    results = dict()
+    regressions = list()
+    for case in cases.get_cases():
+        if options.pattern not in case.name:
+            continue
+        result = results[case.name] = measure(case, options.scale, options.repeat,
+                                              options.seed, options.compile,
+                                              options.stream)
+        line = '{:<24} {:>9.2f} {:>10.2f} {:>13.0f} {:>10.2f}'\
+            .format(case.name, result['size'] / 1e6, result['mb_per_second'],
+                    result['records_per_second'], result['peak_memory'] / 1e6)
+        expected = baseline and baseline['results'].get(case.name)
+        if expected:
+            speed, memory, regressed = compare(result, expected, options.threshold)
+            line += ' {:>+7.1%} {:>+7.1%}'.format(speed, memory)
+            if regressed:
+                regressions.append(case.name)
+                line += '  REGRESSION'
+        print(line)
+        sys.stdout.flush()
+
+    if options.save:
+        save_baseline(options.baseline, options, results)
+        print('Saved baseline to {}'.format(options.baseline))
+    if regressions:
+        print('{} regression(s) beyond {:.0%}: {}'\
+              .format(len(regressions), options.threshold, ', '.join(regressions)))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
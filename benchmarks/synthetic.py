@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+""" Synthetic inputs of the demo schemas
+
+Every generator takes a seeded random.Random and a scale, and returns
+(data, records), records being the number of repeated elements (chunks,
+tracks, links...) in data.  The same seed and scale always generate the
+same bytes.
+"""
+
+import struct
+
+import demo_itunesdb
+
+#===============================================================================
+# PNG
+#===============================================================================
+
+def _png_chunk(type, data):
+    # CRC isn't checked by the schema
+    return struct.pack('>I', len(data)) + type + data + b'\0\0\0\0'
+
+def png_file(random, scale):
+    """ PNG file of about scale MB, mostly IDAT chunks with some tEXt """
+    chunks = [_png_chunk(b'IHDR', struct.pack('>IIBBBBB', 1024, 1024, 8, 2, 0, 0, 0)),
+              _png_chunk(b'gAMA', struct.pack('>I', 45455))]
+    count = max(1, int(scale * 128))
+    for n in range(count):
+        if n % 4 == 0:
+            text = 'Comment{}\0{}'.format(n, 'x' * random.randrange(16, 256))
+            chunks.append(_png_chunk(b'tEXt', text.encode('ascii')))
+        chunks.append(_png_chunk(b'IDAT', random.randbytes(8192)))
+    chunks.append(_png_chunk(b'IEND', b''))
+    return b'\x89PNG\r\n\x1a\n' + b''.join(chunks), len(chunks)
+
+#===============================================================================
+# iTunesDB
+#===============================================================================
+
+_MHIT_HEADER = 0x184
+_MHOD_TYPES = (1, 3, 4, 5, 6)
+
+def _mhod(random):
+    text = ''.join(chr(random.randrange(0x20, 0x7f))
+                   for n in range(random.randrange(4, 48))).encode('utf_16_le')
+    total = 40 + len(text)
+    return struct.pack('<4sIII8x', b'mhod', 24, total,
+                       random.choice(_MHOD_TYPES)) \
+        + struct.pack('<II8x', 1, len(text)) + text
+
+def _mhit(random, unique_id):
+    mhods = list(_mhod(random) for n in range(random.randrange(2, 6)))
+    header = bytearray(_MHIT_HEADER)
+    struct.pack_into('<4sIIII', header, 0, b'mhit', _MHIT_HEADER,
+                     _MHIT_HEADER + sum(map(len, mhods)), len(mhods), unique_id)
+    struct.pack_into('<I', header, demo_itunesdb.MHIT.offsetof('MediaType'), 1)
+    return bytes(header) + b''.join(mhods)
+
+def itunesdb_file(random, scale):
+    """ iTunesDB of about scale MB, a track list of tracks with 2-5 string
+    objects each """
+    tracks = list(_mhit(random, n) for n in range(max(1, int(scale * 2000))))
+    mhlt_header = demo_itunesdb.MHLT.offsetof('__StartOfHeaderPadding') + 80
+    mhlt = struct.pack('<4sII', b'mhlt', mhlt_header, len(tracks)) \
+        + bytes(mhlt_header - 12) + b''.join(tracks)
+    mhsd_header = 96
+    mhsd = struct.pack('<4sIII', b'mhsd', mhsd_header, mhsd_header + len(mhlt), 1) \
+        + bytes(mhsd_header - 16) + mhlt
+    mhbd_header = 188
+    mhbd = bytearray(mhbd_header)
+    struct.pack_into('<4sII', mhbd, 0, b'mhbd', mhbd_header, mhbd_header + len(mhsd))
+    struct.pack_into('<I', mhbd, demo_itunesdb.MHBD.offsetof('NumberOfChildren'), 1)
+    return bytes(mhbd) + mhsd, len(tracks)
+
+#===============================================================================
+# Route result dump
+#===============================================================================
+
+def route_file(random, scale):
+    """ Route result with about scale MB of links (up to 32767) """
+    links = min(32767, max(1, int(scale * 52428)))
+    header = struct.pack('=IH', random.getrandbits(32), 1) \
+        + struct.pack('=HHH', 0x1234, 0x5678, 7) \
+        + struct.pack('=BBBBBBH', 1, 2, 0, 0, 1, 0, 3) \
+        + struct.pack('=hhhhHHH', links, 0, 0, 0, 0, 0, 0) \
+        + struct.pack('=iiii', 139000000, 35000000, 139100000, 35100000)
+    body = b''.join(struct.pack('=HHHHHHHHhh',
+                                *(random.getrandbits(16) for n in range(8)),
+                                random.randrange(-32768, 32768),
+                                random.randrange(-32768, 32768))
+                    for n in range(links))
+    return header + body, links
@@ -14,5 +14,9 @@ __date__ = '2009/11~2010'
 __liscence__ = 'LGPL'
 
 from .binaryparser import *
+from .parallel import ParseResult, parse_array, parse_many
+from .index import RecordIndex
+from .cache import ParseCache
+from .profiler import FieldStats, ParseProfiler
 from .context_viewer import view_context
 
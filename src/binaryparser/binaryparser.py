@@ -1,21 +1,37 @@
 # -*- coding : utf-8 -*-
 
 import io
+import asyncio
+import os
+import copy
+import collections
+import mmap
+import array
 import struct
+import operator
 import codecs
+import re
 import sys
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 __all__ = ['Adapter', 'Anchor', 'Array', 'ArrayContext',
 'AssertEqual', 'Assertion', 'BInt16', 'BInt32', 'BInt64', 'BYTE',
-'Bin', 'BinaryParserError', 'BitwiseStructure', 'Boolean', 'Bytes',
-'Calculate', 'ConditionalField', 'Constant', 'ContainerField',
+'Bin', 'BinaryParserError', 'BitStream', 'BitwiseStructure', 'Boolean',
+'BufferStream', 'BuildError', 'Bytes',
+'Calculate', 'ColumnContext', 'ConditionalField', 'Constant', 'ContainerField',
 'Contains', 'ContextError', 'DWORD', 'Dump', 'Embed', 'Enum', 'Field',
 'FieldError', 'FieldNameError', 'FormatArray', 'FormatField',
-'FormatStructure', 'FormatUnion', 'Hex', 'IfElse', 'Int16', 'Int32',
+'FormatStructure', 'FormatUnion', 'Hex', 'IfElse', 'IncrementalParser',
+'Int16', 'Int32',
 'Int64', 'Int8', 'InvalidChildField', 'InvalidEnumValue',
 'InvalidFieldName', 'InvalidFieldParameter', 'InvalidFieldSize',
-'InvalidFunctor', 'LInt16', 'LInt32', 'LInt64', 'NoDefaultField',
-'NullField', 'Padding', 'ParseError', 'PrettyPrinter', 'Rename',
+'InvalidFunctor', 'LInt16', 'LInt32', 'LInt64', 'Lazy',
+'LazyArrayContext', 'LazyStructContext', 'NoDefaultField',
+'NullField', 'Padding', 'ParseError', 'PrettyPrinter', 'RecordContext', 'Rename',
 'RepeatUntil', 'Select', 'SizeofError', 'StaticField', 'StreamError',
 'StreamExhausted', 'StreamStateBookmark', 'String', 'StructContext',
 'Structure', 'Switch', 'UBInt16', 'UBInt32', 'UBInt64', 'UInt16',
@@ -48,6 +64,8 @@ class InvalidEnumValue(ParseError):pass
 class FieldNameError(ParseError): pass
 class NoDefaultField(ParseError):pass
 
+class BuildError(BinaryParserError): pass
+
 #===============================================================================
 # Context
 #===============================================================================
@@ -110,6 +128,247 @@ class StructContext(dict):
         # Performance hack...
         self.__order.extend(order)
 
+    def __reduce__(self):
+        # parent and children refer to each other, so they are in state
+        # which is pickled after the object itself
+        return (self.__class__, (), self.__getstate__())
+
+    def __getstate__(self):
+        # zero-copy values are pickled as bytes
+        items = dict((k, v.tobytes() if v.__class__ is memoryview else v)
+                     for k, v in dict.items(self))
+        return self.__name, self.__, self.__order, items
+
+    def __setstate__(self, state):
+        self.__name, self.__, order, items = state
+        self.__order = list(order)
+        dict.update(self, items)
+
+
+class LazyStructContext(StructContext):
+
+    """ Placeholder of a StructContext which is parsed on first access
+
+    The stream must stay open and seekable until the context is accessed,
+    after that parsed result is kept.
+    """
+
+    __slots__ = '_LazyStructContext__source',
+
+    def __init__(self, field, stream, offset, parent=None):
+        super().__init__(name=field.name, parent=parent)
+        self.__source = field, stream, offset
+
+    def load(self):
+        """ Parse the structure now, if it's not parsed yet """
+        if self.__source is None:
+            return self
+        field, stream, offset = self.__source
+        with StreamStateBookmark(stream):
+            stream.seek(offset, io.SEEK_SET)
+            context = field.parse(stream, self.get_parent())
+        self.__source = None
+        self._StructContext__name = context.get_name()
+        dict.update(self, context)
+        self.extend_key_order(context.get_key_order())
+        for value in context.values():
+            # adopt children of parsed context
+            if isinstance(value, (StructContext, RecordContext, ArrayContext,
+                                  LazyArrayContext)) and \
+                value.get_parent() is context:
+                value.__ = self
+        return self
+
+    def is_loaded(self):
+        return self.__source is None
+
+    def __reduce__(self):
+        # pickled as a loaded StructContext
+        return (StructContext, (), StructContext.__getstate__(self.load()))
+
+    def __getitem__(self, key):
+        return StructContext.__getitem__(self.load(), key)
+
+    def __contains__(self, key):
+        return StructContext.__contains__(self.load(), key)
+
+    def __iter__(self):
+        return StructContext.__iter__(self.load())
+
+    def __len__(self):
+        return StructContext.__len__(self.load())
+
+    def __eq__(self, other):
+        if isinstance(other, LazyStructContext):
+            other.load()
+        return StructContext.__eq__(self.load(), other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return StructContext.__repr__(self.load())
+
+    def __dir__(self):
+        return StructContext.__dir__(self.load())
+
+    def keys(self):
+        return StructContext.keys(self.load())
+
+    def values(self):
+        return StructContext.values(self.load())
+
+    def items(self):
+        return StructContext.items(self.load())
+
+    def get(self, key, default=None):
+        return StructContext.get(self.load(), key, default)
+
+    def get_ordered_items(self):
+        return StructContext.get_ordered_items(self.load())
+
+    def get_reversed_items(self):
+        return StructContext.get_reversed_items(self.load())
+
+    def get_name(self):
+        return StructContext.get_name(self.load())
+
+    def get_key_order(self):
+        return StructContext.get_key_order(self.load())
+
+class RecordContext():
+
+    """ Base class of record classes generated for structures, which store
+    parsing result of a structure in __slots__ instead of a dict
+
+    A record acts like a read only StructContext (a mapping with
+    get_ordered_items(), get_parent()...) but field values are plain
+    attributes of the instance.  Record classes are created by
+    Field.slotted() and are shared by structures with same name and field
+    names.
+    """
+
+    __slots__ = '__',
+
+    _name = None
+    _fields = ()
+    _field_set = frozenset()
+
+    def __init__(self, parent=None):
+        self.__ = parent
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self._field_set:
+            raise ContextError('{} has no field {!r}'.format(self._name, key))
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._field_set and hasattr(self, key)
+
+    def __iter__(self):
+        return iter(self.get_key_order())
+
+    def __len__(self):
+        return len(self.get_key_order())
+
+    def __eq__(self, other):
+        if isinstance(other, (RecordContext, StructContext)):
+            return dict(self.items()) == dict(other.items())
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __dir__(self):
+        attrlist = self.get_key_order()
+        attrlist.extend(dir(self.__class__))
+        return attrlist
+
+    def __reduce__(self):
+        # generated classes are recreated by name and field names
+        return (_new_record, (self._name, self._fields),
+                (self.__, list(self.items())))
+
+    def __setstate__(self, state):
+        self.__, items = state
+        for key, value in items:
+            if value.__class__ is memoryview:
+                value = value.tobytes()
+            setattr(self, key, value)
+
+    def keys(self):
+        return self.get_key_order()
+
+    def values(self):
+        return list(value for key, value in self.items())
+
+    def items(self):
+        return list((key, getattr(self, key)) for key in self.get_key_order())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def get_ordered_items(self):
+        for key in self.get_key_order():
+            yield key, getattr(self, key)
+
+    def get_reversed_items(self):
+        for key in reversed(self.get_key_order()):
+            yield key, getattr(self, key)
+
+    def get_parent(self):
+        return self.__
+
+    def get_name(self):
+        return self._name
+
+    def get_key_order(self):
+        return list(key for key in self._fields if hasattr(self, key))
+
+    def extend_key_order(self, order):
+        # order of fields is fixed
+        pass
+
+# generated record classes by (name, field names)
+_record_classes = dict()
+
+def _record_class(name, names):
+    """ Returns the record class of a structure, or None if the names
+    can't be slots """
+    if any(n.startswith('__') for n in names):
+        # private names are mangled in __slots__
+        return None
+    key = name, tuple(names)
+    cls = _record_classes.get(key)
+    if cls is None:
+        cls = type(name or 'Record', (RecordContext,),
+                   {'__slots__': tuple(names), '_name': name,
+                    '_fields': tuple(names), '_field_set': frozenset(names)})
+        cls.__module__ = __name__
+        _record_classes[key] = cls
+    return cls
+
+def _new_record(name, names):
+    cls = _record_class(name, names)
+    return cls.__new__(cls)
 
 class ArrayContext(list):
 
@@ -126,8 +385,145 @@ class ArrayContext(list):
             yield n, item
 
     def get_reversed_items(self):
-        for n, item in reversed(self.__order):
-            yield n, item
+        for n in range(len(self) - 1, -1, -1):
+            yield n, self[n]
+
+    def get_parent(self):
+        return self.__
+
+    def get_name(self):
+        return self.__name
+
+    def to_columns(self):
+        """ Returns a ColumnContext of the elements, which must be
+        StructContext """
+        return ColumnContext.from_records(self, self.__name, self.__)
+
+    def __reduce__(self):
+        # zero-copy values are pickled as bytes
+        return (ArrayContext, (),
+                (None, {'__': self.__, '_ArrayContext__name': self.__name}),
+                (v.tobytes() if v.__class__ is memoryview else v
+                 for v in list.__iter__(self)))
+
+class _WindowArrayContext(ArrayContext):
+
+    """ ArrayContext which keeps only the last window elements, len() is
+    the number of all appended elements.  Non-negative indexes of dropped
+    elements raise IndexError, negative indexes and slices are relative to
+    the window. """
+
+    __slots__ = '_dropped', '_window'
+
+    def __init__(self, name=None, parent=None, window=1):
+        super().__init__(name=name, parent=parent)
+        self._dropped = 0
+        self._window = window
+
+    def append(self, value):
+        list.append(self, value)
+        if list.__len__(self) > self._window:
+            list.__delitem__(self, 0)
+            self._dropped += 1
+
+    def __len__(self):
+        return self._dropped + list.__len__(self)
+
+    def __getitem__(self, index):
+        if isinstance(index, int) and index >= 0:
+            index -= self._dropped
+            if index < 0:
+                raise IndexError('Element is out of the window')
+        return list.__getitem__(self, index)
+
+class LazyArrayContext(collections.abc.Sequence):
+
+    """ Random access array of fixed size elements which are parsed on
+    demand
+
+    Element n is parsed at offset + n * element size of the stream, the
+    stream must stay open and seekable while the context is used.  Parsed
+    elements are not kept unless cache_size is set, in which case the most
+    recently used cache_size elements are kept.  Slicing returns a list.
+    """
+
+    __slots__ = ('__', '_LazyArrayContext__name', '_LazyArrayContext__field',
+                 '_LazyArrayContext__stream', '_LazyArrayContext__offset',
+                 '_LazyArrayContext__itemsize', '_LazyArrayContext__length',
+                 '_LazyArrayContext__cache', '_LazyArrayContext__cache_size')
+
+    def __init__(self, field, stream, offset, itemsize, length,
+                 name=None, parent=None, cache_size=0):
+        self.__ = parent
+        self.__name = name
+        self.__field = field
+        self.__stream = stream
+        self.__offset = offset
+        self.__itemsize = itemsize
+        self.__length = length
+        self.__cache = collections.OrderedDict()
+        self.__cache_size = cache_size
+
+    def __len__(self):
+        return self.__length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._parse(n) for n in range(*index.indices(self.__length)))
+        if index < 0:
+            index += self.__length
+        if not 0 <= index < self.__length:
+            raise IndexError('array index out of range')
+        return self._parse(index)
+
+    def __iter__(self):
+        for n in range(self.__length):
+            yield self._parse(n)
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, LazyArrayContext)):
+            return NotImplemented
+        return len(self) == len(other) and \
+            all(a == b for a, b in zip(self, other))
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{}({}, {})'.format(self.__class__.__name__, self.__name,
+                                   self.__length)
+
+    def __reduce__(self):
+        # pickled as an ArrayContext of parsed elements
+        return (ArrayContext, (),
+                (None, {'__': self.__, '_ArrayContext__name': self.__name}),
+                iter(self))
+
+    def _parse(self, n):
+        cache = self.__cache
+        if n in cache:
+            cache.move_to_end(n)
+            return cache[n]
+        stream = self.__stream
+        with StreamStateBookmark(stream):
+            stream.seek(self.__offset + n * self.__itemsize, io.SEEK_SET)
+            value = self.__field.parse(stream, self)
+        if self.__cache_size:
+            cache[n] = value
+            if len(cache) > self.__cache_size:
+                cache.popitem(last=False)
+        return value
+
+    def get_ordered_items(self):
+        for n in range(self.__length):
+            yield n, self._parse(n)
+
+    def get_reversed_items(self):
+        for n in range(self.__length - 1, -1, -1):
+            yield n, self._parse(n)
 
     def get_parent(self):
         return self.__
@@ -135,6 +531,201 @@ class ArrayContext(list):
     def get_name(self):
         return self.__name
 
+    def to_columns(self):
+        """ Returns a ColumnContext of the elements, which must be
+        StructContext """
+        return ColumnContext.from_records(self, self.__name, self.__)
+
+def _typed_column(values):
+    """ Compact column of values, an array.array if all values are int or
+    all values are float, otherwise a list """
+    if values and all(type(v) is int for v in values):
+        try:
+            return array.array('q', values)
+        except OverflowError:
+            pass
+    elif values and all(type(v) is float for v in values):
+        return array.array('d', values)
+    return list(values)
+
+class ColumnContext(StructContext):
+
+    """ Context object stores parsing result of a columnar array of
+    structures, maps each field name to a column of values of all elements
+    (or a nested ColumnContext for nested structures)
+
+    Columns of int or float values are compact array.array, other columns
+    are lists.  Fields missing from some elements (eg: in a Switch) are
+    None in those rows.
+    """
+
+    __slots__ = ('_ColumnContext__length', '_ColumnContext__keys',
+                 '_ColumnContext__plan')
+
+    def __init__(self, name=None, parent=None, length=0):
+        super().__init__(name=name, parent=parent)
+        self.__length = length
+        self.__keys = None
+        self.__plan = None
+
+    @classmethod
+    def from_records(cls, records, name=None, parent=None):
+        """ Build a ColumnContext from StructContexts """
+        columns = cls(name=name, parent=parent)
+        for record in records:
+            columns.append_record(record)
+        return columns
+
+    def get_length(self):
+        """ Number of rows """
+        return self.__length
+
+    def __getstate__(self):
+        return super().__getstate__() + (self.__length,)
+
+    def __setstate__(self, state):
+        super().__setstate__(state[:-1])
+        self.__length = state[-1]
+
+    def get_row(self, n):
+        """ Returns the n-th row as a StructContext """
+        record = StructContext(name=self.get_name(), parent=self.get_parent())
+        for key, column in self.get_ordered_items():
+            if isinstance(column, ColumnContext):
+                record[key] = column.get_row(n)
+            else:
+                record[key] = column[n]
+        return record
+
+    def append_record(self, record):
+        """ Append values of a StructContext (or None for a missing one) as
+        a new row """
+        if record is not None and self.__keys is not None and \
+            record.get_key_order() == self.__keys:
+            # same fields as previous record, append by the plan
+            getitem = dict.__getitem__ if isinstance(record, dict) else getattr
+            for key, column, kind in self.__plan:
+                value = getitem(record, key)
+                if kind is ColumnContext:
+                    column.append_record(value)
+                elif kind is None or type(value) is kind:
+                    try:
+                        column.append(value)
+                    except OverflowError:
+                        self._append_value(key, column, value)
+                else:
+                    self._append_value(key, column, value)
+            self.__length += 1
+            return
+        self._append_slow(record)
+
+    def _append_slow(self, record):
+        length = self.__length
+        count = 0
+        if record is not None:
+            if not isinstance(record, (StructContext, RecordContext)):
+                raise ContextError('Columns require StructContext, got {!r}'\
+                                   .format(record))
+            for key, value in record.get_ordered_items():
+                column = dict.get(self, key)
+                if column is None:
+                    column = self._new_column(key, value, length)
+                if isinstance(column, ColumnContext):
+                    column.append_record(value)
+                elif column.__class__ is array.array and \
+                    type(value) is (int if column.typecode == 'q' else float):
+                    try:
+                        column.append(value)
+                    except OverflowError:
+                        self._append_value(key, column, value)
+                elif column.__class__ is array.array:
+                    self._append_value(key, column, value)
+                else:
+                    column.append(value)
+                count += 1
+        if count != len(self):
+            # fill missing fields
+            for key, column in self.get_ordered_items():
+                if record is not None and key in record:
+                    continue
+                if isinstance(column, ColumnContext):
+                    column.append_record(None)
+                else:
+                    self._append_value(key, column, None)
+            self.__keys = None
+        else:
+            self.__keys = list(record.get_key_order())
+            self.__plan = list((key, column, self._kind(column))
+                               for key, column in self.get_ordered_items())
+        self.__length = length + 1
+
+    def append_columns(self, other):
+        """ Append all rows of another ColumnContext """
+        length = self.__length
+        for key, column in other.get_ordered_items():
+            mine = dict.get(self, key)
+            if mine is None:
+                if isinstance(column, ColumnContext):
+                    mine = ColumnContext(name=key, parent=self, length=length)
+                elif length == 0:
+                    mine = column[:0]
+                else:
+                    mine = [None] * length
+                self[key] = mine
+            if isinstance(mine, ColumnContext):
+                mine.append_columns(column)
+            elif mine.__class__ is array.array and \
+                (column.__class__ is not array.array or \
+                 column.typecode != mine.typecode):
+                mine = list(mine)
+                dict.__setitem__(self, key, mine)
+                mine.extend(column)
+            else:
+                mine.extend(column)
+        if len(other) != len(self):
+            # fill missing fields
+            missing = other.get_length()
+            for key, mine in self.get_ordered_items():
+                if key in other:
+                    continue
+                if isinstance(mine, ColumnContext):
+                    mine.append_columns(ColumnContext(length=missing))
+                else:
+                    if mine.__class__ is array.array:
+                        mine = list(mine)
+                        dict.__setitem__(self, key, mine)
+                    mine.extend([None] * missing)
+        self.__length = length + other.get_length()
+        self.__keys = None
+
+    def _append_value(self, key, column, value):
+        # value doesn't fit a typed column, convert it to list
+        if column.__class__ is array.array:
+            column = list(column)
+            dict.__setitem__(self, key, column)
+            self.__keys = None
+        column.append(value)
+
+    @staticmethod
+    def _kind(column):
+        if isinstance(column, ColumnContext):
+            return ColumnContext
+        elif column.__class__ is array.array:
+            return int if column.typecode == 'q' else float
+        return None
+
+    def _new_column(self, key, value, length):
+        if isinstance(value, (StructContext, RecordContext)):
+            column = ColumnContext(name=key, parent=self, length=length)
+        elif length == 0 and type(value) is int:
+            column = array.array('q')
+        elif length == 0 and type(value) is float:
+            column = array.array('d')
+        else:
+            column = [None] * length
+        self[key] = column
+        return column
+
 #===============================================================================
 # Public Helper Classes
 #===============================================================================
@@ -150,9 +741,9 @@ class PrettyPrinter():
 
     def pretty_print(self, obj):
         buffer = io.StringIO()
-        if isinstance(obj, StructContext):
+        if isinstance(obj, (StructContext, RecordContext)):
             self._structcontext_pprint(obj, buffer, '')
-        elif isinstance(obj, ArrayContext):
+        elif isinstance(obj, (ArrayContext, LazyArrayContext)):
             self._arraycontext_pprint(obj, buffer, '')
         else:
             raise ContextError('Not a Context')
@@ -170,9 +761,9 @@ class PrettyPrinter():
         for name, value in context.get_ordered_items():
             stream.write(ident1)
             stream.write('{name:{pad}} : '.format(name=name, pad=pad))
-            if isinstance(value, StructContext):
+            if isinstance(value, (StructContext, RecordContext)):
                 self._structcontext_pprint(value, stream, ident2)
-            elif isinstance(value, ArrayContext):
+            elif isinstance(value, (ArrayContext, LazyArrayContext)):
                 self._arraycontext_pprint(value, stream, ident2)
             else:
                 stream.write('{!r}\n'.format(value))
@@ -191,15 +782,89 @@ class PrettyPrinter():
         for name, value in context.get_ordered_items():
             stream.write(ident1)
             stream.write('{name:{pad}} : '.format(name=name, pad=pad))
-            if isinstance(value, StructContext):
+            if isinstance(value, (StructContext, RecordContext)):
                 self._structcontext_pprint(value, stream, ident2)
-            elif isinstance(value, ArrayContext):
+            elif isinstance(value, (ArrayContext, LazyArrayContext)):
                 self._arraycontext_pprint(value, stream, ident2)
             else:
                 stream.write('{!r}\n'.format(value))
         stream.write(ident)
         stream.write(']\n')
 
+class BufferStream():
+
+    """ A seekable binary stream over a bytes-like object (bytes, bytearray,
+    memoryview, mmap...) which does not copy the buffer
+
+    read() returns bytes like other binary streams, read_view() returns a
+    memoryview slice of the buffer without copying it.  Note a buffer
+    which has exported views can't be resized or closed (eg: mmap) until
+    all views are released.
+    """
+
+    __slots__ = '_buffer', '_view', '_is_bytes', '_size', '_offset'
+
+    def __init__(self, buffer, offset=0):
+        view = memoryview(buffer)
+        if view.ndim != 1 or view.format != 'B':
+            view = view.cast('B')
+        self._buffer = buffer
+        self._view = view
+        self._is_bytes = isinstance(buffer, (bytes, mmap.mmap))
+        self._size = len(view)
+        self._offset = offset
+
+    def read(self, size=-1):
+        offset = self._offset
+        if size is None or size < 0:
+            end = self._size
+        else:
+            end = min(offset + size, self._size)
+        if self._is_bytes:
+            data = self._buffer[offset:end]
+        else:
+            data = self._view[offset:end].tobytes()
+        self._offset = offset + len(data)
+        return data
+
+    def read_view(self, size=-1):
+        offset = self._offset
+        if size is None or size < 0:
+            end = self._size
+        else:
+            end = min(offset + size, self._size)
+        view = self._view[offset:end]
+        self._offset = offset + len(view)
+        return view
+
+    def getbuffer(self):
+        return self._view
+
+    def tell(self):
+        return self._offset
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._offset
+        elif whence == io.SEEK_END:
+            offset += self._size
+        elif whence != io.SEEK_SET:
+            raise StreamError('Invalid whence {!r}'.format(whence))
+        if offset < 0:
+            raise StreamError('Negative seek position {}'.format(offset))
+        self._offset = offset
+        return offset
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def close(self):
+        """ Release the buffer, views returned by read_view() are still valid """
+        self._view.release()
+
 class StreamStateBookmark():
 
     """ Remember the stream offset in a with statement """
@@ -351,6 +1016,28 @@ def _is_valid_field_name(n):
 def _is_unique(i):
     return len(i) == len(set(i))
 
+def _reserve(buffer, end):
+    """ Make sure buffer can hold end bytes, a bytearray is extended """
+    if end > len(buffer):
+        if buffer.__class__ is not bytearray:
+            raise BuildError('Buffer too small, {} bytes required'.format(end))
+        buffer.extend(bytes(end - len(buffer)))
+
+def _write(buffer, offset, data):
+    end = offset + len(data)
+    _reserve(buffer, end)
+    buffer[offset:end] = data
+    return end
+
+def _pack_into(formatter, buffer, offset, values):
+    end = offset + formatter.size
+    _reserve(buffer, end)
+    try:
+        formatter.pack_into(buffer, offset, *values)
+    except struct.error as e:
+        raise BuildError('Can\'t pack {!r}: {}'.format(values, e)) from e
+    return end
+
 #===============================================================================
 # Abstract Classes
 #===============================================================================
@@ -381,10 +1068,159 @@ class Field():
         """
         raise NotImplementedError()
 
+    def iterparse(self, stream, path=None, window=1):
+        """ Parse the stream and yield elements of the Array or RepeatUntil
+        at path as soon as they are parsed
+
+        path is dot separated names of structures leading to the array,
+        relative to this field, or None if this field is the array itself.
+        The array context only keeps the last window elements so memory
+        does not grow with the number of elements, len() of it still counts
+        all elements so predicates like c[-1] and len(c) work.  Other fields
+        are parsed as usual, the generator returns the parse result of this
+        field when it's exhausted.
+        """
+        names = path.split('.') if path else []
+        field = self
+        for name in names:
+            if not (isinstance(field, Structure) and \
+                    type(field).parse is Structure.parse):
+                raise InvalidFieldName('{!r} is not a structure'.format(field.name))
+            field = next((f for f in field._child_fields if f.name == name), None)
+            if field is None:
+                raise InvalidFieldName('Field {!r} not found'.format(name))
+        if not isinstance(field, (Array, RepeatUntil)):
+            raise InvalidFieldParameter('Path must lead to an Array or '\
+                                        'RepeatUntil, got {!r}'.format(field))
+        if names:
+            return self._iterparse(stream, None, names, window)
+        else:
+            return self._iterelements(stream, None, window)
+
+    async def parse_async(self, reader):
+        """ Parse data from an asyncio.StreamReader without blocking the
+        event loop
+
+        A field of static size is read with a single readexactly() and
+        parsed as usual.  Otherwise children of structures and arrays are
+        parsed one by one like IncrementalParser does: each run of static
+        fields is awaited with a single readexactly() of its size, other
+        fields are parsed from data read so far and exactly their missing
+        bytes are awaited when it's exhausted.  Data after the parsed field
+        stays in the reader.  Anchors are relative to the start of the
+        field.
+        """
+        size = self.static_size()
+        if size is not None:
+            try:
+                data = await reader.readexactly(size)
+            except asyncio.IncompleteReadError as e:
+                raise StreamExhausted('Expected {} bytes, read {}'\
+                                      .format(size, len(e.partial))) from e
+            return self.parse(BufferStream(data))
+        stream = _FeedStream()
+        generator = _parse_retry(self, stream, None)
+        while True:
+            try:
+                next(generator)
+            except StopIteration as e:
+                return e.value
+            try:
+                data = await reader.readexactly(max(stream._wanted - stream._end, 1))
+            except asyncio.IncompleteReadError as e:
+                data = e.partial
+                stream._eof = True
+            stream.feed(data)
+            stream._wanted = 0
+
+    def parse_buffer(self, buffer, offset=0):
+        """ Parse a bytes-like object from offset, returns (context, offset)
+        where offset is the end of parsed data
+
+        Fields unpack values directly from the buffer at an integer offset
+        instead of calling methods of a file object.
+        """
+        stream = BufferStream(buffer, offset)
+        context = self.parse(stream)
+        return context, stream._offset
+
+    def parse_file(self, filename, sequential=True):
+        """ Parse a file through a read only memory map
+
+        Fields read from a BufferStream over the mapping, so there are no
+        read syscalls and OS page cache is the only buffer.  If sequential
+        is set, the kernel is advised the mapping is read sequentially.
+        Zero-copy fields keep the mapping alive until their views are
+        released.
+        """
+        with open(filename, 'rb') as fp:
+            if os.fstat(fp.fileno()).st_size == 0:
+                # empty files can't be mapped
+                return self.parse(BufferStream(b''))
+            mapping = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if sequential and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mapping.madvise(mmap.MADV_SEQUENTIAL)
+        stream = BufferStream(mapping)
+        try:
+            return self.parse(stream)
+        finally:
+            stream.close()
+            try:
+                mapping.close()
+            except BufferError:
+                # zero-copy values still reference the mapping, it will be
+                # unmapped when they are garbage collected
+                pass
+
+    def build(self, value, context=None):
+        """ Serialize value, which is a parsing result of the field, back
+        to binary data and returns it as a bytearray
+
+        Functors are called with contexts of value as parse() does, so
+        value should be a parsing result or contexts built with the same
+        parent links.  Adapters are reversed, validators are not checked,
+        data of fields without name (eg: Padding) is zero or the pad value.
+        Runs of static fields are packed with a single struct.pack_into()
+        into a buffer preallocated to the static size of the field.
+        """
+        buffer = bytearray(self.static_size() or 0)
+        end = self._build_into(value, context, buffer, 0)
+        del buffer[end:]
+        return buffer
+
+    def build_into(self, value, buffer, offset=0, context=None):
+        """ Serialize value into a writable buffer (bytearray, memoryview,
+        mmap...) at offset, returns offset of end of written data
+
+        A bytearray is extended if data doesn't fit, otherwise BuildError
+        is raised.
+        """
+        return self._build_into(value, context, buffer, offset)
+
+    def _build_into(self, value, context, buffer, offset):
+        raise BuildError('{!r} can\'t be built'.format(self))
+
+    def _pack_values(self, value, context):
+        """ Values of a field which is fused into a larger struct format
+        (see _fusion_item), in the order they are unpacked """
+        raise BuildError('{!r} can\'t be packed'.format(self))
+
     def sizeof(self, context):
         """ Byte size of the field """
         raise SizeofError()
 
+    def static_size(self):
+        """ Byte size of the field if it doesn't depend on context, or
+        None
+
+        It's derived from the layout of fields, functors are never called.
+        """
+        return None
+
+    def is_static(self):
+        """ Whether size of the field doesn't depend on context """
+        return self.static_size() is not None
+
     def is_embedded(self):
         """ Whether the fields in current structure is embedded into
         outer structure """
@@ -394,6 +1230,58 @@ class Field():
         """ Whether the field contains other fields """
         return False
 
+    def compile(self):
+        """ Returns an equivalent field which parses faster
+
+        Containers are turned into generated Python functions with child
+        field access, adapters, validators and context inserts inlined.
+        The field itself is not modified. """
+        return self._replace_children(lambda field: field.compile())
+
+    def lazy(self, cache_size=0):
+        """ Returns an equivalent field which parses nested structures of
+        static size and arrays of static sized elements on first access
+
+        They are skipped and yield LazyStructContext or LazyArrayContext, so
+        the stream must be seekable and stay open until they are accessed.
+        cache_size is the number of parsed elements kept by each array.
+        """
+        def make_lazy(field):
+            field = field.lazy(cache_size)
+            if isinstance(field, Structure) and not field.is_embedded() \
+                and field.is_static():
+                return Lazy(field)
+            if isinstance(field, Array) and not field._columnar and \
+                field._childfield.is_static():
+                return Lazy(field, cache_size)
+            return field
+        return self._replace_children(make_lazy)
+
+    def slotted(self):
+        """ Returns an equivalent field whose structures yield instances of
+        generated record classes with __slots__ (see RecordContext) instead
+        of StructContext
+
+        Records take much less memory and field access in functors is a
+        plain attribute load.  Structures with embedded fields (or fields
+        named with two leading underscores) still yield StructContext, and
+        so do structures on the path of iterparse().
+        """
+        return self._replace_children(lambda field: field.slotted())
+
+    def _replace_children(self, function):
+        """ Returns a copy of the field with every child field replaced by
+        function(child), or the field itself if nothing is replaced """
+        return self
+
+    def _copy(self):
+        # copy whose children are replaced, generated parse() of a compiled
+        # field would call the old children
+        field = copy.copy(self)
+        field.__dict__.pop('parse', None)
+        field.__dict__.pop('_source', None)
+        return field
+
 class StaticField(Field):
 
     """ A field with fixed size """
@@ -407,6 +1295,9 @@ class StaticField(Field):
     def sizeof(self, context):
         return self._size
 
+    def static_size(self):
+        return self._size
+
 class WrapperField(Field):
 
     """ A field wraps a child field, inherit its name if no name
@@ -429,12 +1320,29 @@ class WrapperField(Field):
     def sizeof(self, context):
         return self._childfield.sizeof(context)
 
+    def static_size(self):
+        return self._childfield.static_size()
+
+    def _build_into(self, value, context, buffer, offset):
+        return self._childfield._build_into(value, context, buffer, offset)
+
+    def _pack_values(self, value, context):
+        return self._childfield._pack_values(value, context)
+
     def is_nested(self):
         return self._childfield.is_nested()
 
     def is_embedded(self):
         return self._childfield.is_embedded()
 
+    def _replace_children(self, function):
+        child = function(self._childfield)
+        if child is self._childfield:
+            return self
+        field = self._copy()
+        field._childfield = child
+        return field
+
 class ContainerField(Field):
 
     """ A container of child fields, this can be name-value pairs (aka
@@ -475,6 +1383,17 @@ class Adapter(WrapperField):
     def unpack(self, value):
         raise NotImplementedError()
 
+    def pack(self, value):
+        """ Reverse of unpack(), used when building """
+        raise BuildError('{} can\'t be reversed'.format(self.__class__.__name__))
+
+    def _build_into(self, value, context, buffer, offset):
+        return self._childfield._build_into(self.pack(value), context,
+                                            buffer, offset)
+
+    def _pack_values(self, value, context):
+        return self._childfield._pack_values(self.pack(value), context)
+
 class Validator(WrapperField):
 
     """ Validate parsed value, raise ValidationError if failed """
@@ -488,6 +1407,11 @@ class Validator(WrapperField):
     def validate(self, value):
         raise NotImplementedError()
 
+    def _check(self, value, context):
+        if not self.validate(value):
+            raise ValidationError()
+        return value
+
 class FormatField(StaticField):
 
     """ A static field uses Python build-in struct module to parse
@@ -503,12 +1427,25 @@ class FormatField(StaticField):
         self._formatter = formatter
 
     def parse(self, stream, context):
+        if stream.__class__ is BufferStream:
+            # unpack directly from the buffer, short data is handled by the
+            # normal path below
+            offset = stream._offset
+            if stream._size - offset >= self._formatter.size:
+                stream._offset = offset + self._formatter.size
+                return self._formatter.unpack_from(stream._view, offset)
         data = stream.read(self._formatter.size)
         try:
             return self._formatter.unpack(data)
         except struct.error as e:
             raise StreamExhausted() from e
 
+    def _build_into(self, value, context, buffer, offset):
+        return _pack_into(self._formatter, buffer, offset, value)
+
+    def _pack_values(self, value, context):
+        return tuple(value)
+
 #===============================================================================
 # Integer Fields
 #===============================================================================
@@ -553,6 +1490,20 @@ class _IntegerFieldBase(Field):
     def parse(self, stream, context):
         return self._field.parse(stream, context)[0]
 
+    def _build_into(self, value, context, buffer, offset):
+        if value is None:
+            value = 0
+        return _pack_into(self._field._formatter, buffer, offset, (value,))
+
+    def _pack_values(self, value, context):
+        return (0 if value is None else value,)
+
+    def sizeof(self, context):
+        return self._field.sizeof(context)
+
+    def static_size(self):
+        return self._field.static_size()
+
     def __repr__(self):
         return '{}()'.format(self._field.name)
 
@@ -628,34 +1579,57 @@ class Bytes(WrapperField):
     Length can be a positive integer or a function, which returns a integer
     as bytes length.
 
+    If zerocopy is set, the field yields a memoryview instead.  When parsing
+    a BufferStream the view is a slice of the underlying buffer (or mmap)
+    so no data is copied, call tobytes() if a copy is really needed.  Other
+    streams are read as usual.
     """
 
-    # TODO: This copies data from stream, not efficient when data is large, need
-    # a "stream view" class ...
-
     class _BytesMixin():
 
         def _parse(self, stream, context, length):
-            data = stream.read(length)
+            if self._zerocopy:
+                if isinstance(stream, BufferStream):
+                    data = stream.read_view(length)
+                else:
+                    data = memoryview(stream.read(length))
+            else:
+                data = stream.read(length)
             if len(data) != length:
                 raise StreamExhausted('Expected {} bytes, read {}'\
                                       .format(length, len(data)))
             return data
 
+        def _check_length(self, value, length):
+            if value is None:
+                return bytes(length)
+            if len(value) != length:
+                raise BuildError('Expected {} bytes, got {}'\
+                                 .format(length, len(value)))
+            return value
+
     class _StaticBytes(StaticField, _BytesMixin):
 
-        def __init__(self, length):
+        def __init__(self, length, zerocopy=False):
             super().__init__(None, length)
             self._length = length
+            self._zerocopy = zerocopy
 
         def parse(self, stream, context):
             return self._parse(stream, context, self._length)
 
+        def _build_into(self, value, context, buffer, offset):
+            return _write(buffer, offset, self._check_length(value, self._length))
+
+        def _pack_values(self, value, context):
+            return (self._check_length(value, self._length),)
+
     class _DynamicBytes(Field, _BytesMixin):
 
-        def __init__(self, length_function):
+        def __init__(self, length_function, zerocopy=False):
             super().__init__(None)
             self._length_function = length_function
+            self._zerocopy = zerocopy
 
         def sizeof(self, context):
             return self._length_function(context)
@@ -664,12 +1638,16 @@ class Bytes(WrapperField):
             length = self._length_function(context)
             return self._parse(stream, context, length)
 
-    def __init__(self, name, length):
+        def _build_into(self, value, context, buffer, offset):
+            length = self._length_function(context)
+            return _write(buffer, offset, self._check_length(value, length))
+
+    def __init__(self, name, length, zerocopy=False):
 
         if _is_valid_functor(length):
-            super().__init__(self._DynamicBytes(length), name=name)
+            super().__init__(self._DynamicBytes(length, zerocopy), name=name)
         elif length >= 0:
-            super().__init__(self._StaticBytes(length), name=name)
+            super().__init__(self._StaticBytes(length, zerocopy), name=name)
         else:
             raise InvalidFunctor('Length must be a positive integer or a ' \
                                  'callable object, got {!r}'.format(length))
@@ -720,6 +1698,32 @@ class String(WrapperField):
             else:
                 return string
 
+        def _decode(self, data, context):
+            # decode already read data, used by fused static fields
+            string = data.decode(self._encoding, self._errors)
+            if self._padchar is not None:
+                return string.rstrip(self._padchar)
+            else:
+                return string
+
+        def _encode(self, value, context, length):
+            if self._is_dynamic_encoding:
+                encoding = self._encoding(context)
+            else:
+                encoding = self._encoding
+            value = value or ''
+            data = value.encode(encoding, self._errors)
+            if len(data) > length:
+                raise BuildError('Expected at most {} bytes, got {!r}'\
+                                 .format(length, data))
+            if self._padchar and len(data) < length:
+                # encode padding with the string so there is one BOM
+                padchar = self._padchar
+                unit = len((padchar * 2).encode(encoding)) - len(padchar.encode(encoding))
+                count = (length - len(data)) // unit
+                data = (value + padchar * count).encode(encoding, self._errors)
+            return data + bytes(length - len(data))
+
     class _StaticString(StaticField, _StringMixin):
 
         def __init__(self, length, encoding, errors, padchar):
@@ -730,6 +1734,12 @@ class String(WrapperField):
         def parse(self, stream, context):
             return self._parse(stream, context, self._length)
 
+        def _build_into(self, value, context, buffer, offset):
+            return _write(buffer, offset, self._encode(value, context, self._length))
+
+        def _pack_values(self, value, context):
+            return (self._encode(value, context, self._length),)
+
         def __repr__(self):
             return '{}({})'.format(self.__class__.__name__, self._length)
 
@@ -747,11 +1757,18 @@ class String(WrapperField):
             length = self._length_function(context)
             return self._parse(stream, context, length)
 
+        def _build_into(self, value, context, buffer, offset):
+            length = self._length_function(context)
+            return _write(buffer, offset, self._encode(value, context, length))
+
         def __repr__(self):
             return '{}()'.format(self.__class__.__name__)
 
     class _CString(Field):
 
+        # bytes read ahead at a time when searching the terminator
+        BLOCK_SIZE = 256
+
         def __init__(self, encoding, errors):
             super().__init__(None)
             self._is_dynamic_encoding = _is_valid_functor(encoding)
@@ -768,6 +1785,70 @@ class String(WrapperField):
                 encoding = self._encoding(context)
             else:
                 encoding = self._encoding
+            terminator = _cstring_terminator(encoding)
+            if terminator is None:
+                return self._parse_chars(stream, encoding)
+            if stream.__class__ is BufferStream and stream._is_bytes:
+                # search the buffer directly
+                buffer, start = stream._buffer, stream._offset
+                end = self._find(buffer, terminator, start, start)
+                if end < 0:
+                    stream._offset = stream._size
+                    raise StreamExhausted('Encountered EOF before EOS')
+                stream._offset = end + len(terminator)
+                return buffer[start:end].decode(encoding, self._errors)
+            if stream.__class__ is _FeedStream or not stream.seekable():
+                # incremental parsers would wait for data after the string
+                return self._parse_units(stream, encoding, terminator)
+            data = bytearray()
+            end = -1
+            while end < 0:
+                block = stream.read(self.BLOCK_SIZE)
+                if not block:
+                    raise StreamExhausted('Encountered EOF before EOS')
+                # terminator may span blocks
+                offset = max(len(data) - len(terminator) + 1, 0)
+                data += block
+                end = self._find(data, terminator, offset, 0)
+            # rewind to end of the terminator
+            stream.seek(end + len(terminator) - len(data), io.SEEK_CUR)
+            return data[:end].decode(encoding, self._errors)
+
+        @staticmethod
+        def _find(data, terminator, offset, start):
+            # terminator aligned to code units from start
+            unit = len(terminator)
+            while True:
+                end = data.find(terminator, offset)
+                if end < 0 or (end - start) % unit == 0:
+                    return end
+                offset = end + 1
+
+        def _parse_units(self, stream, encoding, terminator):
+            # don't read ahead, read code unit by code unit
+            unit = len(terminator)
+            data = bytearray()
+            while True:
+                char = stream.read(unit)
+                if len(char) != unit:
+                    raise StreamExhausted('Encountered EOF before EOS')
+                if char == terminator:
+                    return data.decode(encoding, self._errors)
+                data += char
+
+        def _build_into(self, value, context, buffer, offset):
+            if self._is_dynamic_encoding:
+                encoding = self._encoding(context)
+            else:
+                encoding = self._encoding
+            value = value or ''
+            if '\0' in value:
+                raise BuildError('String contains the terminator: {!r}'.format(value))
+            data = (value + '\0').encode(encoding, self._errors)
+            return _write(buffer, offset, data)
+
+        def _parse_chars(self, stream, encoding):
+            # stateful encodings, decode char by char
             reader = codecs.getreader(encoding)(stream, self._errors)
             def char_gen():
                 while True:
@@ -802,6 +1883,25 @@ class String(WrapperField):
         return '{}.{}()'.format(self.__class__.__name__,
                                 self._childfield.__class__.__name__[1:])
 
+# terminators of zero terminated strings by encoding
+_cstring_terminators = dict()
+
+def _cstring_terminator(encoding):
+    """ Encoded '\0' without BOM, or None if it isn't zero bytes which are
+    a code unit of the encoding """
+    try:
+        return _cstring_terminators[encoding]
+    except KeyError:
+        pass
+    # encode twice so the BOM is not counted
+    one, two = '\0'.encode(encoding), '\0\0'.encode(encoding)
+    terminator = two[len(one):]
+    if not terminator or terminator.count(0) != len(terminator) or \
+        len(one) % len(terminator) != 0:
+        terminator = None
+    _cstring_terminators[encoding] = terminator
+    return terminator
+
 #===============================================================================
 # Adapters
 #===============================================================================
@@ -813,6 +1913,9 @@ class Hex(Adapter):
     def unpack(self, value):
         return hex(value)
 
+    def pack(self, value):
+        return int(value, 16)
+
 class Bin(Adapter):
 
     """ Convert adaptee to a binary string """
@@ -820,6 +1923,9 @@ class Bin(Adapter):
     def unpack(self, value):
         return bin(value)
 
+    def pack(self, value):
+        return int(value, 2)
+
 class Boolean(Adapter):
 
     """ Convert adaptee to a boolean value """
@@ -827,6 +1933,9 @@ class Boolean(Adapter):
     def unpack(self, value):
         return bool(value)
 
+    def pack(self, value):
+        return int(value)
+
 
 class Enum(Adapter):
 
@@ -854,6 +1963,13 @@ class Enum(Adapter):
             raise InvalidFieldParameter('Enum values must be unique')
 
         self._enum = dict((v, k) for (k, v) in kwargs.items())
+        self._values = kwargs
+
+    def pack(self, value):
+        try:
+            return self._values[value]
+        except KeyError as e:
+            raise BuildError('{!r} is not an enum name'.format(value)) from e
 
     def unpack(self, value):
         try:
@@ -885,6 +2001,16 @@ class Constant(Validator):
         super().__init__(child)
         self._value = value
 
+    def _build_into(self, value, context, buffer, offset):
+        if value is None:
+            value = self._value
+        return self._childfield._build_into(value, context, buffer, offset)
+
+    def _pack_values(self, value, context):
+        if value is None:
+            value = self._value
+        return self._childfield._pack_values(value, context)
+
     def validate(self, value):
         equal = (self._value == value)
         if not equal:
@@ -917,6 +2043,15 @@ class Assertion(Field):
             raise ValidationError(self._what)
         return None
 
+    def _build_into(self, value, context, buffer, offset):
+        return offset
+
+    def sizeof(self, context):
+        return 0
+
+    def static_size(self):
+        return 0
+
 class Contains(Validator):
 
     # TODO : Replace with a field accepts functor
@@ -952,7 +2087,7 @@ class _EncloseMixin():
             enclosed_context[field.name] = value
 
     @staticmethod
-    def _update_context_plain(stream, context, fields):
+    def _update_context_plain(stream, context, fields, names):
 
         for field in fields:
             value = field.parse(stream, context)
@@ -960,44 +2095,608 @@ class _EncloseMixin():
                 continue
             dict.__setitem__(context, field.name, value)
         else:
-            context.extend_key_order(k.name for k in fields if k.name is not None)
-
-class Structure(ContainerField, _EncloseMixin):
+            context.extend_key_order(names)
 
-    """ All fields in the structure must have unique names.  If field name is
-    None, its parsing result will NOT be added to context.
-    """
+def _split_format(format):
+    """ Split a struct format into (byteorder, body) which can be
+    concatenated with other formats, returns None if it can't
 
-    def __init__(self, name, *fields):
-        # child fields check
-        if not all(isinstance(f, Field) for f in fields):
-            raise InvalidChildField('Child must be a Field')
-        if not _is_unique(list(f.name for f in fields if f.name is not None)):
-            raise InvalidFieldName('Child field names must be unique or None')
+    Byte order is None if the format is not affected by byte order. """
+    if format[:1] in ('@', '=', '<', '>', '!'):
+        byteorder, body = format[0], format[1:]
+    else:
+        byteorder, body = '@', format
+    if not body:
+        return None
+    if byteorder == '!':
+        byteorder = '>'
+    elif byteorder == '@':
+        # native formats are aligned, only fuse them if alignment makes
+        # no difference
+        try:
+            if struct.calcsize('=' + body) != struct.calcsize(format):
+                return None
+        except struct.error:
+            # native only codes (eg: 'P', 'n')
+            return None
+        byteorder = '='
+    if all(ch in '0123456789bBcsx?' for ch in body):
+        byteorder = None
+    return byteorder, body
+
+def _fusion_item(field):
+    """ Describes how a field can be parsed as part of a larger struct
+    format, returns None if it can't
+
+    Returns (byteorder, body, key, converters): the field value is
+    values[key] of the unpacked tuple passed through converters in order,
+    key is None if the field yields no values. """
+    if _is_inlinable(field, _IntegerFieldBase.parse):
+        split = _split_format(field._field._formatter.format)
+        if split is None:
+            return None
+        return split + (0, ())
+    elif _is_inlinable(field, FormatField.parse) or \
+        _is_inlinable(field, FormatStructure.parse):
+        split = _split_format(field._formatter.format)
+        if split is None:
+            return None
+        count = len(field._formatter.unpack(b'\0' * field._formatter.size))
+        if isinstance(field, FormatStructure):
+            converters = (field._from_values,)
+        else:
+            converters = ()
+        return split + (slice(0, count), converters)
+    elif _is_inlinable(field, Bytes._StaticBytes.parse):
+        if field._zerocopy:
+            return None
+        return (None, '{}s'.format(field._length), 0, ())
+    elif _is_inlinable(field, String._StaticString.parse):
+        if field._is_dynamic_encoding:
+            return None
+        return (None, '{}s'.format(field._length), 0, (field._decode,))
+    elif _is_inlinable(field, FormatArray.parse):
+        if field._is_callable:
+            return None
+        return (None, '{}s'.format(field.sizeof(None)), 0, (field._from_bytes,))
+    elif type(field).parse is Structure.parse:
+        # compiled structures parse the same way
+        return field._record_item
+    elif _is_inlinable(field, Padding.parse):
+        if field._is_callable:
+            return None
+        if field._strict:
+            return (None, '{}s'.format(field._size), 0, (field._check,))
+        return (None, '{}x'.format(field._size), None, ())
+    elif _is_inlinable(field, Adapter.parse) or \
+        _is_inlinable(field, Validator.parse) or \
+        _is_inlinable(field, WrapperField.parse):
+        item = _fusion_item(field._childfield)
+        if item is None or item[2] is None:
+            return None
+        byteorder, body, key, converters = item
+        if isinstance(field, Adapter):
+            converters += (lambda value, context: field.unpack(value),)
+        elif isinstance(field, Validator):
+            converters += (field._check,)
+        return byteorder, body, key, converters
+    else:
+        return None
 
-        super().__init__(name)
-        self._child_fields = fields
-        self._embedded_flags = list(f.is_embedded() for f in fields)
-        self._has_embedded_field = any(self._embedded_flags)
+def _fuse_items(fields, items):
+    """ Concatenate fusion items of fields, returns (body, count, members)
+
+    count is the number of unpacked values, members is a list of
+    (field, key, converters) of fields which yield values, with key
+    relative to the concatenated format. """
+    members = list()
+    offset = 0
+    for field, (_, body, key, converters) in zip(fields, items):
+        count = len(struct.unpack('=' + body, b'\0' * struct.calcsize('=' + body)))
+        if isinstance(key, slice):
+            key = slice(offset + key.start, offset + key.stop)
+        elif key is not None:
+            key = offset + key
+        offset += count
+        if key is None or (field.name is None and not converters):
+            continue
+        members.append((field, key, converters))
+    return ''.join(i[1] for i in items), offset, members
+
+_NUMPY_STANDARD_TYPES = {'b': 'i1', 'B': 'u1', 'h': 'i2', 'H': 'u2',
+                         'i': 'i4', 'I': 'u4', 'l': 'i4', 'L': 'u4',
+                         'q': 'i8', 'Q': 'u8', 'e': 'f2', 'f': 'f4',
+                         'd': 'f8', '?': '?'}
+
+def _format_dtypes(format):
+    """ numpy dtypes and offsets of values unpacked by a struct format """
+    if format[:1] in ('@', '=', '<', '>', '!'):
+        byteorder, body = format[0], format[1:]
+    else:
+        byteorder, body = '@', format
+    result = list()
+    done = ''
+    for count, code in re.findall(r'(\d*)(\S)', body):
+        count = int(count) if count else 1
+        if code in 'sx':
+            tokens = ['{}{}'.format(count, code)]
+        else:
+            tokens = [code] * count
+        for token in tokens:
+            # offset with alignment applied
+            offset = struct.calcsize(byteorder + done + token) - \
+                struct.calcsize(byteorder + token)
+            done += token
+            if code == 'x':
+                continue
+            elif code in 'sc':
+                dtype = numpy.dtype('S{}'.format(struct.calcsize(token)))
+            elif byteorder == '@' and code in 'bBhHiIlLqQefd?':
+                dtype = numpy.dtype(code)
+            elif code in _NUMPY_STANDARD_TYPES:
+                dtype = numpy.dtype({'=': '=', '<': '<'}.get(byteorder, '>') + \
+                                    _NUMPY_STANDARD_TYPES[code])
+            else:
+                raise InvalidFieldParameter('No numpy type for format {!r}'\
+                                            .format(format))
+            result.append((dtype, offset))
+    return result
+
+def _numpy_dtype(field):
+    """ numpy dtype of raw values of a static field (adapters and
+    validators are not applied), None for paddings """
+    if numpy is None:
+        raise InvalidFieldParameter('numpy is not available')
+    if isinstance(field, _IntegerFieldBase):
+        return _format_dtypes(field._field._formatter.format)[0][0]
+    elif isinstance(field, FormatField):
+        values = _format_dtypes(field._formatter.format)
+        if isinstance(field, FormatStructure):
+            names = field._field_names
+        elif len(values) == 1:
+            return values[0][0]
+        else:
+            names = list('f{}'.format(n) for n in range(len(values)))
+        members = list((name, dtype, offset) for name, (dtype, offset) \
+                       in zip(names, values) if name is not None)
+        return numpy.dtype({'names': list(m[0] for m in members),
+                            'formats': list(m[1] for m in members),
+                            'offsets': list(m[2] for m in members),
+                            'itemsize': field._formatter.size})
+    elif isinstance(field, (Bytes._StaticBytes, String._StaticString)):
+        return numpy.dtype('S{}'.format(field._length))
+    elif isinstance(field, FormatArray) and not field._is_callable:
+        base = _format_dtypes(field._format)[0][0]
+        return numpy.dtype((base, (field._size,)))
+    elif isinstance(field, Padding) and not field._is_callable:
+        return None
+    elif isinstance(field, (Adapter, Validator)) or \
+        type(field) in (WrapperField, Bytes, String, Embed, Rename, Lazy):
+        return _numpy_dtype(field._childfield)
+    elif type(field).parse is Structure.parse:
+        names, formats, offsets = list(), list(), list()
+        offset = 0
+        for child in field._child_fields:
+            dtype = _numpy_dtype(child)
+            if child.is_embedded():
+                for name in dtype.names:
+                    subtype, suboffset = dtype.fields[name][:2]
+                    names.append(name)
+                    formats.append(subtype)
+                    offsets.append(offset + suboffset)
+            elif dtype is not None and child.name is not None:
+                names.append(child.name)
+                formats.append(dtype)
+                offsets.append(offset)
+            offset += child.sizeof(None)
+        return numpy.dtype({'names': names, 'formats': formats,
+                            'offsets': offsets, 'itemsize': offset})
+    else:
+        raise InvalidFieldParameter('{!r} has no numpy dtype'.format(field))
+
+class _RecordBuilder():
+
+    """ Builds the context of a static structure from its unpacked values,
+    this is the converter of a fused structure """
+
+    def __init__(self, name, members, names, record_class=None):
+        self._name = name
+        self._members = list((f.name, key, converters) for f, key, converters in members)
+        self._names = names
+        self._record_class = record_class
+        # values map to names one by one
+        self._is_plain = list(m[1] for m in self._members) == list(range(len(names))) \
+            and tuple(m[0] for m in self._members) == names \
+            and not any(m[2] for m in self._members)
+
+    def __call__(self, values, context):
+        if self._record_class is not None:
+            return self._build_record(values, context)
+        record = StructContext(name=self._name, parent=context)
+        if self._is_plain:
+            dict.update(record, zip(self._names, values))
+            record.extend_key_order(self._names)
+            return record
+        for name, key, converters in self._members:
+            value = values[key]
+            for converter in converters:
+                value = converter(value, record)
+            if name is not None:
+                dict.__setitem__(record, name, value)
+        record.extend_key_order(self._names)
+        return record
+
+    def _build_record(self, values, context):
+        record = self._record_class(context)
+        setattr_ = object.__setattr__
+        if self._is_plain:
+            for name, value in zip(self._names, values):
+                setattr_(record, name, value)
+            return record
+        for name, key, converters in self._members:
+            value = values[key]
+            for converter in converters:
+                value = converter(value, record)
+            if name is not None:
+                setattr_(record, name, value)
+        return record
 
-    def parse(self, stream, context=None):
+    def extend(self, context, rows):
+        """ Append records built from each values of rows to context """
+        if not self._is_plain or self._record_class is not None:
+            context.extend(self(values, context) for values in rows)
+            return
+        name, names = self._name, self._names
+        append, update = context.append, dict.update
+        for values in rows:
+            record = StructContext(name, context)
+            update(record, zip(names, values))
+            record.extend_key_order(names)
+            append(record)
+
+    def columns(self, columns, context, name, length):
+        """ Build a ColumnContext from unpacked values of many records,
+        transposed into columns """
+        record = ColumnContext(name=name, parent=context, length=length)
+        for name, key, converters in self._members:
+            if len(converters) == 1 and isinstance(converters[0], _RecordBuilder):
+                value = converters[0].columns(columns[key], record, name, length)
+            else:
+                if isinstance(key, slice):
+                    value = list(zip(*columns[key]))
+                else:
+                    value = columns[key]
+                for converter in converters:
+                    value = list(converter(v, record) for v in value)
+                value = _typed_column(value)
+            if name is not None:
+                dict.__setitem__(record, name, value)
+        record.extend_key_order(self._names)
+        return record
+
+class _FusedRun(StaticField):
+
+    """ Parse a run of adjacent static fields with a single read and a
+    single struct.Struct, values are inserted into enclosing context
+    directly so the run itself has no name """
+
+    def __init__(self, fields, items, byteorder, ordered):
+        body, count, members = _fuse_items(fields, items)
+        formatter = struct.Struct(byteorder + body)
+        super().__init__(None, formatter.size)
+        self._fields = fields
+        self._formatter = formatter
+        self._ordered = ordered
+        self._members = list((f.name, key, converters) for f, key, converters in members)
+        self._member_fields = list(f for f, key, converters in members)
+        # runs of plain integers and paddings are packed from a getter
+        if all(isinstance(f, _IntegerFieldBase) and f.name is not None or \
+               isinstance(f, Padding) and not f._strict for f in fields):
+            names = list(f.name for f in fields if f.name is not None)
+            if len(names) == 1:
+                self._getter = lambda context, name=names[0]: (context[name],)
+            else:
+                self._getter = operator.itemgetter(*names)
+        else:
+            self._getter = None
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self._fields)
+
+    def parse(self, stream, context):
+        size = self._formatter.size
+        if stream.__class__ is BufferStream and stream._size - stream._offset >= size:
+            values = self._formatter.unpack_from(stream._view, stream._offset)
+            stream._offset += size
+        else:
+            data = stream.read(size)
+            if len(data) != size:
+                return self._parse_truncated(data, context)
+            values = self._formatter.unpack(data)
+        if self._ordered:
+            setitem = context.__setitem__
+        else:
+            setitem = dict.__setitem__.__get__(context)
+        for name, key, converters in self._members:
+            value = values[key]
+            for converter in converters:
+                value = converter(value, context)
+            if name is not None:
+                setitem(name, value)
+        return None
+
+    def _build_into(self, value, context, buffer, offset):
+        # value is the enclosing context
+        if self._getter is not None:
+            return _pack_into(self._formatter, buffer, offset, self._getter(value))
+        values = list()
+        for field in self._fields:
+            field_value = None if field.name is None else value[field.name]
+            values.extend(field._pack_values(field_value, value))
+        return _pack_into(self._formatter, buffer, offset, values)
+
+    def _parse_truncated(self, data, context):
+        # parse field by field so errors are the same as unfused fields
+        stream = io.BytesIO(data)
+        for field in self._fields:
+            value = field.parse(stream, context)
+            if field.name is None:
+                continue
+            elif self._ordered:
+                context[field.name] = value
+            else:
+                dict.__setitem__(context, field.name, value)
+        return None
+
+    @staticmethod
+    def plan(fields, ordered):
+        """ Group maximal runs of adjacent fusible fields, returns a list of
+        fields and runs """
+        steps = list()
+        run_fields, run_items = list(), list()
+
+        def close_run():
+            # trailing paddings are only skipped, don't make run read them
+            tail = list()
+            while run_items and run_items[-1][2] is None:
+                tail.insert(0, run_fields.pop())
+                run_items.pop()
+            if len(run_fields) > 1:
+                byteorder = next((i[0] for i in run_items if i[0] is not None), '=')
+                steps.append(_FusedRun(list(run_fields), list(run_items),
+                                       byteorder, ordered))
+            else:
+                steps.extend(run_fields)
+            steps.extend(tail)
+            del run_fields[:]
+            del run_items[:]
+
+        for field in fields:
+            item = None if field.is_embedded() else _fusion_item(field)
+            if item is None:
+                close_run()
+                steps.append(field)
+                continue
+            byteorder = next((i[0] for i in run_items if i[0] is not None), None)
+            if item[0] is not None and byteorder is not None and item[0] != byteorder:
+                close_run()
+            run_fields.append(field)
+            run_items.append(item)
+        close_run()
+        return steps
+
+class Structure(ContainerField, _EncloseMixin):
+
+    """ All fields in the structure must have unique names.  If field name is
+    None, its parsing result will NOT be added to context.
+
+    Runs of adjacent static fields (integers, FormatStructure, static Bytes,
+    String and Padding, possibly wrapped by adapters or validators, and
+    structures made of them) are parsed with a single read.
+    """
+
+    def __init__(self, name, *fields):
+        # child fields check
+        if not all(isinstance(f, Field) for f in fields):
+            raise InvalidChildField('Child must be a Field')
+        if not _is_unique(list(f.name for f in fields if f.name is not None)):
+            raise InvalidFieldName('Child field names must be unique or None')
+
+        super().__init__(name)
+        self._setup_child_fields(fields)
+
+    # generated record class of slotted structures
+    _record_class = None
+
+    def _setup_child_fields(self, fields):
+        self._child_fields = fields
+        self._embedded_flags = list(f.is_embedded() for f in fields)
+        self._has_embedded_field = any(self._embedded_flags)
+        self._child_names = tuple(f.name for f in fields if f.name is not None)
+        self._parse_plan = _FusedRun.plan(fields, self._has_embedded_field)
+        self._plan_embedded_flags = list(f.is_embedded() for f in self._parse_plan)
+        if self._record_class is not None:
+            # runs insert values with __setitem__
+            self._record_plan = _FusedRun.plan(fields, True)
+        self._record_item = self._fusion_record(fields)
+        self._setup_layout()
+
+    def _setup_layout(self):
+        # static size and fixed offsets of children don't change, so they
+        # are computed once
+        self._child_offsets = dict()
+        offset = 0
+        for field in self._child_fields:
+            self._add_offsets(field, offset)
+            if offset is not None:
+                size = field.static_size()
+                offset = None if size is None else offset + size
+        self._static_size = offset
+
+    def _add_offsets(self, field, offset):
+        if field.is_embedded():
+            inner = field
+            while isinstance(inner, WrapperField):
+                inner = inner._childfield
+            for name, suboffset in getattr(inner, '_child_offsets', {}).items():
+                self._child_offsets[name] = None if offset is None or \
+                    suboffset is None else offset + suboffset
+        elif field.name is not None:
+            self._child_offsets[field.name] = offset
+
+    def _fusion_record(self, fields):
+        # fusion item of the whole structure, if all children are static
+        self._record_formatter = None
+        if self._has_embedded_field or not fields:
+            return None
+        items = list(_fusion_item(f) for f in fields)
+        if None in items:
+            return None
+        byteorders = set(i[0] for i in items if i[0] is not None)
+        if len(byteorders) > 1:
+            return None
+        body, count, members = _fuse_items(fields, items)
+        builder = _RecordBuilder(self.name, members, self._child_names,
+                                 self._record_class)
+        byteorder = byteorders.pop() if byteorders else None
+        self._record_formatter = struct.Struct((byteorder or '=') + body)
+        return (byteorder, body, slice(0, count), (builder,))
+
+    def parse(self, stream, context=None):
+        if self._record_class is not None:
+            return self._parse_record(stream, context)
         # create my context
         context = StructContext(name=self.name, parent=context)
 
         if self._has_embedded_field:
         # walk through all child fields
-            for n, child_field in enumerate(self._child_fields):
-                self._update_context_embedded(self._embedded_flags[n],
+            for n, child_field in enumerate(self._parse_plan):
+                self._update_context_embedded(self._plan_embedded_flags[n],
                                               stream, context, child_field,
                                               context)
         else:
-            self._update_context_plain(stream, context, self._child_fields)
+            self._update_context_plain(stream, context, self._parse_plan,
+                                       self._child_names)
         return context
 
+    def _build_into(self, value, context, buffer, offset):
+        if self._record_formatter is not None:
+            # all children are packed at once
+            return _pack_into(self._record_formatter, buffer, offset,
+                              self._pack_values(value, context))
+        for field, is_embedded in zip(self._parse_plan, self._plan_embedded_flags):
+            if is_embedded or field.__class__ is _FusedRun:
+                # runs and embedded fields take values from the context
+                field_value = value
+            elif field.name is None:
+                field_value = None
+            else:
+                field_value = value[field.name]
+            offset = field._build_into(field_value, value, buffer, offset)
+        return offset
+
+    def _pack_values(self, value, context):
+        values = list()
+        for field in self._child_fields:
+            field_value = None if field.name is None else value[field.name]
+            values.extend(field._pack_values(field_value, value))
+        return values
+
+    def _parse_record(self, stream, context):
+        record = self._record_class(context)
+        setattr_ = object.__setattr__
+        for field in self._record_plan:
+            value = field.parse(stream, record)
+            if field.name is not None:
+                setattr_(record, field.name, value)
+        return record
+
     def sizeof(self, context):
+        if self._static_size is not None:
+            return self._static_size
         size = 0
         for child_field in self._child_fields:
             size += child_field.sizeof(context)
+        return size
+
+    def static_size(self):
+        return self._static_size
+
+    def offsetof(self, name):
+        """ Byte offset of child field name (or a field of an embedded
+        structure) from start of the structure, None if it depends on
+        context """
+        try:
+            return self._child_offsets[name]
+        except KeyError:
+            raise InvalidFieldName('Field {!r} not found'.format(name))
+
+    def _parse_resume(self, stream, context):
+        return (yield from self._iterparse(stream, context, None, None))
+
+    def _iterparse(self, stream, context, names, window):
+        # parse like parse() child by child, the child on path (if names is
+        # not None) is parsed by a generator
+        context = StructContext(name=self.name, parent=context)
+        for field, is_embedded in zip(self._parse_plan, self._plan_embedded_flags):
+            if names is None or field.name != names[0] or is_embedded:
+                value = yield from _parse_retry(field, stream, context)
+            elif len(names) == 1:
+                value = yield from field._iterelements(stream, context, window)
+            else:
+                value = yield from field._iterparse(stream, context, names[1:], window)
+            if field.name is None:
+                continue
+            elif is_embedded:
+                context.update(value)
+                context.extend_key_order(value.get_key_order())
+            elif self._has_embedded_field:
+                context[field.name] = value
+            else:
+                dict.__setitem__(context, field.name, value)
+        if not self._has_embedded_field:
+            context.extend_key_order(self._child_names)
+        return context
+
+    def to_dtype(self):
+        """ Returns the equivalent numpy structured dtype, requires all
+        child fields to be static
+
+        Fields hold raw values, adapters and validators are not applied.
+        Paddings and fields without name are left as gaps.
+        """
+        return _numpy_dtype(self)
+
+    def compile(self):
+        structure = self._replace_children(_compile_child)
+        if type(structure).parse is not Structure.parse or \
+            structure._record_class is not None:
+            # subclasses (eg: Union) have their own parsing logic
+            return structure
+        return _ParserCompiler().compile_structure(structure)
+
+    def slotted(self):
+        structure = Field.slotted(self)
+        if type(structure).parse is not Structure.parse or \
+            structure._has_embedded_field or \
+            structure._record_class is not None:
+            return structure
+        record_class = _record_class(structure.name, structure._child_names)
+        if record_class is None:
+            return structure
+        # generated parse() of a compiled structure yields StructContext
+        structure = structure._copy()
+        structure._record_class = record_class
+        structure._setup_child_fields(structure._child_fields)
+        return structure
+
+    def _replace_children(self, function):
+        fields = tuple(function(f) for f in self._child_fields)
+        if all(a is b for a, b in zip(fields, self._child_fields)):
+            return self
+        structure = self._copy()
+        structure._setup_child_fields(fields)
+        return structure
 
     def _pretty_print(self, stream, nest_depth):
         ident = '  ' * nest_depth
@@ -1019,9 +2718,14 @@ class Array(ContainerField):
 
     The size can be an integer (thus a static array), or a size function
     which accepts context and returns size (dynamic array).
+
+    Arrays of static fields (see Structure) are read with a single read
+    and decoded by struct.iter_unpack.  If columnar is set, an array of
+    structures yields a ColumnContext instead of an ArrayContext, elements
+    are parsed with the ColumnContext as parent.
     """
 
-    def __init__(self, name, field, size):
+    def __init__(self, name, field, size, columnar=False):
         super().__init__(name)
         self._childfield = field
         if _is_valid_functor(size):
@@ -1032,6 +2736,36 @@ class Array(ContainerField):
             self._size = size
         else:
             raise InvalidFunctor('Size must be a integer or a callable')
+        self._columnar = columnar
+        self._setup_bulk()
+        self._setup_layout()
+        if columnar and self._bulk is not None and self._builder is None:
+            raise InvalidFieldParameter('Columnar array requires structure '\
+                                        'elements, got {!r}'.format(field))
+
+    def _setup_layout(self):
+        self._itemsize = self._childfield.static_size()
+        if self._is_callable or self._itemsize is None:
+            self._static_size = None
+        else:
+            self._static_size = self._size * self._itemsize
+
+    def _setup_bulk(self):
+        item = _fusion_item(self._childfield)
+        self._builder = None
+        if item is None or item[2] is None:
+            self._bulk = None
+            return
+        byteorder, body, key, converters = item
+        formatter = struct.Struct((byteorder or '=') + body)
+        if formatter.size == 0:
+            # elements of no data can't be unpacked in bulk
+            self._bulk = None
+            return
+        count = len(formatter.unpack(b'\0' * formatter.size))
+        self._bulk = formatter, count, key, converters
+        if len(converters) == 1 and isinstance(converters[0], _RecordBuilder):
+            self._builder = converters[0]
 
     def parse(self, stream, context=None):
         context = ArrayContext(name=self.name, parent=context)
@@ -1040,17 +2774,181 @@ class Array(ContainerField):
             size = self._function(context.get_parent())  # always use parent as context
         else:
             size = self._size
-
+        return self._parse_elements(stream, context, size)
+
+    def _parse_elements(self, stream, context, size):
+        # parse size elements into the empty context
+        if self._bulk is not None:
+            return self._parse_bulk(stream, context, size)
+        elif self._columnar:
+            columns = ColumnContext(name=self.name, parent=context.get_parent())
+            for n in range(size):
+                columns.append_record(self._childfield.parse(stream, columns))
+            return columns
         for n in range(size):
             context.append(self._childfield.parse(stream, context))
         return context
 
-    def sizeof(self, context):
+    def _iterelements(self, stream, context, window):
+        elements = _WindowArrayContext(name=self.name, parent=context,
+                                       window=window)
+        return (yield from self._resume_elements(stream, elements, True))
+
+    def _parse_resume(self, stream, context):
+        elements = ArrayContext(name=self.name, parent=context)
+        return (yield from self._resume_elements(stream, elements, False))
+
+    def _resume_elements(self, stream, elements, emit):
+        # parse elements one by one, and yield them if emit is set
+        if self._is_callable:
+            size = self._function(elements.get_parent())
+        else:
+            size = self._size
+        for n in range(size):
+            value = yield from _parse_retry(self._childfield, stream, elements)
+            elements.append(value)
+            if emit:
+                yield value
+        return elements
+
+    def parse_numpy(self, stream, context=None):
+        """ Parse the array into a read only numpy array of the dtype of
+        element field (see Structure.to_dtype)
+
+        Data of a BufferStream is not copied, a regular file is memory
+        mapped, other streams are read into memory.  Values are raw values,
+        adapters and validators are not applied.
+        """
+        dtype = _numpy_dtype(self._childfield)
         if self._is_callable:
+            size = self._function(context)
+        else:
+            size = self._size
+        length = size * dtype.itemsize
+        if stream.__class__ is BufferStream:
+            data = stream.read_view(length)
+        else:
+            try:
+                fileno = stream.fileno()
+            except (OSError, AttributeError):
+                fileno = None
+            offset = stream.tell()
+            if fileno is not None and length and \
+                os.fstat(fileno).st_size >= offset + length:
+                values = numpy.memmap(stream, dtype=dtype, mode='r',
+                                      offset=offset, shape=(size,))
+                stream.seek(offset + length, io.SEEK_SET)
+                return values
+            data = stream.read(length)
+        if len(data) != length:
+            raise StreamExhausted('Expected {} bytes, read {}'\
+                                  .format(length, len(data)))
+        return numpy.frombuffer(data, dtype)
+
+    def _parse_bulk(self, stream, context, size):
+        formatter, count, key, converters = self._bulk
+        length = formatter.size * size
+        if stream.__class__ is BufferStream:
+            data = stream.read_view(length)
+        else:
+            data = stream.read(length)
+        if len(data) != length:
+            # parse element by element so errors are the same as unbatched
+            # parsing
+            stream = io.BytesIO(data)
+            for n in range(size):
+                context.append(self._childfield.parse(stream, context))
+            return context
+        rows = formatter.iter_unpack(data)
+        if self._columnar:
+            columns = list(zip(*rows)) if size else [()] * count
+            return self._builder.columns(columns, context.get_parent(),
+                                         self.name, size)
+        if self._builder is not None:
+            self._builder.extend(context, rows)
+            return context
+        if not converters:
+            context.extend(map(operator.itemgetter(key), rows))
+            return context
+        append = context.append
+        for values in rows:
+            value = values[key]
+            for converter in converters:
+                value = converter(value, context)
+            append(value)
+        return context
+
+    def _build_into(self, value, context, buffer, offset):
+        if self._is_callable:
+            size = self._function(context)
+        else:
+            size = self._size
+        columns = isinstance(value, ColumnContext)
+        length = value.get_length() if columns else len(value)
+        if length != size:
+            raise BuildError('Expected {} elements, got {}'.format(size, length))
+        if self._bulk is not None and 's' not in self._bulk[0].format:
+            # numbers only, struct silently pads or truncates bytes
+            formatter, count, key, converters = self._bulk
+            if self._builder is not None and self._builder._is_plain:
+                # plain static structures
+                names = self._builder._names
+                if columns:
+                    rows = zip(*(value[name] for name in names))
+                else:
+                    getter = operator.itemgetter(*names)
+                    rows = (getter(element) for element in value) \
+                        if len(names) > 1 else ((e[names[0]],) for e in value)
+            elif self._builder is None and not converters and key == 0:
+                rows = ((element,) for element in value)
+            else:
+                rows = None
+            if rows is not None:
+                _reserve(buffer, offset + formatter.size * size)
+                pack_into = formatter.pack_into
+                try:
+                    for row in rows:
+                        pack_into(buffer, offset, *row)
+                        offset += formatter.size
+                except struct.error as e:
+                    raise BuildError('Can\'t pack {!r}: {}'.format(row, e)) from e
+                return offset
+        elements = (value.get_row(n) for n in range(length)) if columns else value
+        build_into = self._childfield._build_into
+        for element in elements:
+            offset = build_into(element, value, buffer, offset)
+        return offset
+
+    def sizeof(self, context):
+        if self._static_size is not None:
+            return self._static_size
+        elif self._is_callable:
             return self._function(context.get_parent()) * self._childfield.sizeof(context)
         else:
             return  self._size * self._childfield.sizeof(context)
 
+    def static_size(self):
+        return self._static_size
+
+    def compile(self):
+        array = self._replace_children(_compile_child)
+        if type(array).parse is not Array.parse or array._bulk is not None \
+            or array._columnar:
+            # bulk decoding is faster than a compiled loop
+            return array
+        return _ParserCompiler().compile_array(array)
+
+    def _replace_children(self, function):
+        array = WrapperField._replace_children(self, function)
+        if array is not self:
+            array._setup_bulk()
+            array._setup_layout()
+        return array
+
+    def lazy(self, cache_size=0):
+        # elements are not wrapped one by one
+        return self._replace_children(lambda field: field.lazy(cache_size))
+
     def _pretty_print(self, stream, nest_depth):
         stream.write('  ' * (nest_depth - 1))
         stream.write('{}({}):\n'.format(self.__class__.__name__,
@@ -1084,6 +2982,26 @@ class FormatStructure(ContainerField, FormatField):
                 context[name] = value
         return context
 
+    def _build_into(self, value, context, buffer, offset):
+        return _pack_into(self._formatter, buffer, offset,
+                          self._pack_values(value, context))
+
+    def _pack_values(self, value, context):
+        return tuple(0 if name is None else value[name]
+                     for name in self._field_names)
+
+    def _from_values(self, values, context):
+        # build context from already unpacked values
+        context = StructContext(name=self.name, parent=context)
+        if None in self._field_names:
+            for name, value in zip(self._field_names, values):
+                if name is not None:
+                    context[name] = value
+        else:
+            dict.update(context, zip(self._field_names, values))
+            context.extend_key_order(self._field_names)
+        return context
+
     def _pretty_print(self, stream, nest_depth):
         stream.write('  ' * nest_depth)
         stream.write('{}({},{!s}):\n'.format(self.__class__.__name__,
@@ -1094,11 +3012,132 @@ class FormatStructure(ContainerField, FormatField):
             stream.write('{}\n'.format(field_name))
 
 class FormatArray(ContainerField):
-    # XXX: not implemented yet...
 
-    """ Uses Python build-in array module to parse data but act like a Array """
+    """ Uses Python build-in array module to parse data but act like a Array
 
-    pass
+    Element type is either a struct style typecode with optional byte order
+    prefix (eg: 'B', '>H', '<d') or an integer field (eg: UBInt16(None)).
+    The size can be an integer or a size function which accepts context.
+
+    All elements are read in one call and parse result is a compact
+    array.array, or a read only numpy array if use_numpy is set.
+    """
+
+    _STANDARD_SIZES = {'b': 1, 'B': 1, 'h': 2, 'H': 2, 'i': 4, 'I': 4,
+                       'l': 4, 'L': 4, 'q': 8, 'Q': 8, 'f': 4, 'd': 8}
+
+    def __init__(self, name, typecode, size, use_numpy=False):
+        super().__init__(name)
+        if isinstance(typecode, _IntegerFieldBase):
+            typecode = typecode._field._formatter.format
+        if not isinstance(typecode, str) or not typecode:
+            raise InvalidFieldParameter('Typecode must be a string or a '\
+                                        'integer field, got {!r}'.format(typecode))
+        if typecode[0] in '@=<>!':
+            byteorder, code = typecode[0], typecode[1:]
+        else:
+            byteorder, code = '@', typecode
+        if code not in self._STANDARD_SIZES:
+            raise InvalidFieldParameter('Invalid typecode {!r}'.format(typecode))
+
+        if byteorder == '@':
+            self._typecode = code
+        else:
+            # find a native typecode with same standard size
+            itemsize = self._STANDARD_SIZES[code]
+            if code in 'fd':
+                candidates = code
+            elif code.isupper():
+                candidates = 'BHILQ'
+            else:
+                candidates = 'bhilq'
+            self._typecode = next(c for c in candidates
+                                  if array.array(c).itemsize == itemsize)
+        self._itemsize = array.array(self._typecode).itemsize
+        self._format = typecode
+        self._byteswap = (byteorder in '<>!') and \
+            ((byteorder == '<') != (sys.byteorder == 'little'))
+
+        if use_numpy:
+            if numpy is None:
+                raise InvalidFieldParameter('numpy is not available')
+            self._dtype = numpy.dtype(self._typecode)
+            if self._byteswap:
+                self._dtype = self._dtype.newbyteorder()
+        self._use_numpy = use_numpy
+
+        if _is_valid_functor(size):
+            self._is_callable = True
+            self._function = size
+        elif _is_positive_integer(size):
+            self._is_callable = False
+            self._size = size
+        else:
+            raise InvalidFunctor('Size must be a integer or a callable')
+
+    def parse(self, stream, context=None):
+        if self._is_callable:
+            size = self._function(context)
+        else:
+            size = self._size
+        length = size * self._itemsize
+        data = stream.read(length)
+        if len(data) != length:
+            raise StreamExhausted('Expected {} bytes, read {}'\
+                                  .format(length, len(data)))
+        return self._from_bytes(data, context)
+
+    def _build_into(self, value, context, buffer, offset):
+        if self._is_callable:
+            size = self._function(context)
+        else:
+            size = self._size
+        if len(value) != size:
+            raise BuildError('Expected {} elements, got {}'.format(size, len(value)))
+        return _write(buffer, offset, self._to_bytes(value))
+
+    def _pack_values(self, value, context):
+        if len(value) != self._size:
+            raise BuildError('Expected {} elements, got {}'\
+                             .format(self._size, len(value)))
+        return (self._to_bytes(value),)
+
+    def _to_bytes(self, value):
+        if numpy is not None and isinstance(value, numpy.ndarray):
+            dtype = numpy.dtype(self._typecode)
+            if self._byteswap:
+                dtype = dtype.newbyteorder()
+            return value.astype(dtype, copy=False).tobytes()
+        if value.__class__ is not array.array or value.typecode != self._typecode \
+            or self._byteswap:
+            value = array.array(self._typecode, value)
+        if self._byteswap:
+            value.byteswap()
+        return value.tobytes()
+
+    def _from_bytes(self, data, context):
+        if self._use_numpy:
+            return numpy.frombuffer(data, self._dtype)
+        values = array.array(self._typecode)
+        values.frombytes(data)
+        if self._byteswap:
+            values.byteswap()
+        return values
+
+    def sizeof(self, context):
+        if self._is_callable:
+            return self._function(context) * self._itemsize
+        else:
+            return self._size * self._itemsize
+
+    def static_size(self):
+        return None if self._is_callable else self._size * self._itemsize
+
+    def _pretty_print(self, stream, nest_depth):
+        stream.write('  ' * (nest_depth - 1))
+        stream.write('{}({},{!s}):\n'.format(self.__class__.__name__,
+                                             self.name if self.name else '',
+                                             self._format))
 
 class RepeatUntil(ContainerField):
 
@@ -1122,12 +3161,52 @@ class RepeatUntil(ContainerField):
             try:
                 context.append(self._childfield.parse(stream, context))
             except StreamExhausted:
-                if self._stop_on_eof:
+                if self._stop_on_eof and _is_closed(stream):
                     break
                 else:
                     raise
         return context
 
+    def _build_into(self, value, context, buffer, offset):
+        build_into = self._childfield._build_into
+        for element in value:
+            offset = build_into(element, value, buffer, offset)
+        return offset
+
+    def _iterelements(self, stream, context, window):
+        elements = _WindowArrayContext(name=self.name, parent=context,
+                                       window=window)
+        return (yield from self._resume_elements(stream, elements, True))
+
+    def _parse_resume(self, stream, context):
+        elements = ArrayContext(name=self.name, parent=context)
+        return (yield from self._resume_elements(stream, elements, False))
+
+    def _resume_elements(self, stream, elements, emit):
+        # parse elements one by one, and yield them if emit is set
+        while True:
+            if self._predict(elements):
+                break
+            try:
+                value = yield from _parse_retry(self._childfield, stream, elements)
+            except StreamExhausted:
+                # an incremental stream is exhausted once it's closed
+                if self._stop_on_eof:
+                    break
+                else:
+                    raise
+            elements.append(value)
+            if emit:
+                yield value
+        return elements
+
+    def _replace_children(self, function):
+        return WrapperField._replace_children(self, function)
+
+    def lazy(self, cache_size=0):
+        # elements are not wrapped one by one
+        return self._replace_children(lambda field: field.lazy(cache_size))
+
     def _pretty_print(self, stream, nest_depth):
         stream.write('  ' * (nest_depth - 1))
         stream.write('{}({}):\n'.format(self.__class__.__name__,
@@ -1164,9 +3243,34 @@ class Union(Structure):
 
         return context
 
+    def _setup_layout(self):
+        # all children start at offset 0
+        self._child_offsets = dict()
+        sizes = list()
+        for field in self._child_fields:
+            self._add_offsets(field, 0)
+            sizes.append(field.static_size())
+        self._static_size = None if None in sizes or not sizes else max(sizes)
+
     def sizeof(self, context):
+        if self._static_size is not None:
+            return self._static_size
         return max(f.sizeof(context) for f in self._child_fields)
 
+    def _build_into(self, value, context, buffer, offset):
+        # children overlap, the first one is written last and wins
+        end = offset
+        for field, is_embedded in reversed(list(zip(self._child_fields,
+                                                    self._embedded_flags))):
+            if is_embedded:
+                field_value = value
+            elif field.name is None:
+                continue
+            else:
+                field_value = value[field.name]
+            end = max(end, field._build_into(field_value, value, buffer, offset))
+        return end
+
 class FormatUnion(Field):
     # TODO:
     """ Union which has C behavior """
@@ -1176,6 +3280,17 @@ class FormatUnion(Field):
 # Conditional Fields
 #===============================================================================
 
+def _build_selected(field, value, context, buffer, offset):
+    # build the field selected by a conditional field, value is the private
+    # context of the conditional field (or context if it's embedded)
+    if field.is_embedded():
+        field_value = value
+    elif field.name is None:
+        field_value = None
+    else:
+        field_value = value[field.name]
+    return field._build_into(field_value, context, buffer, offset)
+
 class Switch(ConditionalField, _EncloseMixin):
 
     """ Select a field according to a given condition variable """
@@ -1229,6 +3344,32 @@ class Switch(ConditionalField, _EncloseMixin):
 
         return private_context
 
+    def _build_into(self, value, context, buffer, offset):
+        condition_key = self._condition_function(context)
+        try:
+            field = self._mapping[condition_key]
+        except KeyError:
+            if self._has_default:
+                field = self._default_field
+            else:
+                raise NoDefaultField('Expected one of {!r}, got {!r}'\
+                                     .format(list(self._mapping.keys()),
+                                             condition_key))
+        return _build_selected(field, value, context, buffer, offset)
+
+    def _replace_children(self, function):
+        mapping = dict((k, function(f)) for k, f in self._mapping.items())
+        default_field = self._default_field
+        if default_field is not None:
+            default_field = function(default_field)
+        if default_field is self._default_field and \
+            all(mapping[k] is f for k, f in self._mapping.items()):
+            return self
+        field = self._copy()
+        field._mapping = mapping
+        field._default_field = default_field
+        return field
+
     def _pretty_print(self, stream, nest_depth):
         stream.write('  ' * nest_depth)
         stream.write('{}()\n'.format(self.__class__.__name__))
@@ -1276,6 +3417,31 @@ class Select(Field, _EncloseMixin):
 
         return private_context
 
+    def _build_into(self, value, context, buffer, offset):
+        for predict, field in self._predict_field_list:
+            if predict(context):
+                break
+        else:
+            if not self._has_default:
+                raise NoDefaultField('No predict matches')
+            field = self._default_field
+        return _build_selected(field, value, context, buffer, offset)
+
+    def _replace_children(self, function):
+        predict_field_list = list((p, function(f))
+                                  for p, f in self._predict_field_list)
+        default_field = self._default_field
+        if default_field is not None:
+            default_field = function(default_field)
+        if default_field is self._default_field and \
+            all(a[1] is b[1] for a, b in zip(predict_field_list,
+                                              self._predict_field_list)):
+            return self
+        field = self._copy()
+        field._predict_field_list = predict_field_list
+        field._default_field = default_field
+        return field
+
 
 class IfElse(Switch):
 
@@ -1360,6 +3526,23 @@ class BitwiseStructure(ContainerField):
                                        ))
             accumated_bit_offset += bit_size
 
+    def sizeof(self, context):
+        return self._int_field.sizeof(context)
+
+    def static_size(self):
+        return self._int_field.static_size()
+
+    def _build_into(self, value, context, buffer, offset):
+        return self._int_field._build_into(self._pack_values(value, context)[0],
+                                           context, buffer, offset)
+
+    def _pack_values(self, value, context):
+        integer = 0
+        for field_name, bit_offset, bit_size, bit_mask in self._child_fields:
+            if field_name is not None:
+                integer |= (value[field_name] << bit_offset) & bit_mask
+        return (integer,)
+
     def parse(self, stream, context=None):
         context = StructContext(name=self.name, parent=context)
         integer = self._int_field.parse(stream, context)
@@ -1379,6 +3562,149 @@ class BitwiseStructure(ContainerField):
             stream.write('  ' * (nest_depth + 1))
             stream.write('{}:{}\n'.format(field_name, bit_size))
 
+class BitStream(ContainerField):
+
+    """ Structure of unsigned integer fields of any bit size packed into
+    whole bytes
+
+    Items of fieldname_bitsize_list are (name, bit_size) for an integer,
+    (name, bit_size, count) for an array of count integers, or (name,
+    list_of_items) for a nested structure, name None leaves bits unused.
+    The total bit size must be a multiple of 8.
+
+    All bytes are read at once and converted by int.from_bytes.  With big
+    byte order fields are taken from the most significant bit of the first
+    byte (network order), with little byte order fields start at the least
+    significant bit of the first byte.
+    """
+
+    def __init__(self, name, fieldname_bitsize_list, byteorder='big'):
+        super().__init__(name)
+        if byteorder not in ('big', 'little'):
+            raise InvalidFieldParameter('Byte order must be one of '\
+                                        '"big" or "little", got {}'\
+                                        .format(byteorder))
+        self._byteorder = byteorder
+        self._items = list(fieldname_bitsize_list)
+        total_bit_size = self._count_bits(self._items)
+        if total_bit_size % 8 != 0:
+            raise InvalidFieldParameter('Bit size count must be a multiple '\
+                                        'of 8, got {}'.format(total_bit_size))
+        self._size = total_bit_size // 8
+        self._layout = self._plan(self._items, 0, total_bit_size)
+
+    @classmethod
+    def _count_bits(cls, items):
+        if not _is_unique(list(i[0] for i in items if i[0] is not None)):
+            raise InvalidFieldName('Field names must be unique or None')
+        bit_size = 0
+        for item in items:
+            if not _is_valid_field_name(item[0]):
+                raise InvalidFieldName(item[0])
+            if len(item) == 2 and isinstance(item[1], (list, tuple)):
+                bit_size += cls._count_bits(item[1])
+                continue
+            if len(item) not in (2, 3) or \
+                not all(_is_positive_integer(i) for i in item[1:]):
+                raise InvalidFieldParameter('Expected (name, bit_size), '\
+                                            '(name, bit_size, count) or '\
+                                            '(name, items), got {!r}'\
+                                            .format(item))
+            bit_size += item[1] * (item[2] if len(item) == 3 else 1)
+        return bit_size
+
+    def _plan(self, items, bit_offset, total_bit_size):
+        # (name, shift, mask, count, nested layout) of items
+        layout = list()
+        for item in items:
+            if len(item) == 2 and isinstance(item[1], (list, tuple)):
+                nested = self._plan(item[1], bit_offset, total_bit_size)
+                bit_offset += self._count_bits(item[1])
+                if item[0] is not None:
+                    layout.append((item[0], None, None, None, nested))
+                continue
+            bit_size = item[1]
+            count = item[2] if len(item) == 3 else None
+            if self._byteorder == 'big':
+                # shift of the first element, following elements shift less
+                shift = total_bit_size - bit_offset - bit_size
+                step = -bit_size
+            else:
+                shift = bit_offset
+                step = bit_size
+            bit_offset += bit_size * (count or 1)
+            if item[0] is not None:
+                layout.append((item[0], shift, (1 << bit_size) - 1,
+                               None if count is None else (count, step), None))
+        return layout
+
+    def sizeof(self, context):
+        return self._size
+
+    def static_size(self):
+        return self._size
+
+    def parse(self, stream, context=None):
+        data = stream.read(self._size)
+        if len(data) != self._size:
+            raise StreamExhausted('Expected {} bytes, read {}'\
+                                  .format(self._size, len(data)))
+        integer = int.from_bytes(data, self._byteorder)
+        return self._build(self.name, self._layout, integer, context)
+
+    def _build_into(self, value, context, buffer, offset):
+        integer = self._pack_integer(self._layout, value)
+        return _write(buffer, offset, integer.to_bytes(self._size, self._byteorder))
+
+    def _pack_integer(self, layout, value):
+        integer = 0
+        for field_name, shift, mask, array, nested in layout:
+            field_value = value[field_name]
+            if nested is not None:
+                integer |= self._pack_integer(nested, field_value)
+            elif array is not None:
+                count, step = array
+                if len(field_value) != count:
+                    raise BuildError('Expected {} elements, got {}'\
+                                     .format(count, len(field_value)))
+                for n, element in enumerate(field_value):
+                    integer |= (element & mask) << (shift + n * step)
+            else:
+                integer |= (field_value & mask) << shift
+        return integer
+
+    def _build(self, name, layout, integer, parent):
+        context = StructContext(name=name, parent=parent)
+        for field_name, shift, mask, array, nested in layout:
+            if nested is not None:
+                value = self._build(field_name, nested, integer, context)
+            elif array is not None:
+                count, step = array
+                value = ArrayContext(name=field_name, parent=context)
+                value.extend((integer >> (shift + n * step)) & mask
+                             for n in range(count))
+            else:
+                value = (integer >> shift) & mask
+            dict.__setitem__(context, field_name, value)
+        context.extend_key_order(list(item[0] for item in layout))
+        return context
+
+    def _pretty_print(self, stream, nest_depth):
+        stream.write('  ' * nest_depth)
+        stream.write('{}({},{}):\n'.format(self.__class__.__name__,
+                                          self.name if self.name else '',
+                                          self._byteorder))
+        self._pretty_print_items(stream, nest_depth + 1, self._items)
+
+    def _pretty_print_items(self, stream, nest_depth, items):
+        for item in items:
+            stream.write('  ' * nest_depth)
+            if len(item) == 2 and isinstance(item[1], (list, tuple)):
+                stream.write('{}:\n'.format(item[0]))
+                self._pretty_print_items(stream, nest_depth + 1, item[1])
+            else:
+                stream.write('{}:{}\n'.format(item[0], 'x'.join(map(str, item[1:]))))
+
 
 #===============================================================================
 # Special Purpose Fields
@@ -1395,12 +3721,18 @@ class NullField(Field):
     def parse(self, stream, context):
         return
 
+    def _build_into(self, value, context, buffer, offset):
+        return offset
+
     def __repr__(self):
         return '{}()'.format(self.__class__.__name__)
 
     def sizeof(self, context):
         return 0
 
+    def static_size(self):
+        return 0
+
     def is_nested(self):
         return False
 
@@ -1436,10 +3768,25 @@ class Padding(Field):
         else:
             data = stream.read(size)
             if self._strict:
-                if any(ch != self._pad for ch in data):
-                    raise ValidationError('Expected {}, got {}'\
-                                          .format(self._pad * size,
-                                                  data))
+                self._check(data, context)
+        return None
+
+    def _build_into(self, value, context, buffer, offset):
+        if self._is_callable:
+            size = self._function(context)
+        else:
+            size = self._size
+        return _write(buffer, offset, bytes((self._pad,)) * size)
+
+    def _pack_values(self, value, context):
+        # paddings which are not checked are gaps of the format
+        return (bytes((self._pad,)) * self._size,) if self._strict else ()
+
+    def _check(self, data, context):
+        if any(ch != self._pad for ch in data):
+            raise ValidationError('Expected {}, got {}'\
+                                  .format(self._pad * len(data),
+                                          data))
         return None
     def sizeof(self, context):
         if self._is_callable:
@@ -1447,6 +3794,9 @@ class Padding(Field):
         else:
             return self._size
 
+    def static_size(self):
+        return None if self._is_callable else self._size
+
 class Rename(WrapperField):
 
     """ Rename a child field """
@@ -1454,6 +3804,72 @@ class Rename(WrapperField):
     def __init__(self, name, child_field):
         super().__init__(child_field, name=name)
 
+def _require(stream, offset, size):
+    """ Raise StreamExhausted unless a seekable stream has size bytes after
+    offset (its current position), without reading them """
+    if stream.__class__ is BufferStream:
+        available = stream._size - offset
+    else:
+        available = stream.seek(0, io.SEEK_END) - offset
+        stream.seek(offset, io.SEEK_SET)
+    if available < size:
+        if stream.__class__ is _FeedStream:
+            # wait for the data as a read would
+            stream._wanted = max(stream._wanted, offset + size)
+        raise StreamExhausted('Expected {} bytes, read {}'\
+                              .format(size, max(available, 0)))
+
+class Lazy(WrapperField):
+
+    """ Skip a static sized structure or an array of static sized elements
+    and parse it on first access
+
+    A structure yields a LazyStructContext and an array yields a
+    LazyArrayContext, which record stream offset of the data and require a
+    seekable stream which stays open.  A BufferStream is not required to
+    stay open, the context keeps its buffer alive instead (so parse_file()
+    works).  cache_size is passed to LazyArrayContext.
+
+    If the size can't be determined without parsing, or the stream is not
+    seekable, the field is parsed as usual.  StreamExhausted is raised at
+    once if the stream is shorter than the skipped data.
+    """
+
+    def __init__(self, field, cache_size=0):
+        super().__init__(field)
+        self._cache_size = cache_size
+        if isinstance(field, Array):
+            self._size = field._childfield.static_size()
+        else:
+            self._size = field.static_size()
+
+    def parse(self, stream, context):
+        if self._size is None or not stream.seekable():
+            return self._childfield.parse(stream, context)
+        field = self._childfield
+        offset = stream.tell()
+        if isinstance(field, Array):
+            if field._is_callable:
+                length = field._function(context)
+            else:
+                length = field._size
+            size = length * self._size
+        else:
+            size = self._size
+        _require(stream, offset, size)
+        stream.seek(size, io.SEEK_CUR)
+        if stream.__class__ is BufferStream:
+            stream = BufferStream(stream._buffer)
+        if isinstance(field, Array):
+            return LazyArrayContext(field._childfield, stream, offset,
+                                    self._size, length, name=field.name,
+                                    parent=context,
+                                    cache_size=self._cache_size)
+        return LazyStructContext(field, stream, offset, context)
+
+    def lazy(self, cache_size=0):
+        return self
+
 class Calculate(StaticField):
     """ Calculate a field value from context without parsing the stream """
 
@@ -1464,6 +3880,9 @@ class Calculate(StaticField):
     def parse(self, stream, context):
         return self._calculator(context)
 
+    def _build_into(self, value, context, buffer, offset):
+        return offset
+
 #===============================================================================
 # Stream Position Related Fields
 #===============================================================================
@@ -1478,6 +3897,9 @@ class Anchor(StaticField):
     def parse(self, stream, context):
         return stream.tell()
 
+    def _build_into(self, value, context, buffer, offset):
+        return offset
+
 #===============================================================================
 # Debug Helper Fields
 #===============================================================================
@@ -1544,5 +3966,445 @@ class Dump(WrapperField):
             print (hex_dump(stream, offset, self._hexdumpsize))
             raise
 
+#===============================================================================
+# Incremental Parsing
+#===============================================================================
+
+# yielded by parsing generators when fed data is not enough
+_NEED_DATA = object()
+
+def _is_closed(stream):
+    # a feed stream is not at end until it's closed
+    return stream.__class__ is not _FeedStream or stream._eof
+
+def _is_resumable(field):
+    # containers which parse children one by one, so parsing can resume
+    # at the child which is short of data
+    parse = type(field).parse
+    if parse is Structure.parse:
+        return field._record_class is None
+    elif parse is Array.parse:
+        return field._bulk is None and not field._columnar
+    return parse is RepeatUntil.parse
+
+def _parse_retry(field, stream, context):
+    """ Generator parses a field, returns parsing result
+
+    If the stream is a _FeedStream which is not closed yet, _NEED_DATA is
+    yielded until all data of a static field is fed, then it's parsed once.
+    Structures, Array and RepeatUntil keep children parsed so far, only the
+    child short of data is parsed again.  Other fields are rewound when
+    data is exhausted, and parsed again after _NEED_DATA is yielded.
+    """
+    if stream.__class__ is not _FeedStream:
+        return field.parse(stream, context)
+    size = field.static_size()
+    if size is not None:
+        end = stream.tell() + size
+        while stream._end < end and not stream._eof:
+            stream._wanted = max(stream._wanted, end)
+            yield _NEED_DATA
+        return field.parse(stream, context)
+    if _is_resumable(field):
+        return (yield from field._parse_resume(stream, context))
+    while True:
+        offset = stream.tell()
+        if isinstance(context, StructContext):
+            order_length = len(context.get_key_order())
+        try:
+            return field.parse(stream, context)
+        except StreamExhausted:
+            if stream._eof:
+                raise
+        stream.seek(offset, io.SEEK_SET)
+        if isinstance(context, StructContext):
+            # forget keys inserted by partially parsed field
+            del context.get_key_order()[order_length:]
+        yield _NEED_DATA
+
+class _FeedStream():
+
+    """ A growing in memory stream, data before the last discard() point
+    is released but offsets stay absolute """
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._origin = 0
+        self._end = 0
+        self._wanted = 0
+        self._eof = False
+
+    def feed(self, data):
+        buffer = self._buffer
+        position = buffer.tell()
+        buffer.seek(0, io.SEEK_END)
+        buffer.write(data)
+        buffer.seek(position, io.SEEK_SET)
+        self._end += len(data)
+
+    def discard(self):
+        """ Release data before current offset """
+        position = self._buffer.tell()
+        self._buffer = io.BytesIO(self._buffer.read())
+        self._origin += position
+
+    def read(self, size=-1):
+        data = self._buffer.read(size)
+        if size is not None and 0 <= len(data) < size:
+            # remember how much data the parser is waiting for
+            self._wanted = max(self._wanted, self.tell() - len(data) + size)
+        return data
+
+    def tell(self):
+        return self._origin + self._buffer.tell()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            offset -= self._origin
+            if offset < 0:
+                raise StreamError('Data before offset {} is discarded'\
+                                  .format(self._origin))
+        return self._origin + self._buffer.seek(offset, whence)
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+class IncrementalParser():
+
+    """ Push parser which parses data as it's fed
+
+    Without a path, the field is parsed repeatedly and feed() returns each
+    parsing result once all its data is fed.  With a path, feed() returns
+    elements of the Array or RepeatUntil at path (see Field.iterparse) and
+    result is the parsing result of the field once it's completed, data fed
+    after that is ignored.
+
+    Parsing state is kept between feed() calls, the innermost field which
+    is short of data is parsed again from its start when enough data is
+    fed, fields and elements parsed before (including children of
+    structures and arrays being parsed) are not parsed again.
+    """
+
+    def __init__(self, field, path=None, window=1):
+        self._stream = _FeedStream()
+        self._path = path
+        self._result = None
+        if path is None:
+            self._generator = self._iterparse(field)
+        else:
+            self._generator = field.iterparse(self._stream, path, window)
+
+    def _iterparse(self, field):
+        stream = self._stream
+        while True:
+            if stream.tell() >= stream._end:
+                if stream._eof:
+                    return None
+                yield _NEED_DATA
+                continue
+            yield (yield from _parse_retry(field, stream, None))
+
+    @property
+    def result(self):
+        """ Parsing result of the field when a path is given, None until
+        it's completed """
+        return self._result
+
+    def feed(self, data):
+        """ Add data, returns a list of completed parsing results or
+        elements """
+        stream = self._stream
+        if stream._eof:
+            raise StreamError('Parser is closed')
+        stream.feed(data)
+        if stream._end < stream._wanted:
+            return []
+        return self._run()
+
+    def close(self):
+        """ Signal the end of data, returns remaining parsing results or
+        elements.  Raises StreamExhausted if data ends in the middle of a
+        field. """
+        self._stream._eof = True
+        return self._run()
+
+    def _run(self):
+        stream = self._stream
+        results = list()
+        if self._generator is None:
+            return results
+        stream._wanted = 0
+        while True:
+            try:
+                value = next(self._generator)
+            except StopIteration as e:
+                self._generator = None
+                self._result = e.value
+                break
+            if value is _NEED_DATA:
+                break
+            results.append(value)
+        # release parsed data once it's large enough
+        position = stream.tell() - stream._origin
+        if position > 65536 and position * 2 > stream._end - stream._origin:
+            stream.discard()
+        return results
+
+#===============================================================================
+# Compiler
+#===============================================================================
+
+def _compile_child(field):
+    # structures of static fields are fused into their parent instead
+    if type(field).parse is Structure.parse and field._record_item is not None:
+        return field
+    return field.compile()
+
+def _is_inlinable(field, method):
+    """ Whether field parses exactly like given method, instead of a
+    subclass or compiled override """
+    return type(field).parse is method and 'parse' not in vars(field)
+
+class _ParserCompiler():
+
+    """ Generates a specialized parse function for a container field
+
+    The generated function has two bodies, one reads from a file-like
+    stream, the other unpacks directly from the buffer of a BufferStream
+    and keeps current offset in a local variable.  Generated code uses
+    these local names: stream, read, view, offset, end, length, context,
+    value and values, everything else is bound into function globals.
+    """
+
+    _BUILTIN_ADAPTERS = {
+        Hex.unpack: 'hex',
+        Bin.unpack: 'bin',
+        Boolean.unpack: 'bool',
+        }
+
+    def __init__(self):
+        self._namespace = {
+            'StructContext': StructContext,
+            'ArrayContext': ArrayContext,
+            'BufferStream': BufferStream,
+            'StreamExhausted': StreamExhausted,
+            'ValidationError': ValidationError,
+            'struct_error': struct.error,
+            'setitem': dict.__setitem__,
+            }
+        self._lines = list()
+        self._buffer_mode = False
+
+    def _bind(self, obj):
+        name = '_{}'.format(len(self._namespace))
+        self._namespace[name] = obj
+        return name
+
+    def _emit(self, indent, line):
+        self._lines.append('    ' * indent + line)
+
+    def _emit_read(self, zerocopy, indent):
+        """ Emit statements which read "length" bytes into "value" """
+        emit = self._emit
+        if self._buffer_mode and zerocopy:
+            emit(indent, 'value = view[offset:offset + length]')
+        elif self._buffer_mode:
+            emit(indent, 'value = view[offset:offset + length].tobytes()')
+        elif zerocopy:
+            emit(indent, 'value = memoryview(read(length))')
+        else:
+            emit(indent, 'value = read(length)')
+        emit(indent, 'if len(value) != length:')
+        if self._buffer_mode:
+            emit(indent + 1, 'stream._offset = end')
+        emit(indent + 1, 'raise StreamExhausted("Expected {} bytes, read {}"'\
+                         '.format(length, len(value)))')
+        if self._buffer_mode:
+            emit(indent, 'offset += length')
+
+    def _emit_unpack(self, formatter, suffix, indent):
+        """ Emit statements which unpack a struct into "value" """
+        emit = self._emit
+        if self._buffer_mode:
+            emit(indent, 'value = {}(view, offset){}'.format(self._bind(formatter.unpack_from),
+                                                           suffix))
+            emit(indent, 'offset += {}'.format(formatter.size))
+        else:
+            emit(indent, 'value = {}(read({})){}'.format(self._bind(formatter.unpack),
+                                                        formatter.size, suffix))
+
+    def _emit_value(self, field, indent, unpacked=False):
+        """ Emit statements which parse the field into variable "value"
+
+        If unpacked is set, raw value of a fused field is already in "value"
+        and only conversions are emitted. """
+        emit = self._emit
+        if unpacked and not isinstance(field, WrapperField):
+            # leaf of a fused field, only convert raw value
+            for converter in _fusion_item(field)[3]:
+                emit(indent, 'value = {}(value, context)'.format(self._bind(converter)))
+        elif _is_inlinable(field, _IntegerFieldBase.parse):
+            self._emit_unpack(field._field._formatter, '[0]', indent)
+        elif _is_inlinable(field, FormatField.parse):
+            self._emit_unpack(field._formatter, '', indent)
+        elif _is_inlinable(field, Bytes._StaticBytes.parse):
+            emit(indent, 'length = {}'.format(field._length))
+            self._emit_read(field._zerocopy, indent)
+        elif _is_inlinable(field, Bytes._DynamicBytes.parse):
+            emit(indent, 'length = {}(context)'.format(self._bind(field._length_function)))
+            self._emit_read(field._zerocopy, indent)
+        elif _is_inlinable(field, Adapter.parse):
+            self._emit_value(field._childfield, indent, unpacked)
+            unpack = type(field).unpack
+            if unpack in self._BUILTIN_ADAPTERS:
+                emit(indent, 'value = {}(value)'.format(self._BUILTIN_ADAPTERS[unpack]))
+            elif unpack is Enum.unpack:
+                emit(indent, 'try:')
+                emit(indent + 1, 'value = {}[value]'.format(self._bind(field._enum)))
+                emit(indent, 'except KeyError:')
+                emit(indent + 1, 'value = {}(value)'.format(self._bind(field.unpack)))
+            else:
+                emit(indent, 'value = {}(value)'.format(self._bind(field.unpack)))
+        elif _is_inlinable(field, Validator.parse):
+            self._emit_value(field._childfield, indent, unpacked)
+            emit(indent, 'if not {}(value):'.format(self._bind(field.validate)))
+            emit(indent + 1, 'raise ValidationError()')
+        elif _is_inlinable(field, AssertEqual.parse):
+            self._emit_value(field._childfield, indent)
+            emit(indent, 'expected = {}(context)'.format(self._bind(field._functor)))
+            emit(indent, 'if expected != value:')
+            emit(indent + 1, 'raise ValidationError("Expected value {!r}, got {!r}"'\
+                             '.format(expected, value))')
+        elif _is_inlinable(field, WrapperField.parse):
+            self._emit_value(field._childfield, indent, unpacked)
+        elif _is_inlinable(field, Calculate.parse):
+            emit(indent, 'value = {}(context)'.format(self._bind(field._calculator)))
+        elif _is_inlinable(field, Anchor.parse):
+            if self._buffer_mode:
+                emit(indent, 'value = offset')
+            else:
+                emit(indent, 'value = stream.tell()')
+        elif _is_inlinable(field, Assertion.parse):
+            emit(indent, 'if not {}(context):'.format(self._bind(field._functor)))
+            emit(indent + 1, 'raise ValidationError({!r})'.format(field._what))
+            emit(indent, 'value = None')
+        elif _is_inlinable(field, NullField.parse):
+            emit(indent, 'value = None')
+        elif self._buffer_mode:
+            # let the field parse stream at current offset
+            emit(indent, 'stream._offset = offset')
+            emit(indent, 'value = {}(stream, context)'.format(self._bind(field.parse)))
+            emit(indent, 'offset = stream._offset')
+        else:
+            emit(indent, 'value = {}(stream, context)'.format(self._bind(field.parse)))
+
+    def _emit_insert(self, name, is_embedded, is_ordered, indent):
+        emit = self._emit
+        if name is None:
+            return
+        elif is_embedded:
+            emit(indent, 'context.update(value)')
+            emit(indent, 'context.extend_key_order(value.get_key_order())')
+        elif is_ordered:
+            emit(indent, 'context[{!r}] = value'.format(name))
+        else:
+            emit(indent, 'setitem(context, {!r}, value)'.format(name))
+
+    def _emit_fused_run(self, run, is_ordered, indent):
+        emit = self._emit
+        size = run._formatter.size
+        if self._buffer_mode:
+            emit(indent, 'if end - offset < {}:'.format(size))
+            emit(indent + 1, 'values = view[offset:end].tobytes()')
+            emit(indent + 1, 'stream._offset = offset = end')
+        else:
+            emit(indent, 'values = read({})'.format(size))
+            emit(indent, 'if len(values) != {}:'.format(size))
+        emit(indent + 1, '{}(values, context)'.format(self._bind(run._parse_truncated)))
+        emit(indent, 'else:')
+        if self._buffer_mode:
+            emit(indent + 1, 'values = {}(view, offset)'.format(self._bind(run._formatter.unpack_from)))
+            emit(indent + 1, 'offset += {}'.format(size))
+        else:
+            emit(indent + 1, 'values = {}(values)'.format(self._bind(run._formatter.unpack)))
+        for (name, key, converters), field in zip(run._members, run._member_fields):
+            emit(indent + 1, 'value = values[{!r}]'.format(key))
+            self._emit_value(field, indent + 1, unpacked=True)
+            self._emit_insert(name, False, is_ordered, indent + 1)
+
+    def _emit_bodies(self, emit_body, indent):
+        """ Emit both buffer and stream mode of the body """
+        emit = self._emit
+        emit(indent, 'if stream.__class__ is BufferStream:')
+        emit(indent + 1, 'view = stream._view')
+        emit(indent + 1, 'offset = stream._offset')
+        emit(indent + 1, 'end = stream._size')
+        emit(indent + 1, 'try:')
+        self._buffer_mode = True
+        emit_body(indent + 2)
+        emit(indent + 1, 'except struct_error as e:')
+        emit(indent + 2, 'stream._offset = end')
+        emit(indent + 2, 'raise StreamExhausted() from e')
+        emit(indent + 1, 'stream._offset = offset')
+        emit(indent, 'else:')
+        emit(indent + 1, 'read = stream.read')
+        emit(indent + 1, 'try:')
+        self._buffer_mode = False
+        emit_body(indent + 2)
+        emit(indent + 1, 'except struct_error as e:')
+        emit(indent + 2, 'raise StreamExhausted() from e')
+
+    def _build(self, field, name):
+        source = '\n'.join(self._lines)
+        code = compile(source, '<compiled {!r}>'.format(name), 'exec')
+        exec(code, self._namespace)
+        compiled = copy.copy(field)
+        compiled.parse = self._namespace['parse']
+        compiled._source = source
+        return compiled
+
+    def compile_structure(self, structure):
+
+        def emit_body(indent):
+            for field, is_embedded in zip(structure._parse_plan,
+                                          structure._plan_embedded_flags):
+                if isinstance(field, _FusedRun):
+                    self._emit_fused_run(field, structure._has_embedded_field, indent)
+                    continue
+                self._emit_value(field, indent)
+                self._emit_insert(field.name, is_embedded,
+                                  structure._has_embedded_field, indent)
+
+        emit = self._emit
+        emit(0, 'def parse(stream, context=None):')
+        emit(1, 'context = StructContext(name={!r}, parent=context)'.format(structure.name))
+        self._emit_bodies(emit_body, 1)
+        if not structure._has_embedded_field:
+            emit(1, 'context.extend_key_order({})'.format(self._bind(structure._child_names)))
+        emit(1, 'return context')
+        return self._build(structure, structure.name)
+
+    def compile_array(self, array):
+
+        def emit_body(indent):
+            self._emit(indent, 'for n in range(size):')
+            self._emit_value(array._childfield, indent + 1)
+            self._emit(indent + 1, 'append(value)')
+
+        emit = self._emit
+        emit(0, 'def parse(stream, context=None):')
+        emit(1, 'context = ArrayContext(name={!r}, parent=context)'.format(array.name))
+        if array._is_callable:
+            emit(1, 'size = {}(context.get_parent())'.format(self._bind(array._function)))
+        else:
+            emit(1, 'size = {}'.format(array._size))
+        emit(1, 'append = context.append')
+        self._emit_bodies(emit_body, 1)
+        emit(1, 'return context')
+        return self._build(array, array.name)
+
 # Uncomment this to get __all__ ------------------------------------------------
 # print(sorted(k for k in globals().keys() if not k.startswith('_')))
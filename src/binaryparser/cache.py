@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+""" Cache of parsing results of files on local disk
+
+Results are pickled into a directory, keyed by a fingerprint of the field
+and identity of the file (path, size and modification time, or a hash of
+its content).  A changed file or schema yields a different key so the file
+is parsed again, least recently used results are removed when the cache
+grows over its size limit.
+"""
+
+import hashlib
+import os
+import pickle
+import struct
+import types
+import weakref
+
+from .binaryparser import Field
+
+__all__ = ['ParseCache']
+
+_CACHE_VERSION = 1
+_SUFFIX = '.bpcache'
+
+#===============================================================================
+# Helpers
+#===============================================================================
+
+def _fingerprint_value(value, digest, memo):
+    if isinstance(value, (Field, types.FunctionType, types.CodeType)):
+        # referenced more than once, or a cycle
+        if id(value) in memo:
+            digest.update(b'@' + str(memo[id(value)]).encode())
+            return
+        memo[id(value)] = len(memo)
+    digest.update(type(value).__qualname__.encode() + b':')
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        digest.update(repr(value).encode())
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _fingerprint_value(item, digest, memo)
+    elif isinstance(value, (set, frozenset)):
+        for item in sorted(value, key=repr):
+            _fingerprint_value(item, digest, memo)
+    elif isinstance(value, dict):
+        for key, item in sorted(value.items(), key=lambda i: repr(i[0])):
+            _fingerprint_value(key, digest, memo)
+            _fingerprint_value(item, digest, memo)
+    elif isinstance(value, types.FunctionType):
+        _fingerprint_value(value.__code__, digest, memo)
+        _fingerprint_value(value.__defaults__, digest, memo)
+        cells = value.__closure__ or ()
+        _fingerprint_value(list(c.cell_contents for c in cells), digest, memo)
+    elif isinstance(value, types.MethodType):
+        _fingerprint_value(value.__func__, digest, memo)
+    elif isinstance(value, types.CodeType):
+        digest.update(value.co_code)
+        _fingerprint_value(value.co_consts, digest, memo)
+        _fingerprint_value(value.co_names, digest, memo)
+    elif isinstance(value, struct.Struct):
+        digest.update(value.format.encode())
+    elif isinstance(value, Field):
+        _fingerprint_value(vars(value), digest, memo)
+    elif type(value).__repr__ is not object.__repr__:
+        # other objects (eg: captured by a closure) are not walked, their
+        # state may change between parsings
+        digest.update(repr(value).encode())
+    digest.update(b';')
+
+def _fingerprint(field):
+    """ Hash of declaration of a field, including code of its functors
+    (but not functions they call) """
+    digest = hashlib.sha256()
+    _fingerprint_value(field, digest, dict())
+    return digest.digest()
+
+def _hash_file(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+#===============================================================================
+# Public Classes
+#===============================================================================
+
+class ParseCache():
+
+    """ Cache of field.parse_file() results in a directory
+
+    Files are identified by absolute path, size and modification time, or
+    by a hash of their content if content_hash is set (which reads the
+    whole file but survives copies and touches).  Functors are part of the
+    schema fingerprint by their code and captured constants, a change in a
+    function they call or an object they use is not detected, pass a new
+    version in such case.
+    max_size is the total size of the cache files in bytes.
+
+    Results are pickled (see StructContext), a result which can't be
+    pickled is returned without caching it.
+    """
+
+    def __init__(self, directory, max_size=1 << 30, content_hash=False,
+                 version=None):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_size = max_size
+        self._content_hash = content_hash
+        self._version = version
+        self._fingerprints = weakref.WeakKeyDictionary()
+
+    def _key(self, field, filename):
+        fingerprint = self._fingerprints.get(field)
+        if fingerprint is None:
+            fingerprint = self._fingerprints[field] = _fingerprint(field)
+        digest = hashlib.sha256(fingerprint)
+        digest.update(repr((_CACHE_VERSION, self._version)).encode())
+        if self._content_hash:
+            digest.update(_hash_file(filename))
+        else:
+            stat = os.stat(filename)
+            digest.update(repr((os.path.abspath(filename), stat.st_size,
+                                stat.st_mtime_ns)).encode())
+        return digest.hexdigest()
+
+    def parse_file(self, field, filename):
+        """ Returns cached parsing result of the file, or parse it with
+        field.parse_file() and cache the result """
+        path = os.path.join(self._directory, self._key(field, filename) + _SUFFIX)
+        try:
+            with open(path, 'rb') as fp:
+                context = pickle.load(fp)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            # broken cache file
+            self._remove(path)
+        else:
+            # mark as recently used
+            os.utime(path)
+            return context
+
+        context = field.parse_file(filename)
+        try:
+            data = pickle.dumps(context, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return context
+        temp_path = path + '.{}.tmp'.format(os.getpid())
+        with open(temp_path, 'wb') as fp:
+            fp.write(data)
+        os.replace(temp_path, path)
+        self._evict()
+        return context
+
+    def _entries(self):
+        entries = list()
+        for entry in os.scandir(self._directory):
+            if entry.name.endswith(_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if total <= self._max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def get_size(self):
+        """ Total size of the cache files """
+        return sum(size for mtime, size, path in self._entries())
+
+    def clear(self):
+        """ Remove all cached results """
+        for mtime, size, path in self._entries():
+            self._remove(path)
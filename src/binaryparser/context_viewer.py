@@ -8,7 +8,8 @@ Requires ttk
 from tkinter import *
 from tkinter.ttk import *
 
-from .binaryparser import ArrayContext, StructContext
+from .binaryparser import ArrayContext, LazyArrayContext, RecordContext, \
+    StructContext
 
 class ContextViewer(Frame):
 
@@ -59,7 +60,7 @@ class ContextViewer(Frame):
         self._insert_item('', '', context)
 
     def _insert_item(self, parent, trail, context, n=0):
-        if isinstance (context.get_parent(), ArrayContext):
+        if isinstance (context.get_parent(), (ArrayContext, LazyArrayContext)):
             my_trail = '{}{}#{}/'.format(trail, context.get_name(), n)
             self.tree.insert(parent, 'end', iid=my_trail, text=context.get_name(), value=[n, my_trail])
         else:
@@ -67,7 +68,8 @@ class ContextViewer(Frame):
             self.tree.insert(parent, 'end', iid=my_trail, text=context.get_name(), value=['', my_trail])
 
         for n, (k, v) in enumerate(context.get_ordered_items()):
-            if isinstance(v, (ArrayContext, StructContext)):
+            if isinstance(v, (ArrayContext, LazyArrayContext, StructContext,
+                              RecordContext)):
                 self._insert_item(my_trail, my_trail, v, n)
             else:
                 leaf_trail = my_trail + str(k)
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+""" Offset index of elements of an Array or RepeatUntil in a file
+
+The file is skimmed once, offset, length and an optional key (eg: type of
+a PNG chunk) of every element is recorded and saved to a sidecar file.
+Afterwards element N, or all elements of a key, are parsed from a memory
+map of the file after a single seek, instead of parsing everything before
+them.
+
+The sidecar file is a line of JSON header followed by the offset, length
+and key number arrays in machine format, nothing in it is executed when
+it's loaded.  The header holds the size and modification time of the file
+and a fingerprint of the field, path, key and skim, the index is rebuilt
+if any of them changed.
+"""
+
+import array
+import ast
+import json
+import mmap
+import os
+import sys
+
+from .binaryparser import Array, BufferStream, InvalidFieldName, \
+    InvalidFieldParameter, RepeatUntil, Structure, WrapperField
+from .cache import _fingerprint
+
+__all__ = ['RecordIndex']
+
+_INDEX_VERSION = 2
+
+#===============================================================================
+# Helpers
+#===============================================================================
+
+class _Recorder(WrapperField):
+
+    """ Records offset, length and key of every parsed element """
+
+    def __init__(self, field, key, index):
+        super().__init__(field)
+        self._key = key
+        self._index = index
+
+    def parse(self, stream, context):
+        offset = stream.tell()
+        value = self._childfield.parse(stream, context)
+        key = None if self._key is None else self._key(value)
+        self._index._append(offset, stream.tell() - offset, key)
+        return value
+
+def _find_container(field, names):
+    # the same path rules as Field.iterparse()
+    for name in names:
+        if not isinstance(field, Structure):
+            raise InvalidFieldName('{!r} is not a structure'.format(field.name))
+        field = next((f for f in field._child_fields if f.name == name), None)
+        if field is None:
+            raise InvalidFieldName('Field {!r} not found'.format(name))
+    if not isinstance(field, (Array, RepeatUntil)):
+        raise InvalidFieldParameter('Path must lead to an Array or '\
+                                    'RepeatUntil, got {!r}'.format(field))
+    return field
+
+def _replace_container(field, names, function):
+    # copy of field with the container at path replaced by function(container)
+    if not names:
+        return function(field)
+    return field._replace_children(lambda child: \
+        _replace_container(child, names[1:], function) \
+        if child.name == names[0] else child)
+
+def _file_identity(filename):
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _is_literal(key):
+    # keys are saved as their repr
+    try:
+        return ast.literal_eval(repr(key)) == key
+    except (ValueError, SyntaxError):
+        return False
+
+def _layout():
+    # arrays are saved in machine format
+    return [sys.byteorder, array.array('Q').itemsize, array.array('L').itemsize]
+
+def _map_file(filename):
+    with open(filename, 'rb') as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            # empty files can't be mapped
+            return b''
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+def _unmap(mapping):
+    try:
+        mapping.close()
+    except BufferError:
+        # zero-copy values still reference the mapping
+        pass
+    except AttributeError:
+        pass
+
+#===============================================================================
+# Public Classes
+#===============================================================================
+
+class RecordIndex():
+
+    """ Index of the elements of the Array or RepeatUntil at path of field
+    (see Field.iterparse) in a file
+
+    The index is loaded from index_filename (default is filename with a
+    '.bpidx' suffix), if it doesn't exist, or size or modification time of
+    the file changed, or rebuild is set, the file is skimmed and the index
+    is saved.  Skimming parses the file with elements parsed by skim (eg: a
+    structure which reads the length and type of a chunk and skips its
+    data) instead of the element field if it's given, only the window of
+    the last element is kept in memory.  key is a functor which accepts
+    the parsed (or skimmed) element and returns a key, which must be a
+    literal (eg: a number, string, bytes or tuple of them).  The index is
+    also rebuilt if field, path, key or skim changed.
+
+    Elements are parsed without parent context, so the element field can't
+    refer to fields outside of it.  The index keeps the file mapped until
+    close() is called.
+    """
+
+    def __init__(self, field, filename, path=None, key=None, skim=None,
+                 index_filename=None, rebuild=False):
+        names = path.split('.') if path else []
+        self._element = _find_container(field, names)._childfield
+        self._filename = filename
+        self._index_filename = index_filename or filename + '.bpidx'
+        self._fingerprint = _fingerprint((field, path, key, skim)).hex()
+        if rebuild or not self._load():
+            self._build(field, names, key, skim)
+            self._save()
+        self._positions = None
+        self._mapping = _map_file(filename)
+
+    def _reset(self, identity):
+        self._identity = identity
+        self._offsets = array.array('Q')
+        self._lengths = array.array('Q')
+        self._key_ids = array.array('L')
+        self._keys = list()
+        self._key_table = dict()
+
+    def _append(self, offset, length, key):
+        key_id = self._key_table.get(key)
+        if key_id is None:
+            if not _is_literal(key):
+                raise InvalidFieldParameter('Key must be a literal, got {!r}'\
+                                            .format(key))
+            key_id = self._key_table[key] = len(self._keys)
+            self._keys.append(key)
+        self._offsets.append(offset)
+        self._lengths.append(length)
+        self._key_ids.append(key_id)
+
+    def _build(self, field, names, key, skim):
+        self._reset(_file_identity(self._filename))
+        def record(container):
+            return container._replace_children(lambda child: \
+                _Recorder(child if skim is None else skim, key, self))
+        field = _replace_container(field, names, record)
+        mapping = _map_file(self._filename)
+        if hasattr(mapping, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mapping.madvise(mmap.MADV_SEQUENTIAL)
+        stream = BufferStream(mapping)
+        try:
+            for element in field.iterparse(stream, '.'.join(names) or None):
+                pass
+        finally:
+            stream.close()
+            _unmap(mapping)
+
+    def _header(self):
+        return {
+            'version': _INDEX_VERSION,
+            'layout': _layout(),
+            'identity': self._identity,
+            'fingerprint': self._fingerprint,
+            }
+
+    def _load(self):
+        # returns whether an up to date index is loaded
+        try:
+            with open(self._index_filename, 'rb') as fp:
+                header = json.loads(fp.readline())
+                self._reset(_file_identity(self._filename))
+                if any(header.get(name) != value
+                       for name, value in self._header().items()):
+                    return False
+                count = header['count']
+                self._keys = list(ast.literal_eval(k) for k in header['keys'])
+                for values in (self._offsets, self._lengths, self._key_ids):
+                    values.fromfile(fp, count)
+        except (OSError, EOFError, ValueError, SyntaxError, KeyError, TypeError):
+            return False
+        return True
+
+    def _save(self):
+        header = dict(self._header(), count=len(self._offsets),
+                      keys=list(repr(k) for k in self._keys))
+        temp_filename = self._index_filename + '.tmp'
+        with open(temp_filename, 'wb') as fp:
+            fp.write(json.dumps(header).encode('utf_8') + b'\n')
+            for values in (self._offsets, self._lengths, self._key_ids):
+                values.tofile(fp)
+        os.replace(temp_filename, self._index_filename)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, n):
+        """ Parse the n-th element """
+        offset = self._offsets[n]
+        return self._element.parse(BufferStream(self._mapping, offset), None)
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
+
+    def get_range(self, n):
+        """ Returns (offset, length) of the n-th element """
+        return self._offsets[n], self._lengths[n]
+
+    def get_key(self, n):
+        """ Returns key of the n-th element """
+        return self._keys[self._key_ids[n]]
+
+    def keys(self):
+        """ Distinct keys in order of their first elements """
+        return list(self._keys)
+
+    def find(self, key):
+        """ Returns numbers of elements of key """
+        if self._positions is None:
+            self._positions = dict()
+            for n, key_id in enumerate(self._key_ids):
+                self._positions.setdefault(key_id, list()).append(n)
+        try:
+            key_id = self._keys.index(key)
+        except ValueError:
+            return []
+        return list(self._positions[key_id])
+
+    def select(self, key):
+        """ Parse elements of key """
+        for n in self.find(key):
+            yield self[n]
+
+    def close(self):
+        """ Unmap the file """
+        _unmap(self._mapping)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+""" Parse files with a pool of worker processes
+
+Where available the pool forks workers, so the field is inherited instead
+of pickled and fields with lambda functors work.  Other platforms pickle the
+field once for each worker, which requires functors defined in modules.
+Parsing results are pickled back to the parent process, zero-copy values
+are sent as bytes.
+"""
+
+import collections
+import concurrent.futures
+import mmap
+import multiprocessing
+import os
+
+from .binaryparser import Array, ArrayContext, BufferStream, ColumnContext, \
+    InvalidFieldParameter, RecordContext, StreamExhausted, StructContext
+
+__all__ = ['ParseResult', 'parse_array', 'parse_many']
+
+ParseResult = collections.namedtuple('ParseResult', 'path result error')
+ParseResult.__doc__ = """ Parsing result of a file, error is the raised
+exception (and result is None) if parsing failed """
+
+#===============================================================================
+# Worker Process
+#===============================================================================
+
+# field parsed by current worker process
+_worker_field = None
+
+def _initialize_worker(field):
+    global _worker_field
+    _worker_field = field
+
+def _parse_path(path):
+    try:
+        return ParseResult(path, _worker_field.parse_file(path), None)
+    except Exception as e:
+        return ParseResult(path, None, e)
+
+# file mapped by current worker process, the kernel shares its pages with
+# other workers
+_worker_mapping = None
+
+def _initialize_array_worker(array, filename):
+    global _worker_field, _worker_mapping
+    _worker_field = array
+    with open(filename, 'rb') as fp:
+        _worker_mapping = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+def _parse_range(offset, size):
+    stream = BufferStream(_worker_mapping, offset)
+    context = ArrayContext(name=_worker_field.name)
+    return _worker_field._parse_elements(stream, context, size)
+
+#===============================================================================
+# Public Functions
+#===============================================================================
+
+def _pool_context():
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+def parse_array(array, filename, offset=0, context=None, workers=None):
+    """ Parse an Array of static sized elements at offset of a file with
+    worker processes, returns the same ArrayContext (or ColumnContext if
+    the array is columnar) as array.parse()
+
+    The elements are split into contiguous ranges which are parsed from
+    memory maps of the file by workers, and concatenated in order.  The
+    size function of a dynamic array is called with context.  Results are
+    pickled back to this process, which is much cheaper for columnar
+    arrays than for one StructContext per element.
+    """
+    if not isinstance(array, Array):
+        raise InvalidFieldParameter('Expected an Array, got {!r}'.format(array))
+    itemsize = array._childfield.static_size()
+    if itemsize is None:
+        raise InvalidFieldParameter('Array elements must be of static size, '\
+                                    'got {!r}'.format(array._childfield))
+    if array._is_callable:
+        size = array._function(context)
+    else:
+        size = array._size
+    length = size * itemsize
+    available = max(os.path.getsize(filename) - offset, 0)
+    if available < length:
+        raise StreamExhausted('Expected {} bytes, read {}'\
+                              .format(length, available))
+
+    if array._columnar:
+        result = ColumnContext(name=array.name, parent=context)
+    else:
+        result = ArrayContext(name=array.name, parent=context)
+    if size == 0:
+        return result
+    workers = workers or os.cpu_count() or 1
+    # more ranges than workers balance uneven progress
+    count = min(size, workers * 4)
+    bounds = list(size * n // count for n in range(count + 1))
+    starts = list(offset + n * itemsize for n in bounds[:-1])
+    sizes = list(b - a for a, b in zip(bounds, bounds[1:]))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=_pool_context(),
+                                                initializer=_initialize_array_worker,
+                                                initargs=(array, filename)) as executor:
+        futures = list(map(executor.submit, [_parse_range] * count, starts, sizes))
+        try:
+            for future in futures:
+                chunk = future.result()
+                if array._columnar:
+                    result.append_columns(chunk)
+                    continue
+                for element in chunk:
+                    if isinstance(element, (StructContext, RecordContext,
+                                            ArrayContext)):
+                        element.__ = result
+                result.extend(chunk)
+        finally:
+            # don't parse the rest after an error
+            for future in futures:
+                future.cancel()
+    return result
+
+def parse_many(field, paths, workers=None, ordered=True):
+    """ Parse files with field.parse_file() in worker processes, yields a
+    ParseResult for each file
+
+    workers is the number of processes, defaults to number of CPUs.  If
+    ordered is set, results are yielded in order of paths, otherwise in
+    order of completion.  Errors are captured in ParseResult.error instead
+    of being raised, including results which can't be pickled.
+    """
+    paths = list(paths)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=_pool_context(),
+                                                initializer=_initialize_worker,
+                                                initargs=(field,)) as executor:
+        futures = dict((executor.submit(_parse_path, path), path) for path in paths)
+        if ordered:
+            completed = futures
+        else:
+            completed = concurrent.futures.as_completed(futures)
+        try:
+            for future in completed:
+                error = future.exception()
+                if error is not None:
+                    yield ParseResult(futures[future], None, error)
+                else:
+                    yield future.result()
+        finally:
+            # don't wait for files nobody wants
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+""" Per-field parsing profiler
+
+A profiler instruments a copy of a field, every field in it is wrapped by
+a probe which counts calls, wall time, consumed bytes and raised
+exceptions under the path of the field in the schema, eg:
+'PNGFile/Chunks/Chunk/Switch/TextualData/Keyword'.  The original field is
+not touched, so parsing with it costs nothing.
+"""
+
+import collections
+import csv
+import sys
+import time
+
+from .binaryparser import InvalidFieldParameter, WrapperField
+
+__all__ = ['FieldStats', 'ParseProfiler']
+
+FieldStats = collections.namedtuple('FieldStats',
+                                    'path calls time own_time bytes errors')
+FieldStats.__doc__ = """ Profile of the fields at path, time includes time
+of child fields and own_time doesn't, bytes is None if positions of the
+stream are unknown """
+
+#===============================================================================
+# Helpers
+#===============================================================================
+
+def _field_label(field):
+    # name of the field, or class name of a nameless field
+    if field.name is not None:
+        return field.name
+    while isinstance(field, WrapperField) and field.name is None:
+        field = field._childfield
+    return field.__class__.__name__
+
+def _tell(stream):
+    try:
+        return stream.tell()
+    except (AttributeError, OSError):
+        return None
+
+class _Probe(WrapperField):
+
+    """ Measures parsing of the child field """
+
+    def __init__(self, field, profiler, counters):
+        super().__init__(field)
+        self._profiler = profiler
+        # calls, time, own time, bytes, errors
+        self._counters = counters
+
+    def parse(self, stream, context=None):
+        profiler = self._profiler
+        counters = self._counters
+        outer_time = profiler._child_time
+        profiler._child_time = 0.0
+        position = _tell(stream)
+        start = time.perf_counter()
+        try:
+            return self._childfield.parse(stream, context)
+        except Exception:
+            counters[4] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            counters[0] += 1
+            counters[1] += elapsed
+            counters[2] += elapsed - profiler._child_time
+            profiler._child_time = outer_time + elapsed
+            if position is None or counters[3] is None:
+                counters[3] = None
+            else:
+                end = _tell(stream)
+                counters[3] = None if end is None else \
+                    counters[3] + end - position
+
+#===============================================================================
+# Public Classes
+#===============================================================================
+
+class ParseProfiler():
+
+    """ Profiles parsing time of each field of a schema
+
+    instrument() returns a profiled copy of a field, parse with it and
+    read the aggregated result with get_stats(), print_stats() or
+    dump_csv().  Fields at the same path (eg: elements of an Array,
+    nameless paddings of a structure) are aggregated together.
+
+    Only the instrumented copy is measured, keep both to profile sampled
+    requests:
+
+        profiled = profiler.instrument(field)
+        ...
+        result = (profiled if sampled else field).parse(stream)
+
+    Probes are parsed one by one, so fused runs of static fields and bulk
+    arrays are slower under the profiler.  A profiler should be used by
+    one thread at a time.
+    """
+
+    _SORT_KEYS = FieldStats._fields
+
+    def __init__(self):
+        self._counters = collections.OrderedDict()
+        self._child_time = 0.0
+
+    def instrument(self, field):
+        """ Returns a copy of field with every field in it profiled """
+        return self._probe(field, None)
+
+    def _probe(self, field, parent_path):
+        label = _field_label(field)
+        path = label if parent_path is None else parent_path + '/' + label
+        counters = self._counters.get(path)
+        if counters is None:
+            counters = self._counters[path] = [0, 0.0, 0.0, 0, 0]
+        return _Probe(self._instrument(field, path), self, counters)
+
+    def _instrument(self, field, path):
+        if isinstance(field, WrapperField):
+            # adapters, validators... are profiled as part of the field
+            function = lambda child: self._instrument(child, path)
+        else:
+            function = lambda child: self._probe(child, path)
+        return field._replace_children(function)
+
+    def reset(self):
+        """ Clear counters of all fields """
+        for counters in self._counters.values():
+            counters[:] = [0, 0.0, 0.0, 0, 0]
+
+    def get_stats(self, sort='own_time', reverse=None, limit=None):
+        """ Returns a list of FieldStats of profiled fields, sorted by a
+        FieldStats field name (default is own_time), numbers are sorted in
+        descending order and paths in ascending order unless reverse is
+        given.  Fields which are never parsed are not included. """
+        if sort not in self._SORT_KEYS:
+            raise InvalidFieldParameter('Sort key must be one of {!r}, got {!r}'\
+                                        .format(self._SORT_KEYS, sort))
+        if reverse is None:
+            reverse = sort != 'path'
+        stats = list(FieldStats(path, *counters)
+                     for path, counters in self._counters.items()
+                     if counters[0])
+        index = self._SORT_KEYS.index(sort)
+        # unknown sizes sort as smallest
+        stats.sort(key=lambda s: -1 if s[index] is None else s[index],
+                   reverse=reverse)
+        return stats[:limit]
+
+    def print_stats(self, sort='own_time', limit=None, stream=None):
+        """ Print a table of get_stats() """
+        stream = stream or sys.stdout
+        stream.write('{:>10} {:>12} {:>12} {:>12} {:>8}  {}\n'\
+                     .format('calls', 'time', 'own_time', 'bytes', 'errors', 'path'))
+        for s in self.get_stats(sort, limit=limit):
+            stream.write('{:>10} {:>12.6f} {:>12.6f} {:>12} {:>8}  {}\n'\
+                         .format(s.calls, s.time, s.own_time,
+                                 '-' if s.bytes is None else s.bytes,
+                                 s.errors, s.path))
+
+    def dump_csv(self, fp, sort='path'):
+        """ Write get_stats() to a text file as CSV with a header row """
+        writer = csv.writer(fp)
+        writer.writerow(FieldStats._fields)
+        writer.writerows(self.get_stats(sort))
@@ -255,8 +255,7 @@ ITunesDB = MHBD
 # Entry ------------------------------------------------------------------------
 
 def parse():
-    with open('iTunesDB', 'rb') as fp:
-        return ITunesDB.parse(fp)
+    return ITunesDB.parse_file('iTunesDB')
 
 def profile():
     import cProfile as Profile
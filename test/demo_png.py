@@ -62,7 +62,7 @@ PLTE = Structure('ImagePalette',
 
 IEND = NullField()  # not used now
 
-IDAT = Padding(lambda c: c.__.Length)  # not used now
+IDAT = Bytes('ImageData', lambda c: c.Length, zerocopy=True)
 
 # XXX:
 TRNS = Structure('Transparency',
@@ -71,12 +71,12 @@ TRNS = Structure('Transparency',
     Calculate('Size2', lambda c: 2 ** c.__.__[0].ImageHeader.BitDepth - 1),
     Switch(lambda c: c.__.__[0].ImageHeader.ColorType,
         {
-            'INDEXED' : Array('Data', UInt8('Alpha'), lambda c: c.Size),
-            'GAYSCALE' : Array('Data', UBInt16('Alpha'), lambda c: c.Size2),
+            'INDEXED' : FormatArray('Data', UInt8('Alpha'), lambda c: c.Size),
+            'GAYSCALE' : FormatArray('Data', UBInt16('Alpha'), lambda c: c.Size2),
             'RGB' : Structure('Data',
-                                   Array('Red', UBInt16('Alpha'), lambda c: c.Size2),
-                                   Array('Green', UBInt16('Alpha'), lambda c: c.Size2),
-                                   Array('Blue', UBInt16('Alpha'), lambda c: c.Size2))
+                                   FormatArray('Red', UBInt16('Alpha'), lambda c: c.Size2),
+                                   FormatArray('Green', UBInt16('Alpha'), lambda c: c.Size2),
+                                   FormatArray('Blue', UBInt16('Alpha'), lambda c: c.Size2))
         }
     )
     )
@@ -127,7 +127,8 @@ Chunk = Structure('Chunk',
             'gAMA' : GAMA,
             'cHRM' : CHRM,
             'tEXt' : TEXT,
-            'tRNS' : TRNS
+            'tRNS' : TRNS,
+            'IDAT' : IDAT,
         },
         default_field=Padding(lambda c: c.Length),
         ),
@@ -148,10 +149,9 @@ PNGFile = Structure('PNGFile',
     )
 
 def main():
-    with open('tiger.png', 'rb') as fp:
-        r = PNGFile.parse(fp)
-        pretty_print(r)
-        view_context(r)
+    r = PNGFile.parse_file('tiger.png')
+    pretty_print(r)
+    view_context(r)
 
 
 if __name__ == '__main__':
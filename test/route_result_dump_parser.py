@@ -85,10 +85,9 @@ PDM_ResultFileFormat = Structure('ResultFormat',
     )
     
 def main():
-    with open('0002.dat', 'rb') as fp:
-        r = PDM_ResultFileFormat.parse(fp)
-        view_context(r)
-        pretty_print(r)
+    r = PDM_ResultFileFormat.parse_file('0002.dat')
+    view_context(r)
+    pretty_print(r)
         
 if __name__ == '__main__':
     main()
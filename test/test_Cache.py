@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import struct
+import tempfile
+import sys, os, os.path
+sys.path.insert(0, '../src')
+
+from binaryparser import *
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = 0
+        def length(c):
+            self.calls += 1
+            return c.Length
+        self.format1 = Structure('Message',
+                                 UBInt16('Length'),
+                                 Bytes('Data', length, zerocopy=True),
+                                 )
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_directory = os.path.join(self.directory.name, 'cache')
+        self.filename = os.path.join(self.directory.name, 'message')
+        self.write(b'abc')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, data):
+        with open(self.filename, 'wb') as fp:
+            fp.write(struct.pack('>H', len(data)) + data)
+
+    def testParseCache(self):
+        cache = ParseCache(self.cache_directory)
+        r1 = cache.parse_file(self.format1, self.filename)
+        r2 = cache.parse_file(self.format1, self.filename)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(r1, r2)
+        self.assertEqual(r2.Data, b'abc')
+        self.assertGreater(cache.get_size(), 0)
+        # same schema declared again
+        format2 = Structure('Message',
+                            UBInt16('Length'),
+                            Bytes('Data', self.format1._child_fields[1]._childfield._length_function,
+                                  zerocopy=True),
+                            )
+        cache.parse_file(format2, self.filename)
+        self.assertEqual(self.calls, 1)
+        # changed schema
+        format3 = Structure('Message',
+                            UBInt16('Length'),
+                            Bytes('Data', lambda c: c.Length - 1),
+                            )
+        self.assertEqual(cache.parse_file(format3, self.filename).Data, b'ab')
+        # changed file
+        self.write(b'abcdef')
+        os.utime(self.filename, ns=(1, 1))
+        self.assertEqual(cache.parse_file(self.format1, self.filename).Data, b'abcdef')
+        self.assertEqual(self.calls, 2)
+        cache.clear()
+        self.assertEqual(cache.get_size(), 0)
+
+    def testContentHash(self):
+        cache = ParseCache(self.cache_directory, content_hash=True)
+        cache.parse_file(self.format1, self.filename)
+        os.utime(self.filename, ns=(1, 1))
+        cache.parse_file(self.format1, self.filename)
+        self.assertEqual(self.calls, 1)
+        cache = ParseCache(self.cache_directory, content_hash=True, version=2)
+        cache.parse_file(self.format1, self.filename)
+        self.assertEqual(self.calls, 2)
+
+    def testEviction(self):
+        cache = ParseCache(self.cache_directory, max_size=1)
+        cache.parse_file(self.format1, self.filename)
+        self.assertEqual(cache.get_size(), 0)
+        cache.parse_file(self.format1, self.filename)
+        self.assertEqual(self.calls, 2)
+
+    def testBrokenCacheFile(self):
+        cache = ParseCache(self.cache_directory)
+        cache.parse_file(self.format1, self.filename)
+        for name in os.listdir(self.cache_directory):
+            with open(os.path.join(self.cache_directory, name), 'wb') as fp:
+                fp.write(b'broken')
+        self.assertEqual(cache.parse_file(self.format1, self.filename).Data, b'abc')
+        self.assertEqual(self.calls, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@
 
 import unittest
 import pprint
+import pickle
 import sys, os, os.path
 sys.path.insert(0, '../src')
 
@@ -42,6 +43,12 @@ class TestArrayContext(unittest.TestCase):
         self.assertEquals(c.get_name(), 'Noname')
         self.assertEquals(c.__, p)
         self.assertEquals(c.get_parent(), p)
+
+    def testReversedItems(self):
+        c = ArrayContext()
+        c.extend(['a', 'b', 'c'])
+        self.assertEqual(list(c.get_reversed_items()),
+                         [(2, 'c'), (1, 'b'), (0, 'a')])
         
 class TestContext(unittest.TestCase):
 
@@ -65,6 +72,24 @@ class TestContext(unittest.TestCase):
         pprint.pprint(root)
         pretty_print(root)
 
+    def testPickle(self):
+        root = StructContext('Root')
+        root['Magic'] = memoryview(b'MGCK')
+        root['Data'] = ArrayContext('Data', root)
+        for n in range(3):
+            data = StructContext('Foo', parent=root.Data)
+            data['Foo1'] = n
+            root.Data.append(data)
+        root.Data.append(memoryview(b'foo'))
+        copy = pickle.loads(pickle.dumps(root))
+        self.assertEqual(copy, root)
+        self.assertEqual(copy.get_name(), 'Root')
+        self.assertEqual(copy.get_key_order(), ['Magic', 'Data'])
+        self.assertIsInstance(copy.Magic, bytes)
+        self.assertIs(copy.Data.__, copy)
+        self.assertIs(copy.Data[1].__, copy.Data)
+        self.assertEqual(copy.Data.get_name(), 'Data')
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
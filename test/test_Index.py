@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import io
+import shutil
+import struct
+import tempfile
+import sys, os, os.path
+sys.path.insert(0, '../src')
+
+from binaryparser import *
+
+
+class TestRecordIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure('File',
+                                 UBInt16('Count'),
+                                 Array('Messages',
+                                       Structure('Message',
+                                                 UInt8('Kind'),
+                                                 UBInt16('Length'),
+                                                 Bytes('Data', lambda c: c.Length),
+                                                 ),
+                                       lambda c: c.Count),
+                                 )
+        self.skim = Structure('Message',
+                              UInt8('Kind'),
+                              UBInt16('Length'),
+                              Padding(lambda c: c.Length),
+                              )
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'messages')
+        with open(self.filename, 'wb') as fp:
+            fp.write(struct.pack('>H', 5))
+            for n in range(5):
+                fp.write(struct.pack('>BH', n % 2, n) + b'x' * n)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testRecordIndex(self):
+        expected = self.format1.parse_file(self.filename).Messages
+        with RecordIndex(self.format1, self.filename, 'Messages',
+                         key=lambda c: c.Kind, skim=self.skim) as index:
+            self.assertEqual(len(index), 5)
+            self.assertEqual(list(index), expected)
+            self.assertEqual(index[-1], expected[-1])
+            self.assertEqual(index.get_range(2), (9, 5))
+            self.assertEqual(index.get_key(3), 1)
+            self.assertEqual(index.keys(), [0, 1])
+            self.assertEqual(index.find(0), [0, 2, 4])
+            self.assertEqual(index.find(2), [])
+            self.assertEqual(list(index.select(1)), [expected[1], expected[3]])
+        self.assertTrue(os.path.exists(self.filename + '.bpidx'))
+
+    def testReuseIndex(self):
+        index_filename = self.filename + '.bpidx'
+        def is_saved(**kwargs):
+            # whether the index is saved again instead of being loaded
+            os.utime(index_filename, ns=(0, 0))
+            RecordIndex(self.format1, self.filename, 'Messages', **kwargs).close()
+            return os.stat(index_filename).st_mtime_ns != 0
+        kind = lambda c: c.Kind
+        RecordIndex(self.format1, self.filename, 'Messages', key=kind).close()
+        self.assertFalse(is_saved(key=kind))
+        index = RecordIndex(self.format1, self.filename, 'Messages', key=kind)
+        self.assertEqual(index.keys(), [0, 1])
+        self.assertEqual(index.find(1), [1, 3])
+        self.assertEqual(index[4].Data, b'xxxx')
+        index.close()
+        # key or skim is changed
+        self.assertTrue(is_saved(key=lambda c: c.Length))
+        index = RecordIndex(self.format1, self.filename, 'Messages',
+                            key=lambda c: c.Length)
+        self.assertEqual(index.keys(), [0, 1, 2, 3, 4])
+        index.close()
+        self.assertTrue(is_saved(key=lambda c: c.Length, skim=self.skim))
+        self.assertFalse(is_saved(key=lambda c: c.Length, skim=self.skim))
+        # sidecar file is truncated
+        with open(index_filename, 'r+b') as fp:
+            fp.truncate(os.path.getsize(index_filename) - 1)
+        self.assertTrue(is_saved(key=lambda c: c.Length, skim=self.skim))
+        self.assertRaises(InvalidFieldParameter, RecordIndex, self.format1,
+                          self.filename, 'Messages', key=lambda c: object(),
+                          rebuild=True)
+        # file is changed
+        with open(self.filename, 'ab') as fp:
+            fp.write(b'\x01\x00\x01z')
+        with open(self.filename, 'r+b') as fp:
+            fp.write(b'\x00\x06')
+        index = RecordIndex(self.format1, self.filename, 'Messages')
+        self.assertEqual(len(index), 6)
+        self.assertEqual(index[5].Data, b'z')
+        index.close()
+
+    def testInvalidPath(self):
+        self.assertRaises(InvalidFieldName, RecordIndex, self.format1,
+                          self.filename, 'Foo')
+        self.assertRaises(InvalidFieldParameter, RecordIndex, self.format1,
+                          self.filename, 'Count')
+
+    def testPNG(self):
+        import demo_png
+        filename = os.path.join(self.directory.name, 'tiger.png')
+        shutil.copy('tiger.png', filename)
+        skim = Structure('Chunk',
+                         UBInt32('Length'),
+                         String('Type', 4),
+                         Padding(lambda c: c.Length + 4),
+                         )
+        chunks = demo_png.PNGFile.parse_file(filename).Chunks
+        with RecordIndex(demo_png.PNGFile, filename, 'Chunks',
+                         key=lambda c: c.Type, skim=skim) as index:
+            self.assertEqual(list(index), chunks)
+            self.assertEqual(list(index.select('IEND')), chunks[-1:])
+
+if __name__ == "__main__":
+    unittest.main()
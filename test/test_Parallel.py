@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import struct
+import tempfile
+import sys, os, os.path
+sys.path.insert(0, '../src')
+
+from binaryparser import *
+
+
+class TestParseMany(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure('Message',
+                                 UBInt16('Length'),
+                                 Bytes('Data', lambda c: c.Length, zerocopy=True),
+                                 )
+        self.directory = tempfile.TemporaryDirectory()
+        self.paths = list()
+        for n in range(6):
+            path = os.path.join(self.directory.name, 'file{}'.format(n))
+            with open(path, 'wb') as fp:
+                if n == 3:
+                    fp.write(b'\x00\x10truncated')
+                else:
+                    fp.write(struct.pack('>H', n) + b'x' * n)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testParseMany(self):
+        results = list(parse_many(self.format1, self.paths, workers=2))
+        self.assertEqual(list(r.path for r in results), self.paths)
+        for n, result in enumerate(results):
+            if n == 3:
+                self.assertIsNone(result.result)
+                self.assertIsInstance(result.error, StreamExhausted)
+            else:
+                self.assertIsNone(result.error)
+                self.assertEqual(result.result.Data, b'x' * n)
+                self.assertEqual(result.result.Length, n)
+
+    def testUnordered(self):
+        results = parse_many(self.format1, self.paths + ['missing'],
+                             workers=3, ordered=False)
+        results = dict((r.path, r) for r in results)
+        self.assertEqual(set(results), set(self.paths + ['missing']))
+        self.assertIsInstance(results['missing'].error, FileNotFoundError)
+        self.assertEqual(results[self.paths[5]].result.Data, b'xxxxx')
+
+class TestParseArray(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure('Record',
+                                 UBInt32('Id'),
+                                 UBInt16('Value'),
+                                 Structure('Flags', UInt8('Flag1')),
+                                 Bytes('Tag', 1),
+                                 )
+        self.file = tempfile.NamedTemporaryFile(delete=False)
+        self.file.write(b'HEAD')
+        for n in range(100):
+            self.file.write(struct.pack('>IHBc', n, n * 2, n % 2, b'x'))
+        self.file.close()
+
+    def tearDown(self):
+        os.unlink(self.file.name)
+
+    def expected(self, array):
+        with open(self.file.name, 'rb') as fp:
+            fp.seek(4)
+            return array.parse(fp)
+
+    def testParseArray(self):
+        array = Array('Records', self.format1, 100)
+        result = parse_array(array, self.file.name, offset=4, workers=3)
+        self.assertIsInstance(result, ArrayContext)
+        self.assertEqual(result, self.expected(array))
+        self.assertIs(result[42].get_parent(), result)
+        self.assertEqual(result[42].Value, 84)
+
+    def testColumnar(self):
+        array = Array('Records', self.format1, 100, columnar=True)
+        result = parse_array(array, self.file.name, offset=4, workers=3)
+        self.assertIsInstance(result, ColumnContext)
+        self.assertEqual(result, self.expected(array))
+        self.assertEqual(result.get_length(), 100)
+        self.assertIs(result.Flags.get_parent(), result)
+        self.assertEqual(result.get_row(99).Id, 99)
+
+    def testDynamicSize(self):
+        array = Array('Records', self.format1, lambda c: c.Count)
+        context = StructContext('Root')
+        context['Count'] = 7
+        result = parse_array(array, self.file.name, 4, context, workers=2)
+        self.assertEqual(len(result), 7)
+        self.assertIs(result.get_parent(), context)
+        context['Count'] = 0
+        self.assertEqual(parse_array(array, self.file.name, 4, context), [])
+
+    def testErrors(self):
+        array = Array('Records', self.format1, 101)
+        self.assertRaises(StreamExhausted, parse_array, array, self.file.name, 4)
+        array = Array('Records', Bytes('Data', lambda c: c.Length), 2)
+        self.assertRaises(InvalidFieldParameter, parse_array, array, self.file.name)
+        self.assertRaises(InvalidFieldParameter, parse_array, self.format1, self.file.name)
+
+if __name__ == "__main__":
+    unittest.main()
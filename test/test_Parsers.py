@@ -2,11 +2,20 @@
 
 import unittest
 import io
+import asyncio
+import pickle
+import struct
+import tempfile
 import sys, os, os.path
 sys.path.insert(0, '../src')
 
 from binaryparser import *
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 DUMP = False
 
 class TestIntegerFields(unittest.TestCase):
@@ -101,6 +110,103 @@ class TestBytes(unittest.TestCase):
             print (self.formatBytesDynamic)
             print (r)
 
+class TestZeroCopyBytes(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure(None,
+                                 UBInt16('Length'),
+                                 Bytes('Data', lambda c: c.Length, zerocopy=True),
+                                 Bytes('Tail', 2, zerocopy=True),
+                                 )
+        self.data1 = bytearray(b'\x00\x04MGCKAB')
+
+    def testZeroCopyBytes(self):
+        r = self.format1.parse(BufferStream(self.data1))
+        self.assertIsInstance(r.Data, memoryview)
+        self.assertEqual(r.Data.tobytes(), b'MGCK')
+        self.assertEqual(r.Tail.tobytes(), b'AB')
+        # views share memory with the buffer
+        self.data1[2] = ord('m')
+        self.assertEqual(r.Data.tobytes(), b'mGCK')
+
+        r = self.format1.parse(io.BytesIO(bytes(self.data1)))
+        self.assertEqual(r.Data.tobytes(), b'mGCK')
+        self.assertRaises(StreamExhausted, self.format1.parse,
+                          BufferStream(self.data1[:-1]))
+
+    def testBufferStream(self):
+        stream = BufferStream(memoryview(b'0123456789')[2:])
+        self.assertEqual(stream.read(2), b'23')
+        self.assertEqual(stream.seek(-2, io.SEEK_END), 6)
+        self.assertEqual(stream.read(), b'89')
+        self.assertEqual(stream.read(1), b'')
+        stream.seek(1)
+        self.assertEqual(stream.read_view(3).tobytes(), b'345')
+        self.assertEqual(stream.tell(), 4)
+        self.assertRaises(StreamError, stream.seek, -5, io.SEEK_CUR)
+
+class TestParseBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure('Message',
+                                 UBInt16('Type'),
+                                 UBInt32('Id'),
+                                 Anchor('Position'),
+                                 UBInt16('Length'),
+                                 Bytes('Data', lambda c: c.Length),
+                                 Hex(UBInt32('Crc')),
+                                 )
+        self.data1 = b'\x00\x01\x00\x00\x00\x02\x00\x04abcd\x00\x00\x00\x05'
+        self.format2 = Structure(None,
+                                 RepeatUntil('Messages', lambda c: False,
+                                             self.format1),
+                                 Bytes('Tail', 0),
+                                 )
+
+    def testParseBuffer(self):
+        for p in (self.format1, self.format1.compile()):
+            r, offset = p.parse_buffer(b'\xff' * 3 + self.data1 * 2, 3)
+            self.assertEqual(offset, 3 + len(self.data1))
+            self.assertEqual(r.Position, 9)
+            self.assertEqual(r.Data, b'abcd')
+            self.assertEqual(r.Crc, '0x5')
+            r, offset = p.parse_buffer(memoryview(self.data1 * 2))
+            self.assertEqual(offset, len(self.data1))
+            self.assertEqual(r, p.parse(io.BytesIO(self.data1)))
+            self.assertRaises(StreamExhausted, p.parse_buffer, self.data1[:-1])
+            self.assertRaises(StreamExhausted, p.parse_buffer, self.data1[:8])
+
+    def testParseBufferEOF(self):
+        for p in (self.format2, self.format2.compile()):
+            r, offset = p.parse_buffer(self.data1 * 2 + self.data1[:-2])
+            self.assertEqual(len(r.Messages), 2)
+            self.assertEqual(offset, len(self.data1) * 3 - 2)
+
+class TestParseFile(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure(None,
+                                 UBInt16('Length'),
+                                 Bytes('Data', lambda c: c.Length, zerocopy=True),
+                                 )
+        fd, self.filename = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(b'\x00\x04MGCK')
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def testParseFile(self):
+        r = self.format1.parse_file(self.filename)
+        self.assertEqual(r.Length, 4)
+        self.assertEqual(r.Data.tobytes(), b'MGCK')
+        r.Data.release()
+
+    def testParseEmptyFile(self):
+        with open(self.filename, 'wb'):
+            pass
+        self.assertRaises(StreamExhausted, self.format1.parse_file, self.filename)
+
 class TestString(unittest.TestCase):
 
     def setUp(self):
@@ -176,6 +282,34 @@ class TestString(unittest.TestCase):
             print (self.formatStringCStyle)
             pretty_print (r)
 
+    def testStringCStyleEncodings(self):
+        class UnseekableStream(io.BytesIO):
+            def seekable(self):
+                return False
+        for encoding in ('ascii', 'utf-8', 'utf-16', 'utf-16-le', 'utf-16-be',
+                         'utf-32', 'utf-7'):
+            p = Structure('Strings',
+                          String('String1', encoding=encoding),
+                          String('String2', encoding=encoding),
+                          Bytes('Tail', 2),
+                          )
+            string = 'Hello' if encoding == 'ascii' else 'H\u0100llo, world!' * 20
+            data = (string + '\0').encode(encoding) + \
+                   ('\0').encode(encoding) + b'\x00\xff'
+            for stream in (io.BytesIO(data), UnseekableStream(data),
+                           BufferStream(data), BufferStream(bytearray(data))):
+                r = p.parse(stream)
+                self.assertEqual(r.String1, string)
+                self.assertEqual(r.String2, '')
+                self.assertEqual(r.Tail, b'\x00\xff')
+        # zero bytes of a code unit are not a terminator
+        p = String('String', encoding='utf-16-le')
+        data = '\u0100\u0001x\0'.encode('utf-16-le')
+        self.assertEqual(p.parse(BufferStream(data), None), '\u0100\u0001x')
+        self.assertEqual(p.parse(io.BytesIO(data), None), '\u0100\u0001x')
+        self.assertRaises(StreamExhausted, p.parse, io.BytesIO(data[:-2]), None)
+        self.assertRaises(StreamExhausted, p.parse, BufferStream(data[:-1]), None)
+
 class TestAdapters(unittest.TestCase):
 
     def setUp(self):
@@ -274,6 +408,191 @@ class TestStructure(unittest.TestCase):
             print (p)
             pretty_print (r)
 
+    def testStaticLayout(self):
+        p = Structure('Outer',
+                      UBInt16('Outer1'),
+                      Structure('Inner1',
+                                UBInt16('Inner1'),
+                                Bytes('Inner2', 3),
+                                ),
+                      Embed(Structure('Embedded', UInt8('Inner3'))),
+                      Array('Items', UBInt32('Item'), 2),
+                      Padding(1),
+                      UInt8('Length'),
+                      Bytes('Data', lambda c: c.Length),
+                      UBInt16('Outer2'),
+                      )
+        self.assertFalse(p.is_static())
+        self.assertIsNone(p.static_size())
+        self.assertEqual(p.offsetof('Outer1'), 0)
+        self.assertEqual(p.offsetof('Inner1'), 2)
+        self.assertEqual(p.offsetof('Inner3'), 7)
+        self.assertEqual(p.offsetof('Items'), 8)
+        self.assertEqual(p.offsetof('Length'), 17)
+        self.assertEqual(p.offsetof('Data'), 18)
+        self.assertIsNone(p.offsetof('Outer2'))
+        self.assertRaises(InvalidFieldName, p.offsetof, 'Inner2')
+        inner = p._child_fields[1]
+        self.assertTrue(inner.is_static())
+        self.assertEqual(inner.static_size(), 5)
+        self.assertEqual(inner.offsetof('Inner2'), 2)
+        self.assertEqual(Array('Items', inner, 3).static_size(), 15)
+        self.assertIsNone(Array('Items', inner, lambda c: c.Count).static_size())
+        u = Union('Union', UBInt16('A'), Bytes('B', 5))
+        self.assertEqual(u.static_size(), 5)
+        self.assertEqual(u.offsetof('B'), 0)
+        self.assertEqual(Hex(UBInt16('Foo')).static_size(), 2)
+        self.assertIsNone(String('Foo', 0).static_size())
+        self.assertEqual(FormatArray('Foo', 'H', 3).static_size(), 6)
+        self.assertEqual(Structure('Foo', Padding(2), Anchor('End')).static_size(), 2)
+
+    def testStaticSizeFunctors(self):
+        # static sizes don't depend on what functors return without context
+        calls = list()
+        length = lambda c: calls.append(c) or 4
+        p = Structure('Outer',
+                      UInt8('Length'),
+                      Bytes('Data', length),
+                      Padding(length),
+                      Array('Items', UInt8(None), length),
+                      FormatArray('Values', 'H', length),
+                      )
+        self.assertIsNone(p.static_size())
+        for field in p._child_fields[1:]:
+            self.assertIsNone(field.static_size())
+        self.assertIsNone(p.offsetof('Values'))
+        self.assertEqual(calls, [])
+
+class TestLazy(unittest.TestCase):
+
+    def setUp(self):
+        self.format = Structure('Outer',
+                                UBInt16('Count'),
+                                Array('Items',
+                                      Structure('Item',
+                                                UBInt16('Id'),
+                                                Structure('Detail',
+                                                          UInt8('Flag'),
+                                                          Bytes('Name', 3),
+                                                          ),
+                                                ),
+                                      lambda c: c.Count),
+                                Structure('Footer',
+                                          UBInt16('Value1'),
+                                          Structure('Dynamic',
+                                                    UInt8('Length'),
+                                                    Bytes('Data', lambda c: c.Length),
+                                                    ),
+                                          ),
+                                )
+        self.data = b'\x00\x02\x00\x01\x07abc\x00\x02\x08def\x00\x03\x02xy'
+
+    def testSizeof(self):
+        self.assertEqual(Structure('Foo', UBInt16('A'), Bytes('B', 3),
+                                   Padding(2)).sizeof(None), 7)
+        self.assertEqual(BitwiseStructure('Bits', [('A', 3), ('B', 13)])
+                         .sizeof(None), 2)
+
+    def testLazy(self):
+        lazy = self.format.lazy()
+        r = lazy.parse(io.BytesIO(self.data))
+        # array elements are not wrapped, their nested structures are
+        item = r.Items[1]
+        self.assertNotIsInstance(item, LazyStructContext)
+        detail = item.Detail
+        self.assertIsInstance(detail, LazyStructContext)
+        self.assertFalse(detail.is_loaded())
+        self.assertEqual(detail.Name, b'def')
+        self.assertTrue(detail.is_loaded())
+        self.assertEqual(detail.get_name(), 'Detail')
+        self.assertIs(detail.__, item)
+        # Footer has a dynamic child, parsed eagerly
+        self.assertNotIsInstance(r.Footer, LazyStructContext)
+        self.assertEqual(r.Footer.Dynamic.Data, b'xy')
+        self.assertEqual(r, self.format.parse(io.BytesIO(self.data)))
+        self.assertIs(lazy.lazy(), lazy)
+
+    def testLazyFile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'data')
+            with open(filename, 'wb') as fp:
+                fp.write(self.data)
+            r = self.format.lazy().parse_file(filename)
+            self.assertEqual(r.Items[0].Detail.Name, b'abc')
+            del r
+
+    def testLazyError(self):
+        p = Structure('Foo', UInt8('A'),
+                      Structure('Bar', UBInt16('B'), UBInt16('C')))
+        for lazy in (p.lazy(), p.lazy().compile()):
+            # truncated data is reported before it's skipped
+            for stream in (io.BytesIO(b'\x01\x00\x02\x00'),
+                           BufferStream(b'\x01\x00\x02\x00')):
+                self.assertRaises(StreamExhausted, lazy.parse, stream)
+            r = lazy.parse(io.BytesIO(b'\x01\x00\x02\x00\x03'))
+            self.assertEqual(r.Bar.C, 3)
+
+    def testCompiledLazy(self):
+        # lazy() of a compiled field doesn't keep its generated parse()
+        p = Structure('S',
+                      UInt8('A'),
+                      Structure('Inner', UInt8('B'), UInt8('C')),
+                      Array('Items', UBInt16(None), 2),
+                      UInt8('D'))
+        data = b'\x01\x02\x03\x00\x04\x00\x05\x06'
+        for lazy in (p.lazy(), p.compile().lazy()):
+            r = lazy.parse(io.BytesIO(data))
+            self.assertIsInstance(r.Inner, LazyStructContext)
+            self.assertIsInstance(r.Items, LazyArrayContext)
+            self.assertEqual(r, p.parse(io.BytesIO(data)))
+        for stream in (io.BytesIO(self.data), BufferStream(self.data)):
+            r = self.format.compile().lazy().parse(stream)
+            self.assertIsInstance(r.Items[1].Detail, LazyStructContext)
+            self.assertEqual(r.Items[1].Detail.Name, b'def')
+
+    def testLazyRepeatUntil(self):
+        # RepeatUntil stops at end of data of lazy elements
+        p = Structure('Top',
+                      RepeatUntil('R', lambda c: False,
+                                  Structure('Rec', Structure('Hdr', UBInt16('A'))))
+                      ).lazy()
+        for stream in (io.BytesIO(b'\x00\x02\x00\x03\x00'),
+                       BufferStream(b'\x00\x02\x00\x03\x00')):
+            r = p.parse(stream)
+            self.assertEqual(len(r.R), 2)
+            self.assertEqual(r.R[1].Hdr.A, 3)
+
+    def testLazyArray(self):
+        p = Structure('Foo',
+                      UInt8('Count'),
+                      Array('Items',
+                            Structure('Item', UBInt16('Id'), UInt8('Value')),
+                            lambda c: c.Count),
+                      Array('Values', UBInt16(None), 3),
+                      UInt8('Tail'),
+                      )
+        data = b'\x04' + b''.join(struct.pack('>HB', n, n * 2) for n in range(4)) \
+            + b'\x00\x01\x00\x02\x00\x03\xff'
+        for lazy in (p.lazy(), p.lazy(cache_size=2).compile()):
+            r, offset = lazy.parse_buffer(data)
+            self.assertEqual(offset, len(data))
+            self.assertEqual(r.Tail, 0xff)
+            items = r.Items
+            self.assertIsInstance(items, LazyArrayContext)
+            self.assertEqual(len(items), 4)
+            self.assertEqual(items[2].Id, 2)
+            self.assertEqual(items[-1].Value, 6)
+            self.assertIs(items[3].__, items)
+            self.assertRaises(IndexError, lambda: items[4])
+            self.assertEqual(list(n.Id for n in items[1:4:2]), [1, 3])
+            self.assertEqual(list(n.Value for n in items), [0, 2, 4, 6])
+            self.assertEqual(list(r.Values), [1, 2, 3])
+            self.assertEqual(r.Values.index(3), 2)
+            self.assertEqual(r, p.parse(io.BytesIO(data)))
+        r = p.lazy(cache_size=2).parse(io.BytesIO(data))
+        self.assertIs(r.Items[1], r.Items[1])
+        self.assertIsNot(p.lazy().parse(io.BytesIO(data)).Items[1], r.Items[1])
+
 class TestArray(unittest.TestCase):
 
     def testStaticArray(self):
@@ -312,6 +631,149 @@ class TestArray(unittest.TestCase):
             print (p)
             pretty_print (r)
 
+    def testBulkArray(self):
+        item = Structure('Link',
+                         UBInt32('Id'),
+                         Structure('LonLat', UBInt32('Lon'), UBInt32('Lat')),
+                         Hex(UBInt16('Flags')),
+                         Padding(1),
+                         )
+        p = Structure('Links', UInt8('Count'),
+                      Array('Links', item, lambda c: c.Count))
+        self.assertIsNotNone(p._child_fields[1]._bulk)
+        data = b'\x03' + b''.join(struct.pack('>IIIHx', n, n * 10, n * 20, n)
+                                  for n in range(3))
+        stream = io.BytesIO(data[1:])
+        expected = list(item.parse(stream) for n in range(3))
+        for parser in (p, p.compile()):
+            for stream in (io.BytesIO(data), BufferStream(data)):
+                r = parser.parse(stream)
+                self.assertEqual(r.Links, expected)
+                self.assertEqual(r.Links[2].LonLat.Lat, 40)
+                self.assertEqual(r.Links[1].Flags, '0x1')
+                self.assertIs(r.Links[1].__, r.Links)
+                self.assertIs(r.Links[1].LonLat.__, r.Links[1])
+            self.assertRaises(StreamExhausted, parser.parse, io.BytesIO(data[:-2]))
+
+        p = Array('Values', Enum(UBInt16(None), A=1, B=2), 3)
+        self.assertEqual(p.parse(io.BytesIO(b'\0\1\0\2\0\1')), ['A', 'B', 'A'])
+        self.assertRaises(InvalidEnumValue, p.parse, io.BytesIO(b'\0\1\0\3\0\1'))
+
+        p = Array('Empty', Bytes(None, 0), 3)
+        self.assertIsNone(p._bulk)
+        for stream in (io.BytesIO(b'ab'), BufferStream(b'ab')):
+            self.assertEqual(p.parse(stream, None), [b'', b'', b''])
+            self.assertEqual(stream.tell(), 0)
+
+    def testColumnarArray(self):
+        p = Structure('Palette',
+                      UInt8('Count'),
+                      Array('Colors',
+                            Structure('Color',
+                                      UInt8('R'), UInt8('G'), UInt8('B'),
+                                      Structure('Extra', Boolean(UInt8('Flag'))),
+                                      ),
+                            lambda c: c.Count, columnar=True),
+                      )
+        r = p.parse(io.BytesIO(b'\x02\x01\x02\x03\x00\x04\x05\x06\x01'))
+        colors = r.Colors
+        self.assertIsInstance(colors, ColumnContext)
+        self.assertIs(colors.__, r)
+        self.assertEqual(colors.get_name(), 'Colors')
+        self.assertEqual(colors.R.tolist(), [1, 4])
+        self.assertEqual(colors.B.tolist(), [3, 6])
+        self.assertEqual(colors.get_length(), 2)
+        self.assertEqual(colors.get_row(1).Extra.Flag, True)
+        self.assertEqual(colors.Extra.Flag, [False, True])
+        self.assertEqual(list(colors.get_key_order()), ['R', 'G', 'B', 'Extra'])
+        r = p.parse(io.BytesIO(b'\x00'))
+        self.assertEqual(r.Colors.G, [])
+        self.assertEqual(r.Colors.Extra.Flag, [])
+        self.assertRaises(InvalidFieldParameter, Array, 'Foo', UInt8(None),
+                          2, columnar=True)
+
+    def testDynamicColumnarArray(self):
+        item = Structure('Item',
+                         UInt8('Kind'),
+                         UInt8('Length'),
+                         Bytes('Data', lambda c: c.Length),
+                         Switch(lambda c: c.Kind, {
+                             1: Structure('Point', UBInt16('X'), UBInt16('Y')),
+                             2: UBInt64('Big'),
+                             }, default_field=NullField()),
+                         )
+        p = Structure('Foo', UInt8('Count'),
+                      Array('Items', item, lambda c: c.Count, columnar=True))
+        data = b'\x04\x01\x02ab\x00\x01\x00\x02' \
+               b'\x02\x00\xff\xff\xff\xff\xff\xff\xff\xff' \
+               b'\x03\x01c\x01\x00\x00\x03\x00\x04'
+        for parser in (p, p.compile()):
+            r = parser.parse(io.BytesIO(data))
+            items = r.Items
+            self.assertIsInstance(items, ColumnContext)
+            self.assertEqual(items.get_length(), 4)
+            self.assertEqual(items.Kind.tolist(), [1, 2, 3, 1])
+            self.assertEqual(items.Data, [b'ab', b'', b'c', b''])
+            self.assertEqual(items.Point.X, [1, None, None, 3])
+            self.assertEqual(items.Point.Y, [2, None, None, 4])
+            self.assertEqual(items.Big, [None, 2 ** 64 - 1, None, None])
+            self.assertEqual(items.get_row(3).Point.Y, 4)
+
+        plain = Structure('Foo', UInt8('Count'),
+                          Array('Items', item, lambda c: c.Count))
+        r = plain.parse(io.BytesIO(data))
+        columns = r.Items.to_columns()
+        self.assertEqual(columns, p.parse(io.BytesIO(data)).Items)
+        self.assertIs(columns.__, r)
+        self.assertRaises(ContextError, Array('Foo', Bytes(None, 1), 1).parse(
+                          io.BytesIO(b'a')).to_columns)
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def testNumpyArray(self):
+        item = Structure('Link',
+                         UBInt32('Id'),
+                         Structure('LonLat', UBInt32('Lon'), UBInt32('Lat')),
+                         Hex(UBInt16('Flags')),
+                         Padding(1),
+                         String('Name', 3),
+                         FormatArray('Extra', '<h', 2),
+                         )
+        dtype = item.to_dtype()
+        self.assertEqual(dtype.itemsize, item.sizeof(None))
+        self.assertEqual(dtype.names, ('Id', 'LonLat', 'Flags', 'Name', 'Extra'))
+        self.assertEqual(dtype.fields['Flags'][1], 12)
+        self.assertEqual(dtype['LonLat'].names, ('Lon', 'Lat'))
+        p = Array('Links', item, lambda c: c.Count)
+        count = StructContext()
+        count['Count'] = 3
+        data = b''.join(struct.pack('>IIIHx3s', n, n * 10, n * 20, n, b'abc') +
+                        struct.pack('<hh', -n, n) for n in range(3))
+        for stream in (io.BytesIO(data), BufferStream(data)):
+            r = p.parse_numpy(stream, count)
+            self.assertEqual(stream.tell(), len(data))
+            self.assertEqual(r['Id'].tolist(), [0, 1, 2])
+            self.assertEqual(r['LonLat']['Lat'].tolist(), [0, 20, 40])
+            self.assertEqual(r['Flags'].tolist(), [0, 1, 2])
+            self.assertEqual(r[1]['Name'], b'abc')
+            self.assertEqual(r[2]['Extra'].tolist(), [-2, 2])
+        self.assertRaises(StreamExhausted, p.parse_numpy,
+                          io.BytesIO(data[:-1]), count)
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'data')
+            with open(filename, 'wb') as fp:
+                fp.write(b'\0' + data)
+            with open(filename, 'rb') as fp:
+                fp.seek(1)
+                r = p.parse_numpy(fp, count)
+                self.assertIsInstance(r, numpy.memmap)
+                self.assertEqual(r['LonLat']['Lon'].tolist(), [0, 10, 20])
+                self.assertEqual(fp.tell(), len(data) + 1)
+                del r
+
+        self.assertRaises(InvalidFieldParameter, Structure('Foo',
+                          UInt8('Length'), Bytes('Data', lambda c: c.Length)).to_dtype)
+
 class TestFormatStructure(unittest.TestCase):
 
     def testFormatStructure(self):
@@ -334,6 +796,43 @@ class TestFormatStructure(unittest.TestCase):
             pretty_print (r2)
 
 
+class TestFormatArray(unittest.TestCase):
+
+    def testFormatArray(self):
+        p = Structure(None,
+                      UInt8('Length'),
+                      FormatArray('Big', UBInt16(None), lambda c: c.Length),
+                      FormatArray('Little', '<H', 2),
+                      FormatArray('Bytes', 'B', 3),
+                      UInt8('Tail'),
+                      )
+        s = io.BytesIO(b'\x02\x01\x02\x03\x04\x01\x02\x03\x04\x05\x06\x07\x08')
+        r = p.parse(s)
+        self.assertEqual(list(r.Big), [0x0102, 0x0304])
+        self.assertEqual(list(r.Little), [0x0201, 0x0403])
+        self.assertEqual(r.Bytes.typecode, 'B')
+        self.assertEqual(list(r.Bytes), [5, 6, 7])
+        self.assertEqual(r.Tail, 8)
+        if DUMP:
+            print ('testFormatArray'.center(75, '='))
+            print (p)
+            pretty_print (r)
+
+    def testFormatArrayEqualsArray(self):
+        p1 = Array('Values', LInt32(None), 4)
+        p2 = FormatArray('Values', LInt32(None), 4)
+        data = bytes(range(16))
+        self.assertEqual(list(p1.parse(io.BytesIO(data))),
+                         list(p2.parse(io.BytesIO(data))))
+        self.assertRaises(StreamExhausted, p2.parse, io.BytesIO(data[:-1]))
+        self.assertRaises(InvalidFieldParameter, FormatArray, 'Values', 'x', 4)
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def testFormatArrayNumpy(self):
+        p = FormatArray('Values', '>H', 3, use_numpy=True)
+        r = p.parse(io.BytesIO(b'\x00\x01\x00\x02\x00\x03'))
+        self.assertEqual(r.tolist(), [1, 2, 3])
+
 class TestRepeatUntil(unittest.TestCase):
 
     def setUp(self):
@@ -363,6 +862,236 @@ class TestRepeatUntil(unittest.TestCase):
             print (self.format1)
             pretty_print (r)
 
+class TestIterParse(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure('File',
+                                 UInt8('Version'),
+                                 Structure('Body',
+                                           UInt8('Count'),
+                                           Array('Items', UBInt16(None),
+                                                 lambda c: c.Count),
+                                           RepeatUntil('Strings',
+                                                       lambda c: len(c) > 2 and c[-1] == 'end',
+                                                       String(None)),
+                                           ),
+                                 UInt8('Tail'),
+                                 )
+        self.data1 = b'\x01\x03\x00\x01\x00\x02\x00\x03' \
+                     b'a\0b\0c\0end\0\xff'
+
+    def testIterParse(self):
+        for p in (self.format1, self.format1.compile()):
+            stream = io.BytesIO(self.data1)
+            items = p.iterparse(stream, 'Body.Items')
+            self.assertEqual(next(items), 1)
+            self.assertEqual(stream.tell(), 4)
+            self.assertEqual(list(items), [2, 3])
+
+            elements = list()
+            strings = p.iterparse(io.BytesIO(self.data1), 'Body.Strings', window=2)
+            try:
+                while True:
+                    elements.append(next(strings))
+            except StopIteration as e:
+                r = e.value
+            self.assertEqual(elements, ['a', 'b', 'c', 'end'])
+            self.assertEqual(r.Tail, 0xff)
+            self.assertEqual(list(r.Body.Items), [1, 2, 3])
+            self.assertEqual(len(r.Body.Strings), 4)
+            self.assertEqual(r.Body.Strings[-2:], ['c', 'end'])
+            self.assertEqual(r.Body.Strings[3], 'end')
+            self.assertRaises(IndexError, lambda: r.Body.Strings[1])
+
+    def testIterParseKeyOrder(self):
+        # runs of fused static fields keep their key order
+        p = Structure('File',
+                      UInt8('A'), UBInt16('B'),
+                      RepeatUntil('Items', lambda c: len(c) == 2, UInt8(None)),
+                      UInt8('C'), UInt8('D'))
+        data = b'\x01\x00\x02\x03\x04\x05\x06'
+        for parser in (p, p.compile()):
+            items = parser.iterparse(io.BytesIO(data), 'Items')
+            self.assertEqual(next(items), 3)
+            self.assertEqual(next(items), 4)
+            with self.assertRaises(StopIteration) as e:
+                next(items)
+            r = e.exception.value
+            self.assertEqual(r.get_key_order(), ['A', 'B', 'Items', 'C', 'D'])
+            self.assertEqual(list(k for k, v in r.get_ordered_items()),
+                             p.parse(io.BytesIO(data)).get_key_order())
+            self.assertEqual((r.B, r.C, r.D), (2, 5, 6))
+
+    def testIterParseArray(self):
+        p = RepeatUntil('Chunks', lambda c: c and c[-1].Type == 0,
+                        Structure('Chunk', UInt8('Type')))
+        self.assertEqual(list(c.Type for c in p.iterparse(io.BytesIO(b'\3\2\0\1'))),
+                         [3, 2, 0])
+        self.assertRaises(InvalidFieldName, self.format1.iterparse,
+                          io.BytesIO(self.data1), 'Body.Foo')
+        self.assertRaises(InvalidFieldParameter, self.format1.iterparse,
+                          io.BytesIO(self.data1), 'Body.Count')
+        self.assertRaises(InvalidFieldName, p.iterparse, io.BytesIO(b''), 'Chunk')
+
+    def testIterParsePNG(self):
+        import demo_png
+        with open(os.path.join(os.path.dirname(__file__), 'tiger.png'), 'rb') as fp:
+            data = fp.read()
+        chunks = demo_png.PNGFile.parse(io.BytesIO(data)).Chunks
+        self.assertEqual(list(demo_png.PNGFile.iterparse(BufferStream(data), 'Chunks')),
+                         chunks)
+
+class TestIncrementalParser(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure('Message',
+                                 UBInt16('Type'),
+                                 UBInt16('Length'),
+                                 Bytes('Data', lambda c: c.Length),
+                                 Anchor('End'),
+                                 )
+        self.data1 = b''.join(struct.pack('>HH', n, n) + b'x' * n for n in range(20))
+
+    def testFeedRecords(self):
+        for size in (1, 3, 7, len(self.data1)):
+            parser = IncrementalParser(self.format1)
+            records = list()
+            for n in range(0, len(self.data1), size):
+                records.extend(parser.feed(self.data1[n:n + size]))
+            records.extend(parser.close())
+            self.assertEqual(len(records), 20)
+            self.assertEqual(records[7].Data, b'x' * 7)
+            self.assertEqual(records[-1].End, len(self.data1))
+            self.assertEqual(list(records[3].keys()), ['Type', 'Length', 'Data', 'End'])
+        self.assertRaises(StreamError, parser.feed, b'')
+
+        parser = IncrementalParser(self.format1)
+        self.assertEqual(len(parser.feed(self.data1[:7])), 1)
+        self.assertRaises(StreamExhausted, parser.close)
+
+    def testFeedElements(self):
+        calls = list()
+        p = Structure('File',
+                      Calculate('Count', lambda c: calls.append(1) or 3),
+                      Array('Messages', self.format1, lambda c: c.Count),
+                      UInt8('Tail'),
+                      )
+        parser = IncrementalParser(p, 'Messages')
+        data = self.data1[:3 * 4 + 3] + b'\xff'
+        elements = list()
+        for n in range(len(data)):
+            elements.extend(parser.feed(data[n:n + 1]))
+            if n < len(data) - 1:
+                self.assertIsNone(parser.result)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(list(m.Length for m in elements), [0, 1, 2])
+        self.assertEqual(parser.result.Tail, 0xff)
+        self.assertEqual(parser.close(), [])
+
+    def testFeedResume(self):
+        # children parsed before are not parsed again on short feeds
+        calls = list()
+        p = Structure('Record',
+                      Calculate('Start', lambda c: calls.append(1) or 0),
+                      UBInt16('Count'),
+                      Array('Items',
+                            Structure('Item',
+                                      UInt8('Length'),
+                                      Bytes('Data', lambda c: c.Length)),
+                            lambda c: c.Count),
+                      RepeatUntil('Values', lambda c: False, UInt8(None)),
+                      )
+        data = b'\x00\x02\x01a\x03bcd\x05\x06\x07'
+        parser = IncrementalParser(p)
+        for n in range(len(data)):
+            self.assertEqual(parser.feed(data[n:n + 1]), [])
+        self.assertEqual(len(calls), 1)
+        records = parser.close()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0], p.parse(io.BytesIO(data)))
+        self.assertEqual(list(records[0].Values), [5, 6, 7])
+        self.assertEqual(records[0].get_key_order(),
+                         ['Start', 'Count', 'Items', 'Values'])
+
+    def testFeedPNG(self):
+        import demo_png
+        with open(os.path.join(os.path.dirname(__file__), 'tiger.png'), 'rb') as fp:
+            data = fp.read()
+        chunks = demo_png.PNGFile.parse(io.BytesIO(data)).Chunks
+        parser = IncrementalParser(demo_png.PNGFile, 'Chunks')
+        elements = list()
+        for n in range(0, len(data), 1000):
+            elements.extend(parser.feed(data[n:n + 1000]))
+        self.assertEqual(elements, chunks)
+        self.assertEqual(parser.result.Chunks[-1].Type, 'IEND')
+
+class TestParseAsync(unittest.TestCase):
+
+    def feed(self, reader, data, size):
+        async def feeder():
+            for n in range(0, len(data), size):
+                await asyncio.sleep(0)
+                reader.feed_data(data[n:n + size])
+            reader.feed_eof()
+        return asyncio.ensure_future(feeder())
+
+    def testParseAsync(self):
+        message = Structure('Message',
+                            UBInt16('Length'),
+                            Bytes('Data', lambda c: c.Length),
+                            RepeatUntil('Values', lambda c: c and c[-1] == 0,
+                                        UInt8(None)),
+                            )
+        header = Structure('Header', UBInt16('Count'), Padding(2))
+        data = b'\x00\x02\x00\x00' + b'\x00\x03abc\x01\x00' + b'\x00\x01d\x00' + b'\x00'
+
+        async def main(size):
+            reader = asyncio.StreamReader()
+            feeder = self.feed(reader, data, size)
+            h = await header.parse_async(reader)
+            messages = list()
+            for n in range(h.Count):
+                messages.append(await message.parse_async(reader))
+            with self.assertRaises(StreamExhausted):
+                await message.parse_async(reader)
+            await feeder
+            return messages
+
+        for size in (1, 2, 5, len(data)):
+            messages = asyncio.run(main(size))
+            self.assertEqual(list(m.Data for m in messages), [b'abc', b'd'])
+            self.assertEqual(list(messages[0].Values), [1, 0])
+
+    def testReadExactly(self):
+        # static runs and sized fields are awaited at once, not parsed
+        # again for each piece of data
+        message = Structure('Message',
+                            UBInt16('Length'),
+                            Bytes('Data', lambda c: c.Length),
+                            UBInt32('A'),
+                            UBInt32('B'),
+                            Array('Values', UBInt16(None), 2),
+                            )
+        data = b'\x00\x05abcde' + bytes(range(12)) + b'tail'
+        sizes = list()
+
+        class Reader(asyncio.StreamReader):
+            async def readexactly(self, n):
+                sizes.append(n)
+                return await super().readexactly(n)
+
+        async def main():
+            reader = Reader()
+            feeder = self.feed(reader, data, 1)
+            m = await message.parse_async(reader)
+            self.assertEqual(await reader.read(), b'tail')
+            await feeder
+            return m
+
+        m = asyncio.run(main())
+        self.assertEqual(m, message.parse(io.BytesIO(data)))
+        self.assertEqual(sizes, [2, 5, 8, 4])
+
 class TestUnion(unittest.TestCase):
 
     def setUp(self):
@@ -429,6 +1158,54 @@ class TestBitwiseStructure(unittest.TestCase):
             print (self.format1)
             pretty_print (r)
             
+class TestBitStream(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = BitStream('Header',
+            [
+                ('Version', 3),
+                ('Flags', 1, 5),
+                ('Channels', [
+                    ('Left', 12),
+                    ('Right', 12),
+                    ]),
+                (None, 1),
+                ('Tail', 7),
+                ('Long', 65),
+                (None, 7),
+            ]
+            )
+        self.data1 = b'\xb5\xff\x00\xab\xcd' + b'\x80' + b'\x00' * 7 + b'\x80'
+
+    def testBitStream(self):
+        self.assertEqual(self.format1.sizeof(None), 14)
+        r = self.format1.parse(io.BytesIO(self.data1))
+        self.assertEqual(r.Version, 0x5)
+        self.assertEqual(list(r.Flags), [1, 0, 1, 0, 1])
+        self.assertEqual(r.Channels.Left, 0xff0)
+        self.assertEqual(r.Channels.Right, 0x0ab)
+        self.assertIs(r.Channels.get_parent(), r)
+        self.assertEqual(r.Tail, 0x4d)
+        self.assertEqual(r.Long, (1 << 64) + 1)
+        self.assertEqual(r.get_key_order(), ['Version', 'Flags', 'Channels', 'Tail', 'Long'])
+        self.assertRaises(StreamExhausted, self.format1.parse, io.BytesIO(self.data1[:-1]))
+
+    def testLittleEndian(self):
+        items = [('I1', 3), ('I2', 1), ('I3', 11), ('I4', 1), (None, 2),
+                 ('I6', 7), ('I7', 3), ('I8', 4)]
+        p = BitStream(None, items, byteorder='little')
+        expected = BitwiseStructure(None, items, byteorder='little')
+        data = b'\x12\x34\x56\x78'
+        self.assertEqual(p.parse(io.BytesIO(data)), expected.parse(io.BytesIO(data)))
+        p = BitStream(None, [('Values', 4, 4)], byteorder='little')
+        self.assertEqual(list(p.parse(io.BytesIO(b'\x21\x43')).Values), [1, 2, 3, 4])
+
+    def testInvalid(self):
+        self.assertRaises(InvalidFieldParameter, BitStream, None, [('A', 7)])
+        self.assertRaises(InvalidFieldParameter, BitStream, None, [('A', 8)], 'middle')
+        self.assertRaises(InvalidFieldParameter, BitStream, None, [('A', 8, 1, 1)])
+        self.assertRaises(InvalidFieldName, BitStream, None, [('A', 4), ('A', 4)])
+
 class TestConditionalFields(unittest.TestCase):
 
     def testIfElse(self):
@@ -473,6 +1250,281 @@ class TestSpecialFields(unittest.TestCase):
             print (self.format1)
             pretty_print (r)
 
+class TestFusedFields(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure(None,
+                                 UInt8('Byte'),
+                                 Int16('Native'),
+                                 Enum(UBInt16('Kind'), A=1, B=2),
+                                 FormatStructure('Pair', '>BB', ['X', 'Y']),
+                                 Padding(2),
+                                 String('Str', 4),
+                                 Constant(Bytes('Magic', 2), b'MG'),
+                                 ULInt16('Little'),
+                                 Hex(ULInt32('Hex')),
+                                 Padding(1),
+                                 )
+        self.data1 = b'\x01\x02\x00\x00\x02\x03\x04\0\0ab\0\0MG' \
+                     b'\x01\x00\xff\x00\x00\x00\0'
+
+    def testFusedRuns(self):
+        runs = list(f for f in self.format1._parse_plan if f.name is None
+                    and f.__class__.__name__ == '_FusedRun')
+        self.assertEqual(len(runs), 3)
+        r = self.format1.parse(io.BytesIO(self.data1))
+        self.assertEqual(list(r.get_key_order()),
+                         'Byte Native Kind Pair Str Magic Little Hex'.split())
+        self.assertEqual(r.Byte, 1)
+        self.assertEqual(r.Native, struct.unpack('=h', b'\x02\x00')[0])
+        self.assertEqual(r.Kind, 'B')
+        self.assertEqual(r.Pair.X, 3)
+        self.assertEqual(r.Pair.get_parent(), r)
+        self.assertEqual(r.Str, 'ab')
+        self.assertEqual(r.Magic, b'MG')
+        self.assertEqual(r.Little, 1)
+        self.assertEqual(r.Hex, '0xff')
+        if DUMP:
+            print ('testFusedRuns'.center(75, '='))
+            print (self.format1)
+            pretty_print (r)
+
+    def testFusedErrors(self):
+        self.assertRaises(ValidationError, self.format1.parse,
+                          io.BytesIO(self.data1.replace(b'MG', b'mg')))
+        self.assertRaises(InvalidEnumValue, self.format1.parse,
+                          io.BytesIO(self.data1[:3] + b'\0\0'))
+        self.assertRaises(StreamExhausted, self.format1.parse,
+                          io.BytesIO(self.data1[:-3]))
+        # trailing padding is skipped, not read
+        self.assertEqual(self.format1.parse(io.BytesIO(self.data1[:-1])).Hex, '0xff')
+
+    def testUnfusableFormats(self):
+        # native only codes and empty formats are parsed one by one
+        size = struct.calcsize('P')
+        format = Structure(None, FormatField('Pointer', 'P'), UInt8('Byte'))
+        for p in (format, format.compile()):
+            r = p.parse(io.BytesIO(bytes(size) + b'\x01'))
+            self.assertEqual(r.Pointer, (0,))
+            self.assertEqual(r.Byte, 1)
+        format = Structure(None, FormatField('Empty', ''), UInt8('Byte'))
+        r = format.parse(io.BytesIO(b'\x01'))
+        self.assertEqual(r.Empty, ())
+        self.assertEqual(r.Byte, 1)
+
+class TestSlotted(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure('File',
+                                 UBInt16('Count'),
+                                 Array('Records',
+                                       Structure('Record',
+                                                 UBInt16('Length'),
+                                                 Bytes('Data', lambda c: c.Length),
+                                                 Hex(UBInt32('Id')),
+                                                 Structure('Flags',
+                                                           UInt8('Flag1'),
+                                                           UInt8('Flag2'),
+                                                           ),
+                                                 ),
+                                       lambda c: c.Count),
+                                 Array('Points',
+                                       Structure('Point', UInt8('X'), UInt8('Y')),
+                                       2),
+                                 Structure('Footer',
+                                           Embed(Structure('Embedded', UInt8('Foo'))),
+                                           ),
+                                 )
+        self.data = b'\x00\x02\x00\x01a\x00\x00\x00\x01\x01\x02' \
+                    b'\x00\x02bc\x00\x00\x00\x02\x03\x04\x05\x06\x07\x08\x09'
+
+    def testSlotted(self):
+        expected = self.format1.parse(io.BytesIO(self.data))
+        for p in (self.format1.slotted(), self.format1.compile().slotted(),
+                  self.format1.slotted().compile()):
+            r = p.parse(io.BytesIO(self.data))
+            self.assertEqual(r, expected)
+            self.assertEqual(expected, r)
+            self.assertIsInstance(r, RecordContext)
+            self.assertNotIsInstance(r.Footer, RecordContext)
+            record = r.Records[1]
+            self.assertIsInstance(record, RecordContext)
+            self.assertIs(record.get_parent(), r.Records)
+            self.assertIs(record.Flags.get_parent(), record)
+            self.assertEqual(record.get_name(), 'Record')
+            self.assertEqual(record.get_key_order(), ['Length', 'Data', 'Id', 'Flags'])
+            self.assertEqual(record.Data, b'bc')
+            self.assertEqual(record['Id'], '0x2')
+            self.assertIn('Length', record)
+            self.assertNotIn('Foo', record)
+            self.assertRaises(KeyError, record.__getitem__, 'Foo')
+            self.assertRaises(AttributeError, getattr, record, 'Foo')
+            self.assertEqual(r.Points[1].Y, 8)
+            self.assertIs(type(r.Points[0]), type(r.Points[1]))
+            self.assertFalse(hasattr(record, '__dict__'))
+
+    def testPickle(self):
+        r = self.format1.slotted().parse(io.BytesIO(self.data))
+        copy = pickle.loads(pickle.dumps(r))
+        self.assertEqual(copy, r)
+        self.assertIs(type(copy.Records[0]), type(r.Records[0]))
+        self.assertIs(copy.Records[0].get_parent(), copy.Records)
+
+    def testColumns(self):
+        r = self.format1.slotted().parse(io.BytesIO(self.data))
+        columns = r.Records.to_columns()
+        self.assertEqual(list(columns.Length), [1, 2])
+        self.assertEqual(list(columns.Flags.Flag2), [2, 4])
+
+class TestCompile(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure('Foo',
+                                 Enum(UInt8('Kind'), Bytes=0, String=1),
+                                 Hex(UBInt16('Hex')),
+                                 Constant(Bytes('Magic', 4), b'MGCK'),
+                                 Rename('StartPosition', Anchor('Pos')),
+                                 Array('Values', UInt8(None), lambda c: c.Kind == 'String' and 2),
+                                 Calculate('Size', lambda c: len(c.Values)),
+                                 Embed(Structure('Inner',
+                                                 ULInt16('Inner1'),
+                                                 Padding(1),
+                                                 )),
+                                 IfElse(lambda c: c.Kind == 'Bytes',
+                                        Bytes('Data', 2),
+                                        String('Data', 2),
+                                        ),
+                                 )
+        self.data1 = b'\x01\x00\xffMGCK\x01\x02\x03\x04\0ab'
+
+    def testCompiledEqualsInterpreted(self):
+        compiled = self.format1.compile()
+        r1 = self.format1.parse(io.BytesIO(self.data1))
+        r2 = compiled.parse(io.BytesIO(self.data1))
+        self.assertEqual(r1, r2)
+        self.assertEqual(r1.get_key_order(), r2.get_key_order())
+        self.assertEqual(r2.Data, 'ab')
+        self.assertEqual(r2.Values.get_parent(), r2)
+        if DUMP:
+            print ('testCompiledEqualsInterpreted'.center(75, '='))
+            print (compiled)
+            pretty_print (r2)
+
+    def testCompiledErrors(self):
+        compiled = self.format1.compile()
+        self.assertRaises(InvalidEnumValue, compiled.parse,
+                          io.BytesIO(b'\x02' + self.data1[1:]))
+        self.assertRaises(ValidationError, compiled.parse,
+                          io.BytesIO(self.data1.replace(b'MGCK', b'mgck')))
+        self.assertRaises(StreamExhausted, compiled.parse,
+                          io.BytesIO(self.data1[:2]))
+
+    def testCompilePNG(self):
+        import demo_png
+        with open(os.path.join(os.path.dirname(__file__), 'tiger.png'), 'rb') as fp:
+            data = fp.read()
+        r1 = demo_png.PNGFile.parse(io.BytesIO(data))
+        r2 = demo_png.PNGFile.compile().parse(io.BytesIO(data))
+        self.assertEqual(r1, r2)
+
+class TestBuild(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure(None,
+                                 UInt8('Byte'),
+                                 Int16('Native'),
+                                 Enum(UBInt16('Kind'), A=1, B=2),
+                                 FormatStructure('Pair', '>BB', ['X', 'Y']),
+                                 Padding(2),
+                                 String('Str', 4),
+                                 Constant(Bytes('Magic', 2), b'MG'),
+                                 ULInt16('Little'),
+                                 Hex(ULInt32('Hex')),
+                                 Padding(1),
+                                 )
+        self.data1 = b'\x01\x02\x00\x00\x02\x03\x04\0\0ab\0\0MG' \
+                     b'\x01\x00\xff\x00\x00\x00\0'
+        self.format2 = Structure('File',
+                                 UBInt16('Count'),
+                                 Array('Records',
+                                       Structure('Record',
+                                                 UBInt16('Length'),
+                                                 Bytes('Data', lambda c: c.Length),
+                                                 Hex(UBInt32('Id')),
+                                                 Structure('Flags',
+                                                           UInt8('Flag1'),
+                                                           UInt8('Flag2'),
+                                                           ),
+                                                 ),
+                                       lambda c: c.Count),
+                                 Array('Points',
+                                       Structure('Point', UInt8('X'), UInt8('Y')),
+                                       2),
+                                 Structure('Footer',
+                                           Embed(Structure('Embedded', UInt8('Foo'))),
+                                           ),
+                                 )
+        self.data2 = b'\x00\x02\x00\x01a\x00\x00\x00\x01\x01\x02' \
+                     b'\x00\x02bc\x00\x00\x00\x02\x03\x04\x05\x06\x07\x08\x09'
+        self.format3 = Structure('Foo',
+                                 UInt8('Kind'),
+                                 Select([(lambda c: c.Kind == 1, UBInt16('Value'))],
+                                        default_field=UInt8('Value')),
+                                 Union('Word', UInt8('High'), UBInt16('Word')),
+                                 Array('Points',
+                                       Structure('Point', UBInt16('X'), UBInt16('Y')),
+                                       2, columnar=True),
+                                 FormatArray('Shorts', '<H', 2),
+                                 BitStream('Bits', [('A', 3), ('B', 5)]),
+                                 RepeatUntil('Bytes', lambda c: c and c[-1] == 0,
+                                             UInt8(None)),
+                                 String('Text', 0),
+                                 )
+        self.data3 = b'\x01\x00\x05\x12\x34\x00\x01\x00\x02\x00\x03\x00\x04' \
+                     b'\x05\x00\x06\x00\xab\x01\x00hi\0'
+
+    def testRoundTrip(self):
+        for format, data in ((self.format1, self.data1), (self.format2, self.data2),
+                             (self.format3, self.data3)):
+            for p in (format, format.compile(), format.slotted()):
+                r = p.parse(io.BytesIO(data))
+                self.assertEqual(p.build(r), data)
+
+    def testBuildInto(self):
+        r = self.format1.parse(io.BytesIO(self.data1))
+        buffer = bytearray(b'\xff' * (len(self.data1) + 2))
+        end = self.format1.build_into(r, memoryview(buffer), 2)
+        self.assertEqual(end, len(buffer))
+        self.assertEqual(buffer[2:], self.data1)
+        self.assertRaises(BuildError, self.format1.build_into,
+                          r, memoryview(buffer), 3)
+        # bytearrays grow
+        buffer = bytearray()
+        self.assertEqual(self.format1.build_into(r, buffer), len(self.data1))
+        self.assertEqual(buffer, self.data1)
+
+    def testBuildErrors(self):
+        format = Array('Values', UBInt16(None), 2)
+        self.assertEqual(format.build([1, 2]), b'\0\1\0\2')
+        self.assertRaises(BuildError, format.build, [1])
+        self.assertRaises(BuildError, format.build, [1, 1 << 16])
+        self.assertRaises(BuildError, Bytes('Data', 2).build, b'abc')
+        self.assertRaises(BuildError, String('Data', 0).build, 'a\0b')
+        self.assertRaises(BuildError, Enum(UInt8('Kind'), A=1).build, 'B')
+
+    def testBuildPNG(self):
+        import demo_png
+        with open(os.path.join(os.path.dirname(__file__), 'tiger.png'), 'rb') as fp:
+            data = bytearray(fp.read())
+        r = demo_png.PNGFile.parse(io.BytesIO(data))
+        # unknown chunks are skipped by paddings, they are built as zeros
+        for chunk in r.Chunks:
+            if chunk.Type in ('sRGB', 'bKGD', 'pHYs'):
+                start = chunk['__StartOfData']
+                data[start:start + chunk.Length] = bytes(chunk.Length)
+        self.assertEqual(demo_png.PNGFile.build(r), data)
+        self.assertEqual(demo_png.PNGFile.compile().build(r), data)
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import io
+import sys, os, os.path
+sys.path.insert(0, '../src')
+
+from binaryparser import *
+
+
+class TestParseProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.format1 = Structure('Message',
+                                 UBInt16('Count'),
+                                 Array('Records',
+                                       Structure('Record',
+                                                 Enum(UInt8('Kind'), A=1, B=2),
+                                                 Bytes('Data', 2),
+                                                 Padding(1),
+                                                 ),
+                                       lambda c: c.Count),
+                                 Switch(lambda c: c.Count,
+                                        {2: UBInt16('Tail')},
+                                        default_field=UInt8('Tail')),
+                                 )
+        self.data1 = b'\x00\x02\x01ab\x00\x02cd\x00\x00\x05'
+
+    def testProfile(self):
+        profiler = ParseProfiler()
+        profiled = profiler.instrument(self.format1)
+        for p in (profiled, profiler.instrument(self.format1.compile())):
+            r = p.parse(io.BytesIO(self.data1))
+            self.assertEqual(r, self.format1.parse(io.BytesIO(self.data1)))
+        stats = dict((s.path, s) for s in profiler.get_stats())
+        self.assertEqual(sorted(stats),
+                         ['Message', 'Message/Count', 'Message/Records',
+                          'Message/Records/Record', 'Message/Records/Record/Data',
+                          'Message/Records/Record/Kind',
+                          'Message/Records/Record/Padding',
+                          'Message/Switch', 'Message/Switch/Tail'])
+        record = stats['Message/Records/Record']
+        self.assertEqual(record.calls, 4)
+        self.assertEqual(record.bytes, 16)
+        self.assertEqual(record.errors, 0)
+        self.assertGreaterEqual(record.time, record.own_time)
+        self.assertEqual(stats['Message'].bytes, 2 * len(self.data1))
+        # the original field isn't profiled
+        self.format1.parse(io.BytesIO(self.data1))
+        self.assertEqual(profiler.get_stats(sort='path')[0].calls, 2)
+
+    def testErrors(self):
+        profiler = ParseProfiler()
+        profiled = profiler.instrument(self.format1)
+        self.assertRaises(InvalidEnumValue, profiled.parse,
+                          io.BytesIO(self.data1.replace(b'\x02cd', b'\x03cd')))
+        stats = dict((s.path, s) for s in profiler.get_stats())
+        self.assertEqual(stats['Message'].errors, 1)
+        self.assertEqual(stats['Message/Records/Record/Kind'].errors, 1)
+        self.assertEqual(stats['Message/Records/Record/Kind'].calls, 2)
+        self.assertNotIn('Message/Switch', stats)
+        profiler.reset()
+        self.assertEqual(profiler.get_stats(), [])
+
+    def testReports(self):
+        profiler = ParseProfiler()
+        profiler.instrument(self.format1).parse(io.BytesIO(self.data1))
+        stats = profiler.get_stats(sort='calls')
+        self.assertEqual(stats[0].calls, 2)
+        self.assertEqual(len(profiler.get_stats(limit=3)), 3)
+        paths = list(s.path for s in profiler.get_stats(sort='path'))
+        self.assertEqual(paths, sorted(paths))
+        self.assertRaises(InvalidFieldParameter, profiler.get_stats, 'foo')
+        buffer = io.StringIO()
+        profiler.dump_csv(buffer)
+        lines = buffer.getvalue().splitlines()
+        self.assertEqual(lines[0], 'path,calls,time,own_time,bytes,errors')
+        self.assertEqual(lines[1].split(',')[:2], ['Message', '1'])
+        buffer = io.StringIO()
+        profiler.print_stats(stream=buffer)
+        self.assertIn('Message/Records/Record/Kind', buffer.getvalue())
+
+    def testProfilePNG(self):
+        import demo_png
+        profiler = ParseProfiler()
+        r = profiler.instrument(demo_png.PNGFile)\
+            .parse_file(os.path.join(os.path.dirname(__file__), 'tiger.png'))
+        stats = dict((s.path, s) for s in profiler.get_stats())
+        keyword = stats['PNGFile/Chunks/Chunk/Switch/TextualData/Keyword']
+        self.assertEqual(keyword.calls, sum(c.Type == 'tEXt' for c in r.Chunks))
+        self.assertEqual(stats['PNGFile/Chunks/Chunk'].calls, len(r.Chunks))
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()